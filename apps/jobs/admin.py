@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_filter = ['status', 'kind', 'created']
+    search_fields = ['kind', 'owner__username']
+    list_display = ['kind', 'status', 'owner', 'done', 'total', 'attempts']
@@ -0,0 +1,69 @@
+"""
+Job handlers.
+
+A job is run by the handler named by its kind in the JOBS_HANDLERS
+setting, a callable taking the job and its decoded arguments and returning
+a JSON serializable result. Handlers report their progress with
+``job.set_progress()``.
+
+A handler raising an exception is retried after a delay, up to the
+max_attempts of the job, unless it raised JobError, which fails the job
+right away. As a retried job may have been halfway through, handlers resume
+from ``job.done`` or start over safely. ``job.set_progress()`` raises
+LockLost once the job was taken over by another worker, which stops the
+handler without recording anything.
+"""
+import os
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+from .models import Job, LockLost
+
+
+class JobError(Exception):
+    """
+    Fails a job without retrying it, such as for invalid arguments.
+    """
+
+
+def get_handler(kind):
+    try:
+        return import_string(settings.JOBS_HANDLERS[kind])
+    except KeyError:
+        raise JobError('Unknown job kind {}.'.format(kind))
+
+
+def get_file_path(name):
+    """
+    Returns the path of a file written by a job, within JOBS_FILES_DIR.
+    """
+    return os.path.join(settings.JOBS_FILES_DIR, name)
+
+
+def run_job(pk):
+    """
+    Runs the claimed job and records its outcome. Returns the job.
+    """
+    close_old_connections()
+
+    try:
+        job = Job.objects.get(pk=pk)
+
+        try:
+            result = get_handler(job.kind)(job, job.get_arguments())
+        except LockLost:
+            # The job is recorded by the worker now holding it.
+            return job
+        except JobError as e:
+            job.fail(str(e), retry=False)
+        except Exception:
+            job.fail(traceback.format_exc())
+        else:
+            job.succeed(result)
+
+        return job
+    finally:
+        close_old_connections()
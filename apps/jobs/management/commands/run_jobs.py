@@ -0,0 +1,93 @@
+import os
+import socket
+import threading
+import time
+from functools import partial
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.jobs.handlers import run_job
+from apps.jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = ("Runs the queued jobs on a pool of threads, or of processes for CPU "
+            "bound handlers, until interrupted. Several workers may run at once.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.JOBS_CONCURRENCY,
+                            help='Number of jobs run at once.')
+        parser.add_argument('--processes', action='store_true',
+                            help='Run the jobs on processes rather than threads.')
+        parser.add_argument('--poll', type=float, default=settings.JOBS_POLL_INTERVAL,
+                            help='Seconds waited for new jobs when none is due.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no job is due nor running.')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        worker = '{}:{}'.format(socket.gethostname(), os.getpid())
+
+        if options['processes']:
+            # The processes must open connections of their own.
+            connections.close_all()
+            pool = Pool(concurrency, initializer=django.setup)
+        else:
+            pool = ThreadPool(concurrency)
+
+        self.running = set()
+        self.lock = threading.Lock()
+        self.stdout.write('Worker {} running {} jobs at once.'.format(worker, concurrency))
+
+        try:
+            while True:
+                requeued, failed = Job.objects.requeue_stale()
+                if requeued or failed:
+                    self.stdout.write('Requeued {} and failed {} stale jobs.'.format(
+                        requeued, failed))
+
+                with self.lock:
+                    free = concurrency - len(self.running)
+                jobs = Job.objects.claim(worker, free) if free > 0 else []
+
+                for job in jobs:
+                    with self.lock:
+                        self.running.add(job.pk)
+                    pool.apply_async(run_job, (job.pk,), callback=self.job_done,
+                                     error_callback=partial(self.job_crashed, job.pk))
+
+                if not jobs:
+                    with self.lock:
+                        idle = not self.running
+                    if options['once'] and idle:
+                        break
+
+                    time.sleep(options['poll'])
+        except KeyboardInterrupt:
+            self.stdout.write('Waiting for the running jobs to finish.')
+        finally:
+            pool.close()
+            pool.join()
+
+    def job_done(self, job):
+        with self.lock:
+            self.running.discard(job.pk)
+
+        message = '{} {}, attempt {} of {}'.format(
+            job, job.get_status_display().lower(), job.attempts, job.max_attempts)
+        if job.status != Job.SUCCEEDED and job.error.strip():
+            message += ': ' + job.error.strip().splitlines()[-1]
+
+        self.stdout.write(message)
+
+    def job_crashed(self, pk, error):
+        # The job is left running, to be requeued once it is stale.
+        with self.lock:
+            self.running.discard(pk)
+
+        self.stderr.write('Job #{} crashed: {!r}'.format(pk, error))
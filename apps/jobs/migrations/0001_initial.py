@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 05:32
+from __future__ import unicode_literals
+
+import apps.jobs.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(help_text='The name of the JOBS_HANDLERS handler running the job', max_length=60)),
+                ('arguments', models.TextField(default='{}', help_text='The JSON encoded arguments of the handler')),
+                ('status', models.IntegerField(choices=[(1, 'Queued'), (2, 'Running'), (3, 'Succeeded'), (4, 'Failed')], default=1)),
+                ('done', models.IntegerField(default=0, help_text='The number of items processed so far')),
+                ('total', models.IntegerField(blank=True, help_text='The number of items to process, when known', null=True)),
+                ('result', models.TextField(blank=True, default='', help_text='The JSON encoded result of the handler')),
+                ('error', models.TextField(blank=True, default='', help_text='The error of the last failed attempt')),
+                ('attempts', models.IntegerField(default=0, help_text='The number of times the job was started')),
+                ('max_attempts', models.IntegerField(default=apps.jobs.models.default_max_attempts, help_text='The number of times the job is started before failing')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='The date from which the job may run')),
+                ('locked_by', models.CharField(blank=True, default='', help_text='The worker running the job', max_length=100)),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='The date when the worker last reported on the job')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='The date when this job was submitted')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='The date when this job was last updated')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='The date when this job succeeded or failed')),
+                ('owner', models.ForeignKey(help_text='The user who submitted this job', on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='job',
+            index_together=set([('status', 'run_after')]),
+        ),
+    ]
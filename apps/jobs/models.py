@@ -0,0 +1,234 @@
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.db.models import F
+from django.utils import timezone
+from django.utils.encoding import python_2_unicode_compatible
+
+
+def default_max_attempts():
+    return settings.JOBS_MAX_ATTEMPTS
+
+
+class LockLost(Exception):
+    """
+    Raised when a job is reported on by a worker which no longer holds it,
+    such as after the job was requeued as stale and claimed by another one.
+    """
+
+
+class JobQuerySet(models.QuerySet):
+    def claim(self, worker, limit):
+        """
+        Marks up to `limit` due queued jobs as running for the worker and
+        returns them, oldest first.
+
+        A job is claimed with an UPDATE conditioned on it still being
+        queued, so that concurrent workers never run the same job.
+        """
+        now = timezone.now()
+        candidates = (self.filter(status=Job.QUEUED, run_after__lte=now)
+                      .order_by('run_after', 'pk')
+                      .values_list('pk', flat=True)[:limit])
+        claimed = []
+
+        for pk in candidates:
+            if self.filter(pk=pk, status=Job.QUEUED).update(
+                    status=Job.RUNNING, attempts=F('attempts') + 1,
+                    locked_by=worker, locked_at=now, updated=now):
+                claimed.append(pk)
+
+        return list(self.filter(pk__in=claimed).order_by('run_after', 'pk'))
+
+    def requeue_stale(self):
+        """
+        Queues the running jobs whose worker stopped reporting for longer
+        than JOBS_LOCK_TIMEOUT, as their worker most likely died, and
+        returns how many were requeued and failed.
+
+        The stale jobs which used up their attempts are failed instead, so
+        that a job killing its worker isn't run forever.
+        """
+        now = timezone.now()
+        stale = self.filter(status=Job.RUNNING, locked_at__lt=now - timedelta(
+            seconds=settings.JOBS_LOCK_TIMEOUT))
+        released = dict(locked_by='', locked_at=None, updated=now)
+
+        failed = stale.filter(attempts__gte=F('max_attempts')).update(
+            status=Job.FAILED, error='The worker running the job stopped reporting.',
+            finished=now, **released)
+        requeued = stale.update(status=Job.QUEUED, run_after=now, **released)
+
+        return requeued, failed
+
+
+@python_2_unicode_compatible
+class Job(models.Model):
+    """
+    A unit of background work run by the run_jobs workers
+    """
+    QUEUED = 1
+    RUNNING = 2
+    SUCCEEDED = 3
+    FAILED = 4
+
+    JOB_STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    )
+
+    kind = models.CharField(
+        max_length=60,
+        help_text="The name of the JOBS_HANDLERS handler running the job"
+    )
+
+    arguments = models.TextField(
+        help_text="The JSON encoded arguments of the handler",
+        default="{}",
+    )
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        help_text="The user who submitted this job",
+        related_name='jobs',
+    )
+
+    status = models.IntegerField(
+        choices=JOB_STATUS_CHOICES,
+        default=QUEUED
+    )
+
+    done = models.IntegerField(
+        default=0,
+        help_text="The number of items processed so far"
+    )
+
+    total = models.IntegerField(
+        null=True,
+        blank=True,
+        help_text="The number of items to process, when known"
+    )
+
+    result = models.TextField(
+        help_text="The JSON encoded result of the handler",
+        blank=True,
+        default="",
+    )
+
+    error = models.TextField(
+        help_text="The error of the last failed attempt",
+        blank=True,
+        default="",
+    )
+
+    attempts = models.IntegerField(
+        default=0,
+        help_text="The number of times the job was started"
+    )
+
+    max_attempts = models.IntegerField(
+        default=default_max_attempts,
+        help_text="The number of times the job is started before failing"
+    )
+
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='The date from which the job may run'
+    )
+
+    locked_by = models.CharField(
+        max_length=100,
+        blank=True,
+        default="",
+        help_text="The worker running the job"
+    )
+
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='The date when the worker last reported on the job'
+    )
+
+    created = models.DateTimeField(
+        auto_now_add=True,
+        editable=False,
+        verbose_name='The date when this job was submitted'
+    )
+
+    updated = models.DateTimeField(
+        auto_now=True,
+        editable=False,
+        verbose_name='The date when this job was last updated'
+    )
+
+    finished = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='The date when this job succeeded or failed'
+    )
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        index_together = [
+            # Claiming the due jobs.
+            ('status', 'run_after'),
+        ]
+
+    def __str__(self):
+        return '{} #{}'.format(self.kind, self.pk)
+
+    def get_arguments(self):
+        return json.loads(self.arguments)
+
+    def get_result(self):
+        return json.loads(self.result) if self.result else None
+
+    def set_progress(self, done, total=None):
+        """
+        Records the items processed so far, which also tells that the
+        worker running the job is alive.
+
+        Raises LockLost when the worker no longer holds the job, so that
+        the transaction of the batch processed rolls back and the handler
+        stops.
+        """
+        now = timezone.now()
+        self.done = done
+        if total is not None:
+            self.total = total
+
+        if not Job.objects.filter(pk=self.pk, status=Job.RUNNING,
+                                  locked_by=self.locked_by).update(
+                done=self.done, total=self.total, locked_at=now, updated=now):
+            raise LockLost('{} is no longer held by {}.'.format(self, self.locked_by))
+
+    def succeed(self, result):
+        self.finish(Job.SUCCEEDED, result=json.dumps(result), error='')
+
+    def fail(self, error, retry=True):
+        """
+        Queues the job again after a delay doubling at every attempt, or
+        fails it once it ran out of attempts.
+        """
+        if retry and self.attempts < self.max_attempts:
+            delay = settings.JOBS_RETRY_DELAY * 2 ** (self.attempts - 1)
+            self.finish(Job.QUEUED, error=error,
+                        run_after=timezone.now() + timedelta(seconds=delay))
+        else:
+            self.finish(Job.FAILED, error=error)
+
+    def finish(self, status, **values):
+        now = timezone.now()
+        values.update(status=status, locked_by='', locked_at=None, updated=now,
+                      finished=now if status in (Job.SUCCEEDED, Job.FAILED) else None)
+
+        # Only the worker holding the job may finish it.
+        if Job.objects.filter(pk=self.pk, status=Job.RUNNING,
+                              locked_by=self.locked_by).update(**values):
+            for name, value in values.items():
+                setattr(self, name, value)
@@ -0,0 +1,46 @@
+import json
+
+from django.conf import settings
+
+from rest_framework import serializers
+
+from .models import Job
+
+
+class JobCreateSerializer(serializers.ModelSerializer):
+    arguments = serializers.JSONField(required=False)
+
+    class Meta:
+        model = Job
+        fields = ('kind', 'arguments')
+
+    def validate_kind(self, value):
+        if value not in settings.JOBS_HANDLERS:
+            raise serializers.ValidationError('Choose a kind among {}.'.format(
+                ', '.join(sorted(settings.JOBS_HANDLERS))))
+
+        return value
+
+    def validate_arguments(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError('Expected an object of arguments.')
+
+        arguments = json.dumps(value)
+        max_length = settings.JOBS_ARGUMENTS_MAX_LENGTH
+
+        if len(arguments) > max_length:
+            raise serializers.ValidationError(
+                'Ensure the encoded arguments have no more than {} characters.'.format(
+                    max_length))
+
+        return arguments
+
+
+class JobSerializer(serializers.ModelSerializer):
+    status = serializers.CharField(source='get_status_display')
+    result = serializers.JSONField(source='get_result')
+
+    class Meta:
+        model = Job
+        fields = ('id', 'kind', 'status', 'done', 'total', 'attempts', 'max_attempts',
+                  'error', 'result', 'created', 'updated', 'finished')
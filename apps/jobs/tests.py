@@ -0,0 +1,485 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.urlresolvers import resolve
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from rest_framework.test import force_authenticate, APIRequestFactory
+
+from apps.tasks.models import Task, TaskCounter
+
+from .handlers import JobError, run_job
+from .models import Job
+from .views import JobDetail, JobFile, JobSubmit
+
+User = get_user_model()
+
+TEST_HANDLERS = {
+    'echo': 'apps.jobs.tests.echo',
+    'flaky': 'apps.jobs.tests.flaky',
+    'invalid': 'apps.jobs.tests.invalid',
+    'import_tasks': 'apps.tasks.jobs.import_tasks',
+    'export_tasks': 'apps.tasks.jobs.export_tasks',
+    'rebuild_task_counters': 'apps.tasks.jobs.rebuild_task_counters',
+}
+
+
+def echo(job, arguments):
+    job.set_progress(1, 1)
+    return arguments
+
+
+def flaky(job, arguments):
+    raise ValueError('Try again')
+
+
+def invalid(job, arguments):
+    raise JobError('Bad arguments')
+
+
+class JobsURLsTestCase(TestCase):
+    """
+    Job urls testcases
+    """
+    def test_job_submit_url_uses_job_submit_view(self):
+        """
+        Test that the job submit url resolves to the correct
+        view function.
+        """
+        job_submit = resolve('/api/v1/jobs/')
+        job_submit_func_name = str(job_submit.func).split()[1]
+        self.assertEqual(job_submit_func_name, "JobSubmit")
+
+    def test_job_detail_url_uses_job_detail_view(self):
+        """
+        Test that the job detail url resolves to the correct
+        view function.
+        """
+        job_detail = resolve('/api/v1/jobs/1/')
+        job_detail_func_name = str(job_detail.func).split()[1]
+        self.assertEqual(job_detail_func_name, "JobDetail")
+
+    def test_job_file_url_uses_job_file_view(self):
+        """
+        Test that the job file url resolves to the correct
+        view function.
+        """
+        job_file = resolve('/api/v1/jobs/1/file/')
+        job_file_func_name = str(job_file.func).split()[1]
+        self.assertEqual(job_file_func_name, "JobFile")
+
+
+class JobQuerySetTestCase(TestCase):
+    """
+    JobQuerySet tests
+    """
+    def setUp(self):
+        self.user = User.objects.create(username="master")
+
+    def test_claim_due_jobs(self):
+        """
+        Tests that claim runs the due queued jobs, oldest first, up to the
+        limit, and never claims a job twice.
+        """
+        first = Job.objects.create(kind='echo', owner=self.user)
+        second = Job.objects.create(kind='echo', owner=self.user)
+        Job.objects.create(kind='echo', owner=self.user,
+                           run_after=timezone.now() + timedelta(minutes=1))
+
+        self.assertEqual(Job.objects.claim('worker', 1), [first])
+        self.assertEqual(Job.objects.claim('other', 5), [second])
+        self.assertEqual(Job.objects.claim('worker', 5), [])
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, Job.RUNNING)
+        self.assertEqual(first.attempts, 1)
+        self.assertEqual(first.locked_by, 'worker')
+
+    def test_requeue_stale_jobs(self):
+        """
+        Tests that running jobs without news for JOBS_LOCK_TIMEOUT are
+        queued again.
+        """
+        stale = Job.objects.create(kind='echo', owner=self.user, status=Job.RUNNING,
+                                   locked_by='worker',
+                                   locked_at=timezone.now() - timedelta(seconds=60))
+        Job.objects.create(kind='echo', owner=self.user, status=Job.RUNNING,
+                           locked_by='worker', locked_at=timezone.now())
+
+        with self.settings(JOBS_LOCK_TIMEOUT=30):
+            self.assertEqual(Job.objects.requeue_stale(), (1, 0))
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, Job.QUEUED)
+        self.assertEqual(stale.locked_by, '')
+
+    def test_fail_stale_jobs_out_of_attempts(self):
+        """
+        Tests that stale jobs which used up their attempts are failed rather
+        than queued again.
+        """
+        locked_at = timezone.now() - timedelta(seconds=60)
+        exhausted = Job.objects.create(kind='echo', owner=self.user, status=Job.RUNNING,
+                                       attempts=3, max_attempts=3,
+                                       locked_by='worker', locked_at=locked_at)
+        retried = Job.objects.create(kind='echo', owner=self.user, status=Job.RUNNING,
+                                     attempts=2, max_attempts=3,
+                                     locked_by='worker', locked_at=locked_at)
+
+        with self.settings(JOBS_LOCK_TIMEOUT=30):
+            self.assertEqual(Job.objects.requeue_stale(), (1, 1))
+
+        exhausted.refresh_from_db()
+        retried.refresh_from_db()
+        self.assertEqual(exhausted.status, Job.FAILED)
+        self.assertEqual(exhausted.locked_by, '')
+        self.assertIsNotNone(exhausted.finished)
+        self.assertEqual(retried.status, Job.QUEUED)
+
+
+class RunJobTestCase(TestCase):
+    """
+    run_job tests
+    """
+    def setUp(self):
+        self.user = User.objects.create(username="master")
+
+    def run_job(self, kind, arguments=None, max_attempts=3):
+        job = Job.objects.create(kind=kind, owner=self.user, max_attempts=max_attempts,
+                                 arguments=json.dumps(arguments or {}))
+        Job.objects.claim('worker', 1)
+
+        with self.settings(JOBS_HANDLERS=TEST_HANDLERS, JOBS_RETRY_DELAY=10):
+            run_job(job.pk)
+
+        job.refresh_from_db()
+        return job
+
+    def test_succeeded_job(self):
+        """
+        Tests that the result and progress of a succeeded job are recorded.
+        """
+        job = self.run_job('echo', {'answer': 42})
+
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.get_result(), {'answer': 42})
+        self.assertEqual((job.done, job.total), (1, 1))
+        self.assertIsNotNone(job.finished)
+        self.assertEqual(job.locked_by, '')
+
+    def test_failed_job_is_retried(self):
+        """
+        Tests that a failed job is queued again after a delay, and fails
+        once it ran out of attempts.
+        """
+        job = self.run_job('flaky')
+
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('ValueError: Try again', job.error)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=5))
+
+        job = self.run_job('flaky', max_attempts=1)
+
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIsNotNone(job.finished)
+
+    def test_job_error_is_not_retried(self):
+        """
+        Tests that JobError and unknown kinds fail jobs without retries.
+        """
+        job = self.run_job('invalid')
+        self.assertEqual((job.status, job.error), (Job.FAILED, 'Bad arguments'))
+
+        job = self.run_job('unknown')
+        self.assertEqual((job.status, job.error), (Job.FAILED, 'Unknown job kind unknown.'))
+
+
+class TaskJobsTestCase(TestCase):
+    """
+    Task job handlers tests
+    """
+    def setUp(self):
+        self.user = User.objects.create(username="master")
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_job(self, kind, arguments=None, **values):
+        job = Job.objects.create(kind=kind, owner=self.user,
+                                 arguments=json.dumps(arguments or {}), **values)
+        Job.objects.claim('worker', 1)
+
+        with self.settings(JOBS_HANDLERS=TEST_HANDLERS, JOBS_FILES_DIR=self.directory,
+                           TASKS_BULK_CREATE_BATCH_SIZE=2):
+            run_job(job.pk)
+
+        job.refresh_from_db()
+        return job
+
+    def test_import_tasks(self):
+        """
+        Tests that importing creates and counts the tasks in batches.
+        """
+        job = self.run_job('import_tasks', {'tasks': [
+            {'name': 'One'}, {'name': 'Two', 'description': 'Second'}, {'name': 'Three'},
+        ]})
+
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.get_result(), {'created': 3})
+        self.assertEqual((job.done, job.total), (3, 3))
+        self.assertEqual(list(Task.objects.filter(owner=self.user).order_by('pk')
+                              .values_list('name', flat=True)), ['One', 'Two', 'Three'])
+        self.assertEqual(TaskCounter.objects.get(owner=self.user).pending, 3)
+
+    def test_import_tasks_resumes(self):
+        """
+        Tests that a retried import skips the tasks already created.
+        """
+        job = self.run_job('import_tasks', {'tasks': [
+            {'name': 'One'}, {'name': 'Two'}, {'name': 'Three'},
+        ]}, done=2, attempts=1)
+
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(list(Task.objects.values_list('name', flat=True)), ['Three'])
+
+    def test_import_tasks_stops_once_the_job_is_lost(self):
+        """
+        Tests that an import taken over by another worker rolls back the
+        batch being created and stops, leaving the job to the other worker.
+        """
+        def steal(owner_id):
+            Job.objects.update(locked_by='other')
+
+        with mock.patch('apps.tasks.jobs.invalidate_task_list', side_effect=steal):
+            job = self.run_job('import_tasks', {'tasks': [
+                {'name': 'One'}, {'name': 'Two'}, {'name': 'Three'},
+            ]})
+
+        self.assertEqual((job.status, job.locked_by, job.done), (Job.RUNNING, 'other', 2))
+        self.assertEqual(job.error, '')
+        self.assertEqual(list(Task.objects.order_by('pk').values_list('name', flat=True)),
+                         ['One', 'Two'])
+
+    def test_import_invalid_tasks(self):
+        """
+        Tests that an import of invalid tasks fails without creating any.
+        """
+        job = self.run_job('import_tasks', {'tasks': [{'name': 'One'}, {'name': ''}]})
+
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertTrue(job.error.startswith('Invalid tasks'))
+        self.assertFalse(Task.objects.exists())
+
+    def test_import_too_many_tasks(self):
+        """
+        Tests that an import of more than TASKS_IMPORT_MAX_SIZE tasks fails
+        without creating any.
+        """
+        with self.settings(TASKS_IMPORT_MAX_SIZE=1):
+            job = self.run_job('import_tasks', {'tasks': [{'name': 'One'}, {'name': 'Two'}]})
+
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 1)
+        self.assertFalse(Task.objects.exists())
+
+    def test_export_tasks(self):
+        """
+        Tests that exporting writes the user's tasks to a file.
+        """
+        Task.objects.create(name='One', owner=self.user)
+        Task.objects.create(name='Two', owner=self.user)
+        Task.objects.create(name='Other', owner=User.objects.create(username="puppet"))
+
+        job = self.run_job('export_tasks')
+
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.get_result(), {'exported': 2,
+                                            'file': 'tasks-{}.ndjson'.format(job.pk)})
+
+        with open(os.path.join(self.directory, job.get_result()['file'])) as export_file:
+            names = [json.loads(line)['name'] for line in export_file]
+        self.assertEqual(names, ['One', 'Two'])
+
+    def test_rebuild_task_counters(self):
+        """
+        Tests that users recount their own tasks, and staff everyone's.
+        """
+        other_user = User.objects.create(username="puppet")
+        Task.objects.create(name='One', owner=self.user)
+        Task.objects.create(name='Two', owner=other_user)
+        TaskCounter.objects.update(pending=5)
+
+        job = self.run_job('rebuild_task_counters')
+
+        self.assertEqual(job.get_result(), {'recounted': 1})
+        self.assertEqual(TaskCounter.objects.get(owner=self.user).pending, 1)
+        self.assertEqual(TaskCounter.objects.get(owner=other_user).pending, 5)
+
+        self.user.is_staff = True
+        self.user.save()
+        job = self.run_job('rebuild_task_counters')
+
+        self.assertEqual(job.get_result(), {'recounted': 2})
+        self.assertEqual(TaskCounter.objects.get(owner=other_user).pending, 1)
+
+
+class JobViewsTestCase(TestCase):
+    """
+    JobSubmit, JobDetail and JobFile views tests
+    """
+    def setUp(self):
+        self.user = User.objects.create(username="master")
+        self.factory = APIRequestFactory()
+
+    def submit(self, data, user=None):
+        request = self.factory.post('/api/v1/jobs/', data, format='json')
+        if user is not None:
+            force_authenticate(request, user=user)
+
+        with self.settings(JOBS_HANDLERS=TEST_HANDLERS):
+            return JobSubmit.as_view()(request)
+
+    def get(self, view, url, pk, user=None):
+        request = self.factory.get(url)
+        force_authenticate(request, user=user or self.user)
+
+        return view.as_view()(request, pk=str(pk))
+
+    def test_submit_job(self):
+        """
+        Tests that a submitted job is queued for the user.
+        """
+        response = self.submit({'kind': 'echo', 'arguments': {'answer': 42}}, self.user)
+
+        job = Job.objects.get()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Location'], 'http://testserver/api/v1/jobs/{}/'.format(job.pk))
+        self.assertEqual(response.data['status'], 'Queued')
+        self.assertEqual((job.owner, job.get_arguments()), (self.user, {'answer': 42}))
+
+    def test_submit_invalid_job(self):
+        """
+        Tests that jobs of unknown kinds or with arguments other than an
+        object are refused.
+        """
+        self.assertEqual(self.submit({'kind': 'unknown'}, self.user).status_code, 400)
+        self.assertEqual(self.submit({'kind': 'echo', 'arguments': [1]}, self.user)
+                         .status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_submit_job_with_too_long_arguments(self):
+        """
+        Tests that jobs whose encoded arguments are longer than
+        JOBS_ARGUMENTS_MAX_LENGTH are refused.
+        """
+        with self.settings(JOBS_ARGUMENTS_MAX_LENGTH=20):
+            response = self.submit({'kind': 'echo', 'arguments': {'answer': 'a' * 10}},
+                                   self.user)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('arguments', response.data)
+        self.assertFalse(Job.objects.exists())
+
+    def test_submit_job_not_authenticated(self):
+        """
+        Tests that submitting a job needs an authenticated user.
+        """
+        self.assertEqual(self.submit({'kind': 'echo'}).status_code, 401)
+
+    def test_job_detail(self):
+        """
+        Tests that users get the status of their own jobs only.
+        """
+        job = Job.objects.create(kind='echo', owner=self.user, status=Job.SUCCEEDED,
+                                 done=3, total=3, result='{"answer": 42}')
+
+        response = self.get(JobDetail, '/api/v1/jobs/{}/'.format(job.pk), job.pk)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'Succeeded')
+        self.assertEqual(response.data['result'], {'answer': 42})
+        self.assertEqual((response.data['done'], response.data['total']), (3, 3))
+
+        response = self.get(JobDetail, '/api/v1/jobs/{}/'.format(job.pk), job.pk,
+                            user=User.objects.create(username="puppet"))
+        self.assertEqual(response.status_code, 404)
+
+    def test_job_file(self):
+        """
+        Tests that the file of a succeeded job is downloaded.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, 'tasks-1.ndjson'), 'w') as export_file:
+            export_file.write('{"name": "One"}\n')
+
+        job = Job.objects.create(kind='export_tasks', owner=self.user, status=Job.SUCCEEDED,
+                                 result='{"file": "tasks-1.ndjson"}')
+        queued = Job.objects.create(kind='export_tasks', owner=self.user)
+
+        with self.settings(JOBS_FILES_DIR=directory):
+            response = self.get(JobFile, '/api/v1/jobs/{}/file/'.format(job.pk), job.pk)
+            content = b''.join(response.streaming_content)
+            missing = self.get(JobFile, '/api/v1/jobs/{}/file/'.format(queued.pk), queued.pk)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, b'{"name": "One"}\n')
+        self.assertEqual(missing.status_code, 404)
+
+
+class SerialPool(object):
+    """
+    A pool running the jobs as they are submitted. The in-memory test
+    database fails concurrent writes with "table is locked" rather than
+    waiting on the busy timeout, so the command is tested without threads.
+    """
+    def __init__(self, processes):
+        pass
+
+    def apply_async(self, func, args, callback, error_callback):
+        try:
+            result = func(*args)
+        except Exception as e:
+            error_callback(e)
+        else:
+            callback(result)
+
+    def close(self):
+        pass
+
+    def join(self):
+        pass
+
+
+class RunJobsCommandTestCase(TransactionTestCase):
+    """
+    run_jobs command tests
+    """
+    def test_run_jobs_once(self):
+        """
+        Tests that the worker runs the due jobs on its pool, then exits.
+        """
+        user = User.objects.create(username="master")
+        jobs = [Job.objects.create(kind='echo', owner=user, arguments=json.dumps({'n': n}))
+                for n in range(3)]
+        Job.objects.create(kind='invalid', owner=user)
+
+        out = StringIO()
+        with self.settings(JOBS_HANDLERS=TEST_HANDLERS), \
+                mock.patch('apps.jobs.management.commands.run_jobs.ThreadPool', SerialPool):
+            call_command('run_jobs', concurrency=1, poll=0.01, once=True, stdout=out)
+
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)),
+                         {Job.SUCCEEDED, Job.FAILED})
+        self.assertEqual([Job.objects.get(pk=job.pk).get_result() for job in jobs],
+                         [{'n': 0}, {'n': 1}, {'n': 2}])
+        self.assertIn('failed, attempt 1 of 3: Bad arguments', out.getvalue())
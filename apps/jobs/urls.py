@@ -0,0 +1,12 @@
+from django.conf.urls import url
+from rest_framework.urlpatterns import format_suffix_patterns
+
+from . import views
+
+api_patterns = [
+    url(r'^jobs/(?P<pk>[0-9]+)/file/$', views.JobFile.as_view()),
+    url(r'^jobs/(?P<pk>[0-9]+)/$', views.JobDetail.as_view()),
+    url(r'^jobs/$', views.JobSubmit.as_view()),
+]
+
+api_patterns = format_suffix_patterns(api_patterns)
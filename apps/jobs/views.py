@@ -0,0 +1,74 @@
+import os
+
+from django.http import FileResponse
+
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.users.authentication import CachedTokenAuthentication
+
+from .handlers import get_file_path
+from .models import Job
+from .serializers import JobCreateSerializer, JobSerializer
+
+
+class JobSubmit(APIView):
+    """
+    Queues a job for the run_jobs workers when called via POST.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    throttle_scope = 'jobs_submit'
+
+    def post(self, request, format=None):
+        serializer = JobCreateSerializer(data=request.data)
+
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        job = serializer.save(owner=request.user)
+
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED, headers={
+            'Location': request.build_absolute_uri('{}/'.format(job.pk)),
+        })
+
+
+class JobDetail(APIView):
+    """
+    Returns the status, progress and result of a job.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    throttle_scope = 'jobs_status'
+
+    def get(self, request, pk, format=None):
+        try:
+            job = Job.objects.get(pk=pk, owner=request.user)
+        except Job.DoesNotExist:
+            return Response({}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(JobSerializer(job).data)
+
+
+class JobFile(APIView):
+    """
+    Downloads the file written by a succeeded job, such as a task export.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    throttle_scope = 'jobs_status'
+
+    def get(self, request, pk, format=None):
+        job = Job.objects.filter(pk=pk, owner=request.user, status=Job.SUCCEEDED).first()
+        name = (job.get_result() or {}).get('file') if job is not None else None
+
+        if name is None or not os.path.exists(get_file_path(name)):
+            return Response({}, status=status.HTTP_404_NOT_FOUND)
+
+        response = FileResponse(open(get_file_path(name), 'rb'),
+                                content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(name)
+
+        return response
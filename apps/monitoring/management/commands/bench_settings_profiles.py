@@ -0,0 +1,84 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter per profile, so that nothing is imported yet.
+PROFILE_SCRIPT = '''
+import json
+import time
+
+started = time.time()
+
+import django
+django.setup()
+
+from django.core.wsgi import get_wsgi_application
+from django.test import Client
+
+application = get_wsgi_application()
+setup = time.time() - started
+
+client = Client()
+started = time.time()
+client.get({path!r})
+first_request = time.time() - started
+
+started = time.time()
+for _ in range({requests}):
+    client.get({path!r})
+per_request = (time.time() - started) / {requests}
+
+print(json.dumps({{
+    'setup': setup,
+    'first_request': first_request,
+    'per_request': per_request,
+}}))
+'''
+
+
+class Command(BaseCommand):
+    help = ("Compares the startup time and per-request overhead of settings "
+            "profiles, each in a fresh interpreter.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='project.settings,project.settings_api',
+                            help='Comma separated settings modules to compare.')
+        parser.add_argument('--path', default='/api/v1/tasks/',
+                            help='Path requested without credentials, so that the request '
+                                 'goes through the middleware and authentication only.')
+        parser.add_argument('--requests', type=int, default=2000,
+                            help='Number of requests timed per profile.')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Number of interpreters started per profile.')
+
+    def handle(self, *args, **options):
+        script = PROFILE_SCRIPT.format(path=options['path'], requests=options['requests'])
+
+        self.stdout.write('{:<24} {:>10} {:>16} {:>14}'.format(
+            'profile', 'setup ms', 'first request ms', 'per request us'))
+
+        for profile in options['profiles'].split(','):
+            runs = [self.run(script, profile.strip()) for _ in range(options['repeat'])]
+
+            self.stdout.write('{:<24} {:>10.1f} {:>16.1f} {:>14.1f}'.format(
+                profile,
+                min(run['setup'] for run in runs) * 1000,
+                min(run['first_request'] for run in runs) * 1000,
+                min(run['per_request'] for run in runs) * 1000000))
+
+    @staticmethod
+    def run(script, profile):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=profile)
+
+        try:
+            output = subprocess.check_output([sys.executable, '-c', script],
+                                             cwd=settings.BASE_DIR, env=env)
+        except subprocess.CalledProcessError as e:
+            raise CommandError('The {} profile failed with exit code {}'.format(
+                profile, e.returncode))
+
+        return json.loads(output.decode('utf-8').strip().splitlines()[-1])
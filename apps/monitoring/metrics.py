@@ -0,0 +1,165 @@
+"""
+Request metrics, exposed in the Prometheus text format.
+
+Metrics are kept in the memory of each server process, so every process
+has to be scraped on its own. Besides the request metrics, the metrics
+page includes the samples of the METRICS_COLLECTORS callables, which
+return (name, type, description, value) tuples, optionally followed by a
+dict of labels.
+"""
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+
+    return '{{{}}}'.format(','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\')
+                         .replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs))
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(object):
+    type = None
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def header(self):
+        return ['# HELP {} {}'.format(self.name, self.description),
+                '# TYPE {} {}'.format(self.name, self.type)]
+
+    def reset(self):
+        with self._lock:
+            self.values = {}
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *label_values, **kwargs):
+        amount = kwargs.get('amount', 1)
+
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self.values.items())
+
+        return self.header() + [
+            '{}{} {}'.format(self.name, format_labels(self.labels, label_values),
+                             format_value(value))
+            for label_values, value in values
+        ]
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, description, buckets, labels=()):
+        super(Histogram, self).__init__(name, description, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        # Observations are counted in their own bucket only, and the buckets
+        # are accumulated when rendered.
+        index = bisect_left(self.buckets, value)
+
+        with self._lock:
+            state = self.values.get(label_values)
+            if state is None:
+                state = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0, 0]
+
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        with self._lock:
+            values = sorted((label_values, [list(state[0]), state[1], state[2]])
+                            for label_values, state in self.values.items())
+
+        lines = self.header()
+
+        for label_values, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                lines.append('{}_bucket{} {}'.format(
+                    self.name,
+                    format_labels(self.labels, label_values, [('le', format_value(bound))]),
+                    cumulative))
+
+            labels = format_labels(self.labels, label_values)
+            lines.append('{}_sum{} {}'.format(self.name, labels, format_value(total)))
+            lines.append('{}_count{} {}'.format(self.name, labels, count))
+
+        return lines
+
+
+request_duration = Histogram(
+    'http_request_duration_seconds', 'Time spent serving requests.',
+    DURATION_BUCKETS, labels=('view',))
+request_db_queries = Histogram(
+    'http_request_db_queries', 'Number of database queries per request.',
+    QUERY_COUNT_BUCKETS, labels=('view',))
+request_db_duration = Histogram(
+    'http_request_db_duration_seconds', 'Time spent in database queries per request.',
+    DURATION_BUCKETS, labels=('view',))
+request_render_duration = Histogram(
+    'http_request_render_duration_seconds', 'Time spent rendering responses.',
+    DURATION_BUCKETS, labels=('view',))
+response_size = Histogram(
+    'http_response_size_bytes', 'Size of the response bodies, streams excluded.',
+    SIZE_BUCKETS, labels=('view',))
+responses = Counter(
+    'http_responses_total', 'Number of responses sent.', labels=('view', 'status'))
+
+REQUEST_METRICS = (request_duration, request_db_queries, request_db_duration,
+                   request_render_duration, response_size, responses)
+
+
+def render_metrics():
+    lines = []
+
+    for metric in REQUEST_METRICS:
+        lines.extend(metric.render())
+
+    families = OrderedDict()
+    for path in settings.METRICS_COLLECTORS:
+        for sample in import_string(path)():
+            name, kind, description, value = sample[:4]
+            labels = sorted(sample[4].items()) if len(sample) > 4 else []
+            families.setdefault((name, kind, description), []).append((labels, value))
+
+    for (name, kind, description), samples in families.items():
+        lines.extend(['# HELP {} {}'.format(name, description),
+                      '# TYPE {} {}'.format(name, kind)])
+        lines.extend('{}{} {}'.format(name, format_labels(*zip(*labels)) if labels else '',
+                                      format_value(value))
+                     for labels, value in samples)
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,77 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+
+
+class MetricsMiddleware(object):
+    """
+    Records the time spent on every request, in its database queries and
+    in rendering its response, along with the size of the response, and
+    sends them back on a Server-Timing header.
+
+    Database queries are timed by Django's debug cursor, which is turned
+    on for the duration of the request. The middleware is left out when
+    METRICS_ENABLED is off, so it costs nothing then.
+    """
+    def __init__(self):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+
+    def process_request(self, request):
+        request.metrics_view = 'unresolved'
+        request.metrics_render_duration = 0
+        request.metrics_debug_cursors = {}
+
+        for connection in connections.all():
+            request.metrics_debug_cursors[connection.alias] = connection.force_debug_cursor
+            connection.force_debug_cursor = True
+            connection.queries_log.clear()
+
+        request.metrics_started = time.time()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = getattr(view_func, '__name__', type(view_func).__name__)
+
+    def process_template_response(self, request, response):
+        started = time.time()
+
+        def rendered(response):
+            request.metrics_render_duration = time.time() - started
+
+        response.add_post_render_callback(rendered)
+
+        return response
+
+    def process_response(self, request, response):
+        if not hasattr(request, 'metrics_started'):
+            # An earlier middleware answered the request.
+            return response
+
+        duration = time.time() - request.metrics_started
+        queries, db_duration = 0, 0
+
+        for alias, force_debug_cursor in request.metrics_debug_cursors.items():
+            connection = connections[alias]
+            queries += len(connection.queries_log)
+            db_duration += sum(float(query['time']) for query in connection.queries_log)
+            connection.force_debug_cursor = force_debug_cursor
+
+        view = request.metrics_view
+        metrics.request_duration.observe(duration, view)
+        metrics.request_db_queries.observe(queries, view)
+        metrics.request_db_duration.observe(db_duration, view)
+        metrics.request_render_duration.observe(request.metrics_render_duration, view)
+        metrics.responses.inc(view, response.status_code)
+        if not response.streaming:
+            metrics.response_size.observe(len(response.content), view)
+
+        response['Server-Timing'] = (
+            'app;dur={:.3f}, db;dur={:.3f};desc="{} queries", render;dur={:.3f}'.format(
+                duration * 1000, db_duration * 1000, queries,
+                request.metrics_render_duration * 1000))
+
+        return response
@@ -0,0 +1,170 @@
+from django.contrib.auth import get_user_model
+from django.core.urlresolvers import resolve
+from django.test import Client, SimpleTestCase, TestCase
+
+from rest_framework.authtoken.models import Token
+
+from apps.tasks.models import Task
+
+from . import metrics
+from .metrics import Counter, Histogram, render_metrics
+
+User = get_user_model()
+
+
+def labelled_samples():
+    return [
+        ('throttled_total', 'counter', 'Throttled requests.', 2, {'scope': 'list'}),
+        ('throttled_total', 'counter', 'Throttled requests.', 1, {'scope': 'solve'}),
+        ('up', 'gauge', 'Whether the server is up.', 1),
+    ]
+
+
+class MonitoringURLsTestCase(SimpleTestCase):
+    """
+    Monitoring urls testcases
+    """
+    def test_metrics_url_uses_metrics_view(self):
+        """
+        Test that the metrics url resolves to the correct
+        view function.
+        """
+        metrics_view = resolve('/metrics')
+        self.assertEqual(metrics_view.func.__name__, 'metrics')
+
+
+class MetricsTestCase(SimpleTestCase):
+    """
+    Counter and Histogram tests
+    """
+    def test_counter_render(self):
+        """
+        Tests that a counter renders a sample per label values.
+        """
+        counter = Counter('requests_total', 'Requests.', labels=('view',))
+        counter.inc('TaskList')
+        counter.inc('TaskList', amount=2)
+        counter.inc('Task"Detail')
+
+        self.assertEqual(counter.render(), [
+            '# HELP requests_total Requests.',
+            '# TYPE requests_total counter',
+            'requests_total{view="Task\\"Detail"} 1',
+            'requests_total{view="TaskList"} 3',
+        ])
+
+    def test_histogram_render(self):
+        """
+        Tests that a histogram renders cumulative buckets, a sum and a count.
+        """
+        histogram = Histogram('size_bytes', 'Sizes.', buckets=(10, 100))
+        for value in (5, 10, 50, 500):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.render(), [
+            '# HELP size_bytes Sizes.',
+            '# TYPE size_bytes histogram',
+            'size_bytes_bucket{le="10"} 2',
+            'size_bytes_bucket{le="100"} 3',
+            'size_bytes_bucket{le="+Inf"} 4',
+            'size_bytes_sum 565',
+            'size_bytes_count 4',
+        ])
+
+    def test_render_collector_samples(self):
+        """
+        Tests that the collector samples are grouped under a single header
+        per metric, with their labels.
+        """
+        with self.settings(METRICS_COLLECTORS=['apps.monitoring.tests.labelled_samples']):
+            lines = render_metrics().splitlines()
+
+        self.assertEqual(lines[-7:], [
+            '# HELP throttled_total Throttled requests.',
+            '# TYPE throttled_total counter',
+            'throttled_total{scope="list"} 2',
+            'throttled_total{scope="solve"} 1',
+            '# HELP up Whether the server is up.',
+            '# TYPE up gauge',
+            'up 1',
+        ])
+
+
+class MetricsMiddlewareTestCase(TestCase):
+    """
+    MetricsMiddleware and metrics view tests
+    """
+    def setUp(self):
+        self.user = User.objects.create(username="master")
+        Task.objects.create(name='One', owner=self.user)
+        self.token = Token.objects.create(user=self.user)
+
+        self.client = Client(HTTP_AUTHORIZATION='Token {}'.format(self.token.key))
+
+        for metric in metrics.REQUEST_METRICS:
+            metric.reset()
+
+    def test_server_timing_header(self):
+        """
+        Tests that responses have a Server-Timing header with the app,
+        database and render times, and the number of queries.
+        """
+        with self.settings(METRICS_ENABLED=True):
+            response = self.client.get('/api/v1/tasks/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'],
+                         r'^app;dur=[0-9.]+, db;dur=[0-9.]+;desc="[1-9][0-9]* queries", '
+                         r'render;dur=[0-9.]+$')
+
+    def test_requests_are_recorded(self):
+        """
+        Tests that the request metrics are labelled with the view name.
+        """
+        with self.settings(METRICS_ENABLED=True):
+            self.client.get('/api/v1/tasks/')
+            content = self.client.get('/metrics').content.decode('utf-8')
+
+        self.assertIn('http_request_duration_seconds_count{view="TaskList"} 1', content)
+        self.assertIn('http_request_db_queries_count{view="TaskList"} 1', content)
+        self.assertIn('http_response_size_bytes_count{view="TaskList"} 1', content)
+        self.assertIn('http_responses_total{view="TaskList",status="200"} 1', content)
+
+    def test_disabled_metrics(self):
+        """
+        Tests that nothing is recorded when METRICS_ENABLED is off.
+        """
+        with self.settings(METRICS_ENABLED=False):
+            response = self.client.get('/api/v1/tasks/')
+            content = self.client.get('/metrics').content.decode('utf-8')
+
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertNotIn('view="TaskList"', content)
+
+    def test_metrics_are_served_to_scrapers_only(self):
+        """
+        Tests that the metrics page is hidden from other addresses than
+        METRICS_ALLOWED_ADDRESSES, unless they send the METRICS_TOKEN.
+        """
+        client = Client(REMOTE_ADDR='203.0.113.7')
+
+        with self.settings(METRICS_TOKEN=''):
+            self.assertEqual(client.get('/metrics').status_code, 404)
+            self.assertEqual(client.get('/metrics', HTTP_AUTHORIZATION='Bearer ').status_code,
+                             404)
+
+        with self.settings(METRICS_TOKEN='secret'):
+            self.assertEqual(client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong')
+                             .status_code, 404)
+            self.assertEqual(client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+                             .status_code, 200)
+
+    def test_metrics_include_collectors(self):
+        """
+        Tests that the metrics page includes the samples of METRICS_COLLECTORS.
+        """
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        self.assertIn('# TYPE tasks_list_cache_hits_total counter',
+                      response.content.decode('utf-8'))
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from .metrics import render_metrics
+
+
+def is_scraper(request):
+    """
+    Returns whether the request comes from an address of
+    METRICS_ALLOWED_ADDRESSES, or carries the METRICS_TOKEN bearer token.
+    """
+    token = settings.METRICS_TOKEN
+    if token and constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''),
+                                       'Bearer {}'.format(token)):
+        return True
+
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_ADDRESSES
+
+
+def metrics(request):
+    """
+    Returns the metrics of this server process in the Prometheus text format,
+    to scrapers only.
+    """
+    if not is_scraper(request):
+        raise Http404()
+
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
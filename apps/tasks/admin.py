@@ -6,5 +6,5 @@ from .models import Task
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     list_filter = ['status', 'created', 'updated', 'owner']
-    search_fields = ['name', 'description', 'owner']
+    search_fields = ['name', 'description', 'owner__username']
     list_display = ['status', 'owner']
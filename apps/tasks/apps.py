@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class TasksConfig(AppConfig):
+    name = 'apps.tasks'
+    label = 'tasks'
+
+    def ready(self):
+        from . import signals  # noqa
@@ -0,0 +1,107 @@
+"""
+Per-user cache of the task list responses.
+
+Every cached response is keyed by its owner, the owner's current list
+version and the ETag of the response, which hashes its URL and the state
+of the owner's tasks. A cached page can so never disagree with the
+validators sent along, even when another process holds an outdated list
+version, and bumping the version only evicts the owner's cached pages
+sooner.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class CacheStats(object):
+    """
+    Thread safe hit and miss counters.
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+stats = CacheStats()
+
+
+def collect_metrics():
+    """
+    Returns the hit and miss counters as metric samples.
+    """
+    return [
+        ('tasks_list_cache_hits_total', 'counter', 'Number of task list cache hits.',
+         stats.hits),
+        ('tasks_list_cache_misses_total', 'counter', 'Number of task list cache misses.',
+         stats.misses),
+    ]
+
+
+def _version_key(owner_id):
+    return 'tasks:list-version:{}'.format(owner_id)
+
+
+def _get_version(owner_id):
+    version_key = _version_key(owner_id)
+    version = cache.get(version_key)
+
+    if version is None:
+        # Start from the current time rather than from 1, so that a version
+        # evicted from the cache is never reused for stale responses.
+        cache.add(version_key, int(time.time() * 1000000), timeout=None)
+        version = cache.get(version_key)
+
+    return version
+
+
+def task_list_key(owner_id, etag):
+    """
+    Returns the cache key of the task list response with the given ETag,
+    for the owner's current list version.
+    """
+    return 'tasks:list:{}:{}:{}'.format(owner_id, _get_version(owner_id), etag)
+
+
+def get_task_list(key):
+    """
+    Returns the cached (data, headers) of a task list response, or None.
+    """
+    cached = cache.get(key)
+
+    if cached is None:
+        stats.miss()
+    else:
+        stats.hit()
+
+    return cached
+
+
+def set_task_list(key, data, headers):
+    cache.set(key, (data, headers), settings.TASKS_LIST_CACHE_TIMEOUT)
+
+
+def invalidate_task_list(owner_id):
+    """
+    Invalidates every cached task list response of the owner.
+    """
+    try:
+        cache.incr(_version_key(owner_id))
+    except ValueError:
+        # There is no version yet, so nothing was cached for the owner.
+        pass
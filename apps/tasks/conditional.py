@@ -0,0 +1,71 @@
+"""
+ETag and Last-Modified validators for the task endpoints, so that
+conditional requests are answered with a 304 before serializing.
+"""
+import calendar
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import TaskCounter
+
+
+def make_etag(*parts):
+    """
+    Returns a strong ETag, unquoted, hashing the given parts.
+    """
+    value = '|'.join(str(part) for part in parts)
+
+    return hashlib.md5(value.encode('utf-8')).hexdigest()
+
+
+def task_list_validators(queryset, owner_id, *parts):
+    """
+    Returns the (etag, last modified date) of a task list of the owner,
+    using an aggregate query over its updated date and its number of tasks,
+    and the owner's task counter. Any other parts the list depends on, such
+    as its URL, are hashed on the ETag.
+
+    The counter changes whenever a task is created, deleted or changes
+    status, which the updated dates of the remaining tasks don't tell.
+    """
+    aggregate = queryset.aggregate(last_modified=Max('updated'), count=Count('pk'))
+    counter_updated = (TaskCounter.objects.filter(owner_id=owner_id)
+                       .values_list('updated', flat=True).first())
+    last_modified = max([date for date in (aggregate['last_modified'], counter_updated)
+                         if date is not None] or [None])
+    etag = make_etag(aggregate['count'],
+                     last_modified.isoformat() if last_modified else '',
+                     owner_id, *parts)
+
+    return etag, last_modified
+
+
+def not_modified_response(request, etag, last_modified):
+    """
+    Returns a 304 response when the request validators match the given
+    ones, or None when the resource has to be sent.
+    """
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=_timestamp(last_modified))
+
+    if response is not None:
+        set_validators(response, etag, last_modified)
+
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = quote_etag(etag)
+
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(_timestamp(last_modified))
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+
+    return calendar.timegm(value.utctimetuple())
@@ -0,0 +1,157 @@
+"""
+Notifications of changes to a user's tasks.
+
+Changes are published as events to a broker, which hands them to every
+event stream the owner of the tasks has open. The broker is chosen with
+the TASKS_EVENTS_BROKER setting: LocalBroker only reaches the streams
+served by its own process, so deployments running several server
+processes need a broker shared by all of them.
+
+Events only name the tasks that changed. Clients fetch the changes from
+the changes endpoint, which also catches them up on the events missed
+while they were disconnected.
+"""
+import threading
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from django.utils.six.moves import queue
+
+Event = namedtuple('Event', ['type', 'ids'])
+
+
+class TooManySubscriptions(Exception):
+    """
+    Raised when subscribing an owner who has TASKS_EVENTS_MAX_STREAMS
+    subscriptions open already.
+    """
+
+
+CREATED = 'created'
+UPDATED = 'updated'
+SOLVED = 'solved'
+DELETED = 'deleted'
+# Sent instead of the events a subscriber could not keep up with; the
+# ids are unknown, so clients have to sync.
+RESYNC = 'resync'
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.TASKS_EVENTS_BROKER)()
+
+        return _broker
+
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    global _broker
+
+    if setting == 'TASKS_EVENTS_BROKER':
+        with _broker_lock:
+            _broker = None
+
+
+def notify(owner_id, event_type, ids):
+    """
+    Publishes an event once the current transaction commits, so that
+    clients never fetch a change before it is visible. `ids` is None when
+    the changed tasks are not known.
+    """
+    event = Event(type=event_type, ids=ids)
+    transaction.on_commit(lambda: get_broker().publish(owner_id, event))
+
+
+class BaseBroker(object):
+    def publish(self, owner_id, event):
+        raise NotImplementedError('Brokers must implement .publish()')
+
+    def subscribe(self, owner_id):
+        """
+        Returns a subscription to the owner's events, with a
+        ``get(timeout)`` method returning the next event or None on
+        timeout, and a ``close()`` method. Raises TooManySubscriptions
+        when the owner has too many subscriptions open.
+        """
+        raise NotImplementedError('Brokers must implement .subscribe()')
+
+
+class LocalSubscription(object):
+    def __init__(self, broker, owner_id, max_size):
+        self.broker = broker
+        self.owner_id = owner_id
+        self.queue = queue.Queue(max_size)
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        if self.overflowed:
+            self.overflowed = False
+            self.clear()
+            return Event(type=RESYNC, ids=None)
+
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def clear(self):
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker(BaseBroker):
+    """
+    In-process broker handing every event to a bounded queue per
+    subscriber, so that a slow client never holds up the publishers.
+    """
+    def __init__(self):
+        self.subscriptions = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def publish(self, owner_id, event):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(owner_id, ()))
+
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def subscribe(self, owner_id):
+        subscription = LocalSubscription(self, owner_id, settings.TASKS_EVENTS_QUEUE_SIZE)
+
+        with self.lock:
+            if len(self.subscriptions.get(owner_id, ())) >= settings.TASKS_EVENTS_MAX_STREAMS:
+                raise TooManySubscriptions()
+
+            self.subscriptions[owner_id].add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.owner_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[subscription.owner_id]
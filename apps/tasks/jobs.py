@@ -0,0 +1,104 @@
+"""
+Background job handlers for the heavy task operations, see apps.jobs.
+"""
+import os
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from apps.jobs.handlers import JobError, get_file_path
+
+from . import events
+from .cache import invalidate_task_list
+from .models import Task, TaskCounter
+from .renderers import NDJSONRenderer
+from .serializers import TaskCreateSerializer, iter_task_chunks
+
+User = get_user_model()
+
+
+def import_tasks(job, arguments):
+    """
+    Creates the tasks of the ``tasks`` argument for the owner of the job,
+    in batches committed along with the job progress, so that a retried
+    import resumes after the last batch created.
+    """
+    data = arguments.get('tasks')
+    if not isinstance(data, list):
+        raise JobError('The tasks argument must be a list of tasks.')
+
+    max_size = settings.TASKS_IMPORT_MAX_SIZE
+    if len(data) > max_size:
+        raise JobError('The tasks argument has more than {} tasks.'.format(max_size))
+
+    serializer = TaskCreateSerializer(data=data, many=True)
+    if not serializer.is_valid():
+        raise JobError('Invalid tasks: {}'.format(serializer.errors))
+
+    batch_size = settings.TASKS_BULK_CREATE_BATCH_SIZE
+    validated_data = serializer.validated_data
+
+    for start in range(job.done, len(validated_data), batch_size):
+        batch = validated_data[start:start + batch_size]
+
+        with transaction.atomic():
+            tasks = serializer.create([dict(attrs, owner=job.owner) for attrs in batch])
+            job.set_progress(start + len(batch), len(validated_data))
+
+        invalidate_task_list(job.owner_id)
+        events.notify(job.owner_id, events.CREATED, [task.pk for task in tasks])
+
+    return {'created': len(validated_data)}
+
+
+def export_tasks(job, arguments):
+    """
+    Writes the tasks of the owner of the job to a newline delimited JSON
+    file, which is served by the job file endpoint.
+    """
+    name = 'tasks-{}.ndjson'.format(job.pk)
+    path = get_file_path(name)
+    renderer = NDJSONRenderer()
+    tasks = Task.objects.filter(owner_id=job.owner_id)
+
+    if not os.path.isdir(settings.JOBS_FILES_DIR):
+        os.makedirs(settings.JOBS_FILES_DIR)
+
+    done = 0
+    job.set_progress(done, tasks.count())
+
+    # Written aside and moved in place, so that the file is never seen
+    # halfway written.
+    with open(path + '.part', 'wb') as export_file:
+        for chunk in iter_task_chunks(tasks):
+            export_file.write(renderer.render(chunk))
+            done += len(chunk)
+            job.set_progress(done)
+
+    os.rename(path + '.part', path)
+
+    return {'exported': done, 'file': name}
+
+
+def rebuild_task_counters(job, arguments):
+    """
+    Recounts the tasks of the owner of the job, or of every user when the
+    owner is staff.
+    """
+    if job.owner.is_staff:
+        owners = list(User.objects.order_by('pk').values_list('pk', flat=True))
+    else:
+        owners = [job.owner_id]
+
+    batch_size = 500
+
+    for start in range(job.done, len(owners), batch_size):
+        batch = owners[start:start + batch_size]
+
+        with transaction.atomic():
+            for owner_id in batch:
+                TaskCounter.objects.rebuild(owner_id)
+            job.set_progress(start + len(batch), len(owners))
+
+    return {'recounted': len(owners)}
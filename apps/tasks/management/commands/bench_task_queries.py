@@ -0,0 +1,92 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.tasks.models import Task
+from apps.tasks.query_plans import check_plan, explain, task_queries
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Seeds a throwaway database with tasks and times the task endpoint "
+            "queries, failing if any of them stops using its index.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000000,
+                            help='Number of tasks to seed.')
+        parser.add_argument('--owners', type=int, default=1000,
+                            help='Number of users the tasks are spread across.')
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Number of tasks inserted per statement batch.')
+        parser.add_argument('--repeat', type=int, default=200,
+                            help='Number of times each query is timed.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The query plan checks only support SQLite.')
+
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False)
+
+        try:
+            owner_id, task_id = self.seed(options['rows'], options['owners'],
+                                          options['batch_size'])
+            self.run_queries(owner_id, task_id, options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed(self, rows, owners, batch_size):
+        self.stdout.write('Seeding {} tasks across {} users...'.format(rows, owners))
+
+        User.objects.bulk_create(
+            User(username='bench-{}'.format(i)) for i in range(owners))
+        owner_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+
+        started = time.time()
+        with transaction.atomic():
+            for offset in range(0, rows, batch_size):
+                Task.objects.bulk_create(
+                    Task(name='Task {}'.format(i),
+                         owner_id=owner_ids[i % owners],
+                         status=Task.SOLVED if i % 3 else Task.PENDING)
+                    for i in range(offset, min(offset + batch_size, rows))
+                )
+
+        connection.cursor().execute('ANALYZE')
+        self.stdout.write('Seeded in {:.1f}s'.format(time.time() - started))
+
+        owner_id = owner_ids[0]
+        task_id = Task.objects.filter(owner_id=owner_id).values_list(
+            'pk', flat=True).last()
+
+        return owner_id, task_id
+
+    def run_queries(self, owner_id, task_id, repeat):
+        failures = []
+        cursor = connection.cursor()
+
+        for name, (query_sql, params, expected) in task_queries(owner_id, task_id).items():
+            plan = explain(query_sql, params)
+            problems = check_plan(plan, expected)
+
+            timings = []
+            for _ in range(repeat):
+                started = time.time()
+                cursor.execute(query_sql, params)
+                cursor.fetchall()
+                timings.append((time.time() - started) * 1000)
+            timings.sort()
+
+            self.stdout.write('{:<16} median {:8.3f}ms  p99 {:8.3f}ms  {}'.format(
+                name, timings[len(timings) // 2],
+                timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+                ' | '.join(plan)))
+
+            if problems:
+                failures.append('{}: {}'.format(name, ', '.join(problems)))
+
+        if failures:
+            raise CommandError('Query plan regressions:\n' + '\n'.join(failures))
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from rest_framework.renderers import JSONRenderer
+
+from apps.tasks.models import Task
+from apps.tasks.serializers import TaskDetailSerializer, TaskListSerializer, \
+    TaskRowSerializer
+
+
+class Command(BaseCommand):
+    help = ("Compares the DRF task serializers with the values_list() row "
+            "serializer on in-memory tasks, checking they render the same bytes.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='10000,100000',
+                            help='Comma separated numbers of tasks to serialize.')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Number of times each serialization is timed.')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['rows'].split(',')]
+        renderer = JSONRenderer()
+
+        for size in sizes:
+            now = timezone.now()
+            tasks = [
+                Task(pk=i, name='Task {}'.format(i), description='Description {}'.format(i),
+                     status=Task.SOLVED if i % 3 else Task.PENDING,
+                     created=now, updated=now)
+                for i in range(1, size + 1)
+            ]
+
+            for serializer_class in (TaskListSerializer, TaskDetailSerializer):
+                fields = serializer_class.Meta.fields
+                row_serializer = TaskRowSerializer(fields)
+                rows = [tuple(getattr(task, field) for field in fields) for task in tasks]
+
+                drf_output, drf_time = self.time(
+                    lambda: renderer.render(serializer_class(tasks, many=True).data),
+                    options['repeat'])
+                row_output, row_time = self.time(
+                    lambda: renderer.render(row_serializer.serialize(rows)),
+                    options['repeat'])
+
+                if drf_output != row_output:
+                    raise CommandError('{} and TaskRowSerializer outputs differ'.format(
+                        serializer_class.__name__))
+
+                self.stdout.write('{:>7} rows  {:<20} {:8.1f}ms  TaskRowSerializer {:8.1f}ms  '
+                                  '{:5.1f}x'.format(size, serializer_class.__name__,
+                                                    drf_time, row_time, drf_time / row_time))
+
+    @staticmethod
+    def time(func, repeat):
+        """
+        Returns the output of the function and its best time in milliseconds.
+        """
+        best = None
+
+        for _ in range(repeat):
+            started = time.time()
+            output = func()
+            elapsed = (time.time() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+
+        return output, best
@@ -0,0 +1,120 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.six.moves import http_client
+from django.utils.six.moves.urllib import parse as urlparse
+
+
+class Command(BaseCommand):
+    help = ("Loads one or more running servers with concurrent keep-alive clients "
+            "and reports their throughput and latency percentiles, so that server "
+            "and worker setups can be compared on the same endpoint.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('servers', nargs='+', metavar='base_url',
+                            help='Base URL of every server to load, e.g. http://localhost:8000')
+        parser.add_argument('--path', default='/api/v1/tasks/',
+                            help='Path requested on every server.')
+        parser.add_argument('--method', default='GET', help='HTTP method of the requests.')
+        parser.add_argument('--token', help='Token sent on the Authorization header.')
+        parser.add_argument('--concurrency', type=int, default=50,
+                            help='Number of concurrent clients.')
+        parser.add_argument('--duration', type=float, default=10,
+                            help='Number of seconds every server is loaded.')
+        parser.add_argument('--timeout', type=float, default=30,
+                            help='Seconds before a request is counted as failed.')
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = 'Token {}'.format(options['token'])
+
+        # The percentiles are those of every request, failed ones included,
+        # as a server timing out or failing fast is no faster for its clients.
+        # Those of the failed requests alone are reported on their own.
+        self.stdout.write(
+            '{:<32} {:>9} {:>8} {:>9} {:>9} {:>9} {:>9} {:>7} {:>12}'.format(
+                'server', 'requests', 'req/s', 'p50 ms', 'p90 ms', 'p99 ms', 'throttled',
+                'errors', 'failed p99'))
+
+        for server in options['servers']:
+            url = urlparse.urlsplit(server)
+            if url.scheme not in ('http', 'https') or not url.netloc:
+                raise CommandError('Invalid server URL: {}'.format(server))
+
+            latencies, failed_latencies, throttled, errors, elapsed = self.load(
+                url, url.path.rstrip('/') + options['path'], options['method'], headers,
+                options['concurrency'], options['duration'], options['timeout'])
+
+            latencies.sort()
+            failed_latencies.sort()
+            self.stdout.write(
+                '{:<32} {:>9} {:>8.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>9} {:>7} {:>12.1f}'.format(
+                    server, len(latencies), len(latencies) / elapsed,
+                    self.percentile(latencies, 50), self.percentile(latencies, 90),
+                    self.percentile(latencies, 99), throttled, errors,
+                    self.percentile(failed_latencies, 99)))
+
+    def load(self, url, path, method, headers, concurrency, duration, timeout):
+        """
+        Runs the clients for the given duration, returning the latencies of
+        every request and of the failed requests in milliseconds, the number
+        of throttled requests, the number of other failed requests and the
+        elapsed time in seconds.
+        """
+        latencies = []
+        failed_latencies = []
+        # Responses other than 2xx and 304 are failures, throttled ones
+        # (429) are counted on their own.
+        failures = {'throttled': 0, 'errors': 0}
+        lock = threading.Lock()
+        started = time.time()
+        deadline = started + duration
+        connection_class = (http_client.HTTPSConnection if url.scheme == 'https'
+                            else http_client.HTTPConnection)
+
+        def client():
+            connection = connection_class(url.netloc, timeout=timeout)
+
+            while time.time() < deadline:
+                request_started = time.time()
+                try:
+                    connection.request(method, path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    if response.status == 429:
+                        failed = 'throttled'
+                    elif not (200 <= response.status < 300 or response.status == 304):
+                        failed = 'errors'
+                    else:
+                        failed = None
+                except (http_client.HTTPException, OSError):
+                    connection.close()
+                    connection = connection_class(url.netloc, timeout=timeout)
+                    failed = 'errors'
+
+                latency = (time.time() - request_started) * 1000
+                with lock:
+                    latencies.append(latency)
+                    if failed:
+                        failures[failed] += 1
+                        failed_latencies.append(latency)
+
+            connection.close()
+
+        clients = [threading.Thread(target=client) for _ in range(concurrency)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+
+        return (latencies, failed_latencies, failures['throttled'], failures['errors'],
+                time.time() - started)
+
+    @staticmethod
+    def percentile(values, percent):
+        if not values:
+            return 0
+
+        return values[min(len(values) - 1, int(len(values) * percent / 100))]
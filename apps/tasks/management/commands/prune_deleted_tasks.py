@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.tasks.models import DeletedTask
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Removes the deleted tasks logged more than TASKS_DELETED_RETENTION "
+            "seconds ago, and those of users who no longer exist.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of deleted tasks removed per DELETE statement.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=settings.TASKS_DELETED_RETENTION)
+
+        expired = self.prune(DeletedTask.objects.filter(deleted__lt=cutoff),
+                             options['batch_size'])
+        orphans = self.prune(DeletedTask.objects.exclude(owner_id__in=User.objects.values('pk')),
+                             options['batch_size'])
+
+        self.stdout.write('Removed {} expired and {} orphan deleted tasks.'.format(
+            expired, orphans))
+
+    @staticmethod
+    def prune(queryset, batch_size):
+        """
+        Deletes the rows of the queryset in batches, so that each DELETE
+        holds the database write lock briefly.
+        """
+        removed = 0
+
+        while True:
+            pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return removed
+
+            DeletedTask.objects.filter(pk__in=pks).delete()
+            removed += len(pks)
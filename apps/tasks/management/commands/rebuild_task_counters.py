@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.tasks.models import TaskCounter
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Recounts the pending and solved tasks of every user, or of the given "
+            "users, in case the task counters drifted from the tasks.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('owners', nargs='*', type=int,
+                            help='Ids of the users whose tasks are recounted, all of them '
+                                 'by default.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of users recounted per transaction.')
+
+    def handle(self, *args, **options):
+        owners = options['owners']
+        batch_size = options['batch_size']
+
+        if owners:
+            missing = set(owners) - set(User.objects.filter(pk__in=owners)
+                                        .values_list('pk', flat=True))
+            if missing:
+                raise CommandError('Unknown users: {}'.format(
+                    ', '.join(str(pk) for pk in sorted(missing))))
+        else:
+            owners = list(User.objects.order_by('pk').values_list('pk', flat=True))
+
+        for start in range(0, len(owners), batch_size):
+            with transaction.atomic():
+                for owner_id in owners[start:start + batch_size]:
+                    TaskCounter.objects.rebuild(owner_id)
+
+        self.stdout.write('Recounted the tasks of {} users.'.format(len(owners)))
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+CREATE_SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE tasks_task_fts USING fts5("
+    "name, description, owner_id, content='tasks_task', content_rowid='id')",
+
+    "CREATE TRIGGER tasks_task_fts_insert AFTER INSERT ON tasks_task BEGIN "
+    "INSERT INTO tasks_task_fts(rowid, name, description, owner_id) "
+    "VALUES (new.id, new.name, new.description, new.owner_id); "
+    "END",
+
+    "CREATE TRIGGER tasks_task_fts_delete AFTER DELETE ON tasks_task BEGIN "
+    "INSERT INTO tasks_task_fts(tasks_task_fts, rowid, name, description, owner_id) "
+    "VALUES ('delete', old.id, old.name, old.description, old.owner_id); "
+    "END",
+
+    "CREATE TRIGGER tasks_task_fts_update "
+    "AFTER UPDATE OF name, description, owner_id ON tasks_task BEGIN "
+    "INSERT INTO tasks_task_fts(tasks_task_fts, rowid, name, description, owner_id) "
+    "VALUES ('delete', old.id, old.name, old.description, old.owner_id); "
+    "INSERT INTO tasks_task_fts(rowid, name, description, owner_id) "
+    "VALUES (new.id, new.name, new.description, new.owner_id); "
+    "END",
+
+    "INSERT INTO tasks_task_fts(tasks_task_fts) VALUES ('rebuild')",
+]
+
+DROP_SQLITE_FTS = [
+    "DROP TRIGGER IF EXISTS tasks_task_fts_update",
+    "DROP TRIGGER IF EXISTS tasks_task_fts_delete",
+    "DROP TRIGGER IF EXISTS tasks_task_fts_insert",
+    "DROP TABLE IF EXISTS tasks_task_fts",
+]
+
+
+def run_on_sqlite(statements):
+    """
+    The full-text index is an SQLite FTS5 table kept in sync by triggers,
+    other databases search through their own search backend.
+    """
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_deletedtask'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(CREATE_SQLITE_FTS),
+                             run_on_sqlite(DROP_SQLITE_FTS)),
+    ]
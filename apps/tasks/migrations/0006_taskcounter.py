@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 05:27
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+PENDING = 1
+SOLVED = 2
+
+
+def count_tasks(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    TaskCounter = apps.get_model('tasks', 'TaskCounter')
+    db_alias = schema_editor.connection.alias
+
+    now = timezone.now()
+    counters = {}
+    for owner_id, status, count in (Task.objects.using(db_alias).order_by()
+                                    .values_list('owner_id', 'status')
+                                    .annotate(models.Count('pk'))):
+        counter = counters.setdefault(owner_id, TaskCounter(owner_id=owner_id, updated=now))
+        if status == PENDING:
+            counter.pending = count
+        elif status == SOLVED:
+            counter.solved = count
+
+    TaskCounter.objects.using(db_alias).bulk_create(counters.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0005_task_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCounter',
+            fields=[
+                ('owner', models.OneToOneField(help_text='The user whose tasks are counted', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('pending', models.IntegerField(default=0, help_text='The number of pending tasks of the user')),
+                ('solved', models.IntegerField(default=0, help_text='The number of solved tasks of the user')),
+                ('updated', models.DateTimeField(editable=False, null=True, verbose_name='The date when the counts last changed')),
+            ],
+        ),
+        migrations.RunPython(count_tasks, migrations.RunPython.noop),
+    ]
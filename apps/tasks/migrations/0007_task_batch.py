@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 05:40
+from __future__ import unicode_literals
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+search_index = import_module('apps.tasks.migrations.0005_task_search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_taskcounter'),
+    ]
+
+    # SQLite adds the column by copying the tasks to a new table, which drops
+    # the triggers keeping the search index in sync, so they are recreated.
+    operations = [
+        migrations.RunPython(search_index.run_on_sqlite(search_index.DROP_SQLITE_FTS),
+                             search_index.run_on_sqlite(search_index.CREATE_SQLITE_FTS)),
+        migrations.AddField(
+            model_name='task',
+            name='batch',
+            field=models.UUIDField(editable=False, help_text='Marks the tasks inserted by the same bulk create, so that they are read back after the insert', null=True),
+        ),
+        migrations.AlterIndexTogether(
+            name='task',
+            index_together=set([('owner', 'created'), ('owner', 'status', 'created'), ('owner', 'batch'), ('owner', 'updated')]),
+        ),
+        migrations.RunPython(search_index.run_on_sqlite(search_index.CREATE_SQLITE_FTS),
+                             search_index.run_on_sqlite(search_index.DROP_SQLITE_FTS)),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 05:43
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_task_batch'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='deletedtask',
+            name='deleted',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='The date when the task was deleted'),
+        ),
+    ]
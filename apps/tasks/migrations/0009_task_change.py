@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 09:12
+from __future__ import unicode_literals
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+search_index = import_module('apps.tasks.migrations.0005_task_search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_deletedtask_deleted_index'),
+    ]
+
+    # SQLite adds the column by copying the tasks to a new table, which drops
+    # the triggers keeping the search index in sync, so they are recreated.
+    operations = [
+        migrations.AddField(
+            model_name='taskcounter',
+            name='changes',
+            field=models.BigIntegerField(default=0, editable=False, help_text="The number of changes made to the user's tasks, which numbers them in the order they were committed"),
+        ),
+        migrations.RunPython(search_index.run_on_sqlite(search_index.DROP_SQLITE_FTS),
+                             search_index.run_on_sqlite(search_index.CREATE_SQLITE_FTS)),
+        migrations.AddField(
+            model_name='task',
+            name='change',
+            field=models.BigIntegerField(default=0, editable=False, help_text="The number of the last change to the task among the changes to its owner's tasks, see TaskCounter.changes"),
+        ),
+        migrations.AlterIndexTogether(
+            name='task',
+            index_together=set([('owner', 'created'), ('owner', 'status', 'created'), ('owner', 'batch'), ('owner', 'updated'), ('owner', 'change')]),
+        ),
+        migrations.RunPython(search_index.run_on_sqlite(search_index.CREATE_SQLITE_FTS),
+                             search_index.run_on_sqlite(search_index.DROP_SQLITE_FTS)),
+    ]
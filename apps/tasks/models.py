@@ -1,8 +1,43 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
 from django.utils.encoding import python_2_unicode_compatible
 
 
+class TaskQuerySet(models.QuerySet):
+    def solve(self, owner_id=None):
+        """
+        Solves the pending tasks in the queryset with an UPDATE per owner
+        and returns how many of them were solved, moving them from the
+        pending to the solved count of their owners in the same transaction.
+
+        Querysets limited to the tasks of an owner pass the owner's id,
+        which saves listing the owners of the pending tasks.
+        """
+        pending = self.filter(status=Task.PENDING)
+        solved = 0
+
+        # Without a savepoint, which would cost two queries, as the caller
+        # gets any error and rolls back its own transaction.
+        with transaction.atomic(savepoint=False):
+            if owner_id is None:
+                owners = list(pending.order_by('owner_id')
+                              .values_list('owner_id', flat=True).distinct())
+            else:
+                owners = [owner_id]
+
+            for owner_id in owners:
+                change = TaskCounter.objects.next_change(owner_id)
+                count = pending.filter(owner_id=owner_id).update(
+                    status=Task.SOLVED, updated=timezone.now(), change=change)
+                TaskCounter.objects.adjust(owner_id, pending=-count, solved=count)
+                solved += count
+
+        return solved
+
+
 @python_2_unicode_compatible
 class Task(models.Model):
     """
@@ -49,7 +84,209 @@ class Task(models.Model):
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         help_text="The user who created this task",
+        # Covered by the composite indexes below, which start with it.
+        db_index=False,
+    )
+
+    batch = models.UUIDField(
+        null=True,
+        editable=False,
+        help_text="Marks the tasks inserted by the same bulk create, "
+                  "so that they are read back after the insert"
     )
 
+    change = models.BigIntegerField(
+        default=0,
+        editable=False,
+        help_text="The number of the last change to the task among the "
+                  "changes to its owner's tasks, see TaskCounter.changes"
+    )
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        index_together = [
+            ('owner', 'created'),
+            ('owner', 'status', 'created'),
+            ('owner', 'updated'),
+            ('owner', 'batch'),
+            ('owner', 'change'),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super(Task, self).__init__(*args, **kwargs)
+
+        # The (owner, status) the task is counted under, see TaskCounter.
+        # Deferred fields are left unknown rather than loaded.
+        owner_id, status = self.__dict__.get('owner_id'), self.__dict__.get('status')
+        self.counted_as = (owner_id, status) if None not in (owner_id, status) else None
+
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        # Saved in the same transaction as the task counters, which are
+        # adjusted by the post_save signal.
+        with transaction.atomic():
+            # Like an F() expression, the change number is only known once
+            # the task is read again.
+            self.change = TaskCounter.objects.next_change(self.owner_id)
+            if kwargs.get('update_fields'):
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'change'}
+
+            super(Task, self).save(*args, **kwargs)
+
+
+@python_2_unicode_compatible
+class DeletedTask(models.Model):
+    """
+    Records a deleted task, so that syncing clients learn about it
+    """
+    task_id = models.IntegerField(
+        help_text="The id the task had before being deleted"
+    )
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        help_text="The user who owned the deleted task",
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name='+',
+    )
+
+    deleted = models.DateTimeField(
+        auto_now_add=True,
+        editable=False,
+        db_index=True,
+        verbose_name='The date when the task was deleted'
+    )
+
+    def __str__(self):
+        return str(self.task_id)
+
+
+class TaskCounterQuerySet(models.QuerySet):
+    def bump_changes(self, owner_id):
+        """
+        Bumps the change number of the owner, which locks the owner's
+        counter until the end of the transaction, and returns whether the
+        owner has a counter.
+        """
+        return bool(self.filter(owner_id=owner_id).update(changes=F('changes') + 1))
+
+    def next_change(self, owner_id):
+        """
+        Numbers a change to the owner's tasks, returning an expression
+        which reads the number in the statement writing the tasks.
+
+        The number is bumped first, so that the changes of an owner are
+        numbered in the order they commit. Must be called in a transaction.
+        """
+        if not self.bump_changes(owner_id):
+            values = dict(self.count_tasks(owner_id), changes=1)
+            counter, created = self.get_or_create(owner_id=owner_id, defaults=values)
+            if not created:
+                self.bump_changes(owner_id)
+
+        return RawSQL('SELECT changes FROM {} WHERE owner_id = %s'.format(
+            TaskCounter._meta.db_table), (owner_id,))
+
+    def adjust(self, owner_id, pending=0, solved=0):
+        """
+        Adds to the pending and solved counts of the owner, counting the
+        owner's tasks when the owner has no counter yet.
+        """
+        if not pending and not solved:
+            return
+
+        def add():
+            return self.filter(owner_id=owner_id).update(
+                pending=F('pending') + pending, solved=F('solved') + solved,
+                updated=timezone.now())
+
+        if add():
+            return
+
+        values = self.count_tasks(owner_id)
+        if not values['pending'] and not values['solved']:
+            return
+
+        # The counter may have been created meanwhile by a concurrent
+        # change, which this one is then added to.
+        counter, created = self.get_or_create(owner_id=owner_id, defaults=values)
+        if not created:
+            add()
+
+    @staticmethod
+    def count_tasks(owner_id):
+        """
+        Returns the pending and solved counts of the owner's tasks.
+        """
+        counts = dict(Task.objects.filter(owner_id=owner_id).order_by()
+                      .values_list('status').annotate(Count('pk')))
+
+        return {
+            'pending': counts.get(Task.PENDING, 0),
+            'solved': counts.get(Task.SOLVED, 0),
+            'updated': timezone.now(),
+        }
+
+    def rebuild(self, owner_id):
+        """
+        Sets the counts of the owner from the owner's tasks.
+        """
+        values = self.count_tasks(owner_id)
+
+        if values['pending'] or values['solved']:
+            self.update_or_create(owner_id=owner_id, defaults=values)
+        else:
+            # Don't create counters for owners without tasks, who may be
+            # users being deleted.
+            self.filter(owner_id=owner_id).update(**values)
+
+
+@python_2_unicode_compatible
+class TaskCounter(models.Model):
+    """
+    Counts the pending and solved tasks of a user, so that they are read
+    without scanning the tasks. The counts are adjusted in the transaction
+    of every change to the user's tasks.
+    """
+    owner = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        primary_key=True,
+        related_name='task_counter',
+        help_text="The user whose tasks are counted",
+    )
+
+    pending = models.IntegerField(
+        default=0,
+        help_text="The number of pending tasks of the user",
+    )
+
+    solved = models.IntegerField(
+        default=0,
+        help_text="The number of solved tasks of the user",
+    )
+
+    updated = models.DateTimeField(
+        null=True,
+        editable=False,
+        verbose_name='The date when the counts last changed'
+    )
+
+    changes = models.BigIntegerField(
+        default=0,
+        editable=False,
+        help_text="The number of changes made to the user's tasks, which "
+                  "numbers them in the order they were committed"
+    )
+
+    objects = TaskCounterQuerySet.as_manager()
+
+    @property
+    def total(self):
+        return self.pending + self.solved
+
+    def __str__(self):
+        return '{} pending, {} solved'.format(self.pending, self.solved)
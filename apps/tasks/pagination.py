@@ -0,0 +1,168 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.six.moves.urllib import parse as urlparse
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+Cursor = namedtuple('Cursor', ['reverse', 'position', 'pk'])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginates a queryset on a ``(ordering field, id)`` key.
+
+    Every page is fetched with a single range condition on the key instead
+    of an OFFSET, so deep pages cost the same as the first one. Cursors are
+    opaque to clients and are returned on the ``Link`` header, which keeps
+    the response body a plain list.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = _('Invalid cursor')
+    ordering = 'created'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+
+        field = self.ordering.lstrip('-')
+        descending = self.ordering.startswith('-')
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        # Walking backwards over a descending key is walking forwards
+        # over the ascending one, and vice versa.
+        if descending != reverse:
+            queryset = queryset.order_by('-' + field, '-pk')
+        else:
+            queryset = queryset.order_by(field, 'pk')
+
+        if self.cursor is not None:
+            position, pk = self.cursor.position, self.cursor.pk
+            if descending != reverse:
+                queryset = queryset.filter(
+                    Q(**{field + '__lt': position}) | Q(pk__lt=pk),
+                    **{field + '__lte': position})
+            else:
+                queryset = queryset.filter(
+                    Q(**{field + '__gt': position}) | Q(pk__gt=pk),
+                    **{field + '__gte': position})
+
+        # Fetch an extra row to find out whether there is a page after this one.
+        results = list(queryset[:self.page_size + 1])
+        has_following = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_page_size(self, request):
+        page_size = settings.TASKS_PAGE_SIZE
+        max_page_size = settings.TASKS_MAX_PAGE_SIZE
+
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+
+        if requested <= 0:
+            return page_size
+
+        return min(requested, max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+
+        position, pk = self.get_key(self.page[-1])
+        return self.encode_cursor(Cursor(reverse=False, position=position, pk=pk))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+
+        if not self.page:
+            # Paged past the end of the list, so the way back is the end.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+
+        position, pk = self.get_key(self.page[0])
+        return self.encode_cursor(Cursor(reverse=True, position=position, pk=pk))
+
+    def get_paginated_response(self, data):
+        links = []
+        next_link = self.get_next_link()
+        previous_link = self.get_previous_link()
+
+        if next_link is not None:
+            links.append('<{}>; rel="next"'.format(next_link))
+        if previous_link is not None:
+            links.append('<{}>; rel="prev"'.format(previous_link))
+
+        headers = {'Link': ', '.join(links)} if links else None
+
+        return Response(data, headers=headers)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            querystring = urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = urlparse.parse_qs(querystring)
+
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            position = parse_datetime(tokens['p'][0])
+            pk = int(tokens['i'][0])
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if position is None:
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(reverse=reverse, position=position, pk=pk)
+
+    def encode_cursor(self, cursor):
+        tokens = {
+            'p': cursor.position.isoformat(),
+            'i': str(cursor.pk),
+        }
+        if cursor.reverse:
+            tokens['r'] = '1'
+
+        querystring = urlparse.urlencode(sorted(tokens.items()))
+        encoded = urlsafe_b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_key(self, item):
+        """
+        Returns the (ordering field, primary key) key of a paginated item,
+        which is either a model instance or a values_list() row ending with
+        both key columns.
+        """
+        if isinstance(item, tuple):
+            return item[-2], item[-1]
+
+        return getattr(item, self.ordering.lstrip('-')), item.pk
+
+
+class TaskPagination(KeysetPagination):
+    """
+    Pages over a user's tasks from the oldest to the newest one.
+    """
+    ordering = 'created'
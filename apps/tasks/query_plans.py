@@ -0,0 +1,95 @@
+"""
+Helpers to check how SQLite plans the queries behind the task endpoints.
+
+The queries below mirror the ones issued by the views, so that both the
+test suite and the ``bench_task_queries`` command can assert they are
+answered from an index instead of a table scan or a temporary sort.
+"""
+from collections import OrderedDict
+
+from django.db import connections
+from django.db.models import Count, Max, sql
+from django.utils import timezone
+
+from .models import Task
+
+PRIMARY_KEY = 'INTEGER PRIMARY KEY'
+
+
+def explain(query_sql, params, using='default'):
+    """
+    Returns the details of every step of the SQLite query plan.
+    """
+    cursor = connections[using].cursor()
+    cursor.execute('EXPLAIN QUERY PLAN ' + query_sql, params)
+
+    return [row[-1] for row in cursor.fetchall()]
+
+
+def index_name(columns, using='default'):
+    """
+    Returns the name Django gives to the `index_together` index
+    on the given Task columns.
+    """
+    with connections[using].schema_editor() as schema_editor:
+        return schema_editor._create_index_name(Task, columns, suffix='_idx')
+
+
+def task_queries(owner_id, task_id, using='default'):
+    """
+    Returns the task endpoint queries as an ordered mapping of
+    name -> (sql, params, expected index name).
+    """
+    owner_tasks = Task.objects.using(using).filter(owner_id=owner_id)
+
+    solve_query = owner_tasks.filter(pk=task_id, status=Task.PENDING).query.clone(
+        sql.UpdateQuery)
+    solve_query.add_update_values({'status': Task.SOLVED, 'updated': timezone.now()})
+
+    validators_query = owner_tasks.query.clone()
+    validators_query.add_annotation(Max('updated'), 'last_modified', is_summary=True)
+    validators_query.add_annotation(Count('pk'), 'count', is_summary=True)
+    validators_query.default_cols = False
+
+    queries = OrderedDict([
+        ('list validators', (validators_query.get_compiler(using).as_sql(),
+                             index_name(['owner_id', 'updated'], using))),
+        ('list', (owner_tasks.order_by('created', 'pk')[:101].query.sql_with_params(),
+                  index_name(['owner_id', 'created'], using))),
+        ('list by status', (owner_tasks.filter(status=Task.PENDING)
+                            .order_by('created', 'pk')[:101].query.sql_with_params(),
+                            index_name(['owner_id', 'status', 'created'], using))),
+        ('list by updated', (owner_tasks.order_by('updated', 'pk')[:101]
+                             .query.sql_with_params(),
+                             index_name(['owner_id', 'updated'], using))),
+        ('changes', (owner_tasks.filter(change__gte=1)
+                     .order_by('change', 'pk')[:101].query.sql_with_params(),
+                     index_name(['owner_id', 'change'], using))),
+        ('detail', (owner_tasks.filter(pk=task_id).query.sql_with_params(),
+                    PRIMARY_KEY)),
+        ('solve', (solve_query.get_compiler(using).as_sql(), PRIMARY_KEY)),
+    ])
+
+    return OrderedDict(
+        (name, (query_sql, params, expected))
+        for name, ((query_sql, params), expected) in queries.items()
+    )
+
+
+def check_plan(plan, expected):
+    """
+    Returns a list of problems found on a query plan, empty when the
+    plan searches through the expected index without sorting.
+    """
+    problems = []
+
+    if not any(step.startswith('SEARCH') and expected in step for step in plan):
+        problems.append('does not search using {}'.format(expected))
+
+    if any(step.startswith('SCAN') for step in plan):
+        problems.append('scans the table')
+
+    if any('TEMP B-TREE' in step for step in plan):
+        problems.append('sorts using a temporary b-tree')
+
+    return problems
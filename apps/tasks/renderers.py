@@ -0,0 +1,42 @@
+from rest_framework.renderers import JSONRenderer
+
+
+class NDJSONRenderer(JSONRenderer):
+    """
+    Renderer which serializes a list to newline delimited JSON,
+    one compact JSON document per item.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+
+        if isinstance(data, dict):
+            data = [data]
+
+        render = super(NDJSONRenderer, self).render
+        return b''.join(render(item) + b'\n' for item in data)
+
+
+class EventStreamRenderer(JSONRenderer):
+    """
+    Renderer which serializes data to a server-sent event, with its
+    compact JSON on a single data line. The event type is taken from
+    the ``event`` key of the renderer context, when there is one.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+
+        event = (renderer_context or {}).get('event')
+        message = b'data: ' + super(EventStreamRenderer, self).render(data) + b'\n\n'
+
+        if event is not None:
+            message = 'event: {}\n'.format(event).encode('utf-8') + message
+
+        return message
@@ -0,0 +1,85 @@
+"""
+Full-text search over the task names and descriptions.
+
+The backend is chosen with the TASKS_SEARCH_BACKEND setting. On SQLite the
+search goes through an FTS5 index kept in sync with the tasks by triggers
+(see the 0005_task_search_index migration); other databases can plug in
+their own backend, or fall back to the unindexed SimpleSearchBackend.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def get_search_backend():
+    return import_string(settings.TASKS_SEARCH_BACKEND)()
+
+
+class BaseSearchBackend(object):
+    def search(self, owner_id, query, offset, limit):
+        """
+        Returns the ids of the owner's tasks matching every term of the query,
+        from the most to the least relevant one.
+        """
+        raise NotImplementedError('Search backends must implement .search()')
+
+    @staticmethod
+    def terms(query):
+        return TERM_RE.findall(query)
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """
+    Searches the tasks_task_fts FTS5 index, ranking the matches with BM25.
+
+    The owner id is indexed as a column of its own, so that the owner scope
+    is resolved by the inverted index rather than by filtering every match.
+    The terms are only matched against the name and description, and the
+    owner id column has no weight in the ranking.
+    """
+    SEARCH_SQL = (
+        'SELECT rowid FROM tasks_task_fts WHERE tasks_task_fts MATCH %s '
+        'ORDER BY bm25(tasks_task_fts, 1.0, 1.0, 0.0) LIMIT %s OFFSET %s'
+    )
+
+    def search(self, owner_id, query, offset, limit):
+        terms = self.terms(query)
+        if not terms:
+            return []
+
+        # Quote every term so that FTS5 operators in the query are searched
+        # as plain words.
+        match = 'owner_id:"{}" AND {}'.format(
+            int(owner_id),
+            ' AND '.join('{{name description}}:"{}"'.format(term) for term in terms))
+
+        cursor = connections[router.db_for_read(Task)].cursor()
+        cursor.execute(self.SEARCH_SQL, [match, limit, offset])
+
+        return [row[0] for row in cursor.fetchall()]
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """
+    Searches with case insensitive LIKE lookups, from the newest updated
+    task. It scans every task of the owner, so it is only meant for
+    databases without a full-text backend.
+    """
+    def search(self, owner_id, query, offset, limit):
+        terms = self.terms(query)
+        if not terms:
+            return []
+
+        tasks = Task.objects.filter(owner_id=owner_id)
+        for term in terms:
+            tasks = tasks.filter(Q(name__icontains=term) | Q(description__icontains=term))
+
+        return list(tasks.order_by('-updated', '-pk')
+                    .values_list('pk', flat=True)[offset:offset + limit])
@@ -1,12 +1,47 @@
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
 from rest_framework import serializers
 
-from .models import Task
+from .models import Task, TaskCounter
+
+
+class TaskBulkCreateSerializer(serializers.ListSerializer):
+    """
+    Creates a list of tasks with batched INSERTs inside one transaction.
+    """
+    def create(self, validated_data):
+        if not validated_data:
+            return []
+
+        owner = validated_data[0]['owner']
+        batch = uuid.uuid4()
+
+        with transaction.atomic():
+            change = TaskCounter.objects.next_change(owner.pk)
+            new_tasks = [Task(batch=batch, change=change, **attrs) for attrs in validated_data]
+            Task.objects.bulk_create(
+                new_tasks, batch_size=settings.TASKS_BULK_CREATE_BATCH_SIZE)
+
+            # bulk_create does not send post_save, which keeps the counters.
+            TaskCounter.objects.adjust(
+                owner.pk,
+                pending=sum(1 for task in new_tasks if task.status == Task.PENDING),
+                solved=sum(1 for task in new_tasks if task.status == Task.SOLVED))
+
+            # bulk_create does not set primary keys on this Django version,
+            # so the tasks are read back by their batch.
+            return list(Task.objects.filter(owner=owner, batch=batch).order_by('pk'))
 
 
 class TaskCreateSerializer(serializers.HyperlinkedModelSerializer):
     class Meta:
         model = Task
         fields = ('id', 'name', 'description')
+        list_serializer_class = TaskBulkCreateSerializer
 
 
 class TaskListSerializer(serializers.HyperlinkedModelSerializer):
@@ -24,3 +59,126 @@ class TaskDetailSerializer(serializers.HyperlinkedModelSerializer):
         model = Task
         fields = ('id', 'name', 'description', 'status',
                   'created', 'updated')
+
+
+class TaskStatsSerializer(serializers.Serializer):
+    pending = serializers.IntegerField()
+    solved = serializers.IntegerField()
+    total = serializers.IntegerField()
+    updated = serializers.DateTimeField()
+
+
+class TaskBulkSolveSerializer(serializers.Serializer):
+    """
+    Selects the tasks to solve, either by id or by creation date.
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    def validate_ids(self, value):
+        max_size = settings.TASKS_BULK_SOLVE_MAX_SIZE
+
+        if len(value) > max_size:
+            raise serializers.ValidationError(
+                'Ensure this list has no more than {} items.'.format(max_size))
+
+        return value
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('created_before' in attrs):
+            raise serializers.ValidationError(
+                'Either ids or created_before must be given.')
+
+        return attrs
+
+
+class TaskRowSerializer(object):
+    """
+    Read only serializer building task representations straight from
+    values_list() rows, without instantiating models nor going through the
+    DRF field machinery. Its output matches the same fields of
+    TaskDetailSerializer.
+    """
+    STATUS_LABELS = dict(Task.TASK_STATUS_CHOICES)
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+
+        datetime_representation = serializers.DateTimeField().to_representation
+        converters = {
+            'status': self.STATUS_LABELS.__getitem__,
+            'created': datetime_representation,
+            'updated': datetime_representation,
+        }
+        self.converters = [(index, converters[field])
+                           for index, field in enumerate(self.fields)
+                           if field in converters]
+
+    @property
+    def columns(self):
+        """
+        The columns to pass to values_list(), in the order rows are read.
+        """
+        return self.fields
+
+    def to_representation(self, row):
+        values = list(row[:len(self.fields)])
+
+        for index, converter in self.converters:
+            values[index] = converter(values[index])
+
+        return OrderedDict(zip(self.fields, values))
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+def iter_task_chunks(queryset):
+    """
+    Yields the detail representations of the tasks in chunks of
+    TASKS_EXPORT_CHUNK_SIZE, walking the primary key so that only one chunk
+    is held in memory at a time.
+    """
+    chunk_size = settings.TASKS_EXPORT_CHUNK_SIZE
+    serializer = TaskRowSerializer(TaskDetailSerializer.Meta.fields)
+    rows = queryset.order_by('pk').values_list(*serializer.columns)
+    last_pk = 0
+
+    while True:
+        chunk = list(rows.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return
+
+        yield serializer.serialize(chunk)
+
+        last_pk = chunk[-1][0]
+
+
+class TaskListQuerySerializer(serializers.Serializer):
+    """
+    Validates the filtering, ordering and fields query parameters
+    of the task list.
+    """
+    STATUSES = dict((label.lower(), value) for value, label in Task.TASK_STATUS_CHOICES)
+    ORDERINGS = ('created', '-created', 'updated', '-updated')
+
+    status = serializers.ChoiceField(choices=sorted(STATUSES), required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    updated_after = serializers.DateTimeField(required=False)
+    updated_before = serializers.DateTimeField(required=False)
+    ordering = serializers.ChoiceField(choices=ORDERINGS, default='created')
+    fields = serializers.CharField(required=False)
+
+    def validate_status(self, value):
+        return self.STATUSES[value]
+
+    def validate_fields(self, value):
+        fields = [field.strip() for field in value.split(',') if field.strip()]
+        unknown = set(fields) - set(TaskDetailSerializer.Meta.fields)
+
+        if not fields or unknown:
+            raise serializers.ValidationError('Choose fields among {}.'.format(
+                ', '.join(TaskDetailSerializer.Meta.fields)))
+
+        return fields
@@ -0,0 +1,135 @@
+from django.db.models.signals import class_prepared, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import events
+from .cache import invalidate_task_list
+from .models import DeletedTask, Task, TaskCounter
+
+
+def load_deleted_task(sender, instance, **kwargs):
+    """
+    Loads the owner and status of a deleted task that was loaded without
+    them, as they can't be read once the task is deleted.
+    """
+    if instance.counted_as is None:
+        instance.counted_as = Task.objects.filter(pk=instance.pk).values_list(
+            'owner_id', 'status').first()
+
+
+def deleted_task_owner_id(instance):
+    """
+    Returns the owner id of a deleted task, read by load_deleted_task() as
+    the owner of a deferred task can't be loaded anymore, or None when the
+    task was already gone.
+    """
+    return instance.counted_as[0] if instance.counted_as is not None else None
+
+
+def invalidate_owner_task_list(sender, instance, **kwargs):
+    """
+    Invalidates the cached task list of the owner of a saved task.
+    """
+    invalidate_task_list(instance.owner_id)
+
+
+def invalidate_deleted_task_list(sender, instance, **kwargs):
+    """
+    Invalidates the cached task list of the owner of a deleted task.
+    """
+    owner_id = deleted_task_owner_id(instance)
+
+    if owner_id is not None:
+        invalidate_task_list(owner_id)
+
+
+def log_deleted_task(sender, instance, **kwargs):
+    """
+    Records the deleted task so that syncing clients learn about it.
+    """
+    owner_id = deleted_task_owner_id(instance)
+    if owner_id is None:
+        return
+
+    # The deletions of an owner are logged under the lock of the owner's
+    # change number, so that they are logged in the order they commit. No
+    # counter is created for the owner, who may be a user being deleted.
+    TaskCounter.objects.bump_changes(owner_id)
+    DeletedTask.objects.create(task_id=instance.pk, owner_id=owner_id)
+
+
+def notify_saved_task(sender, instance, created, **kwargs):
+    """
+    Notifies the event streams of the owner of a created or updated task.
+    """
+    events.notify(instance.owner_id, events.CREATED if created else events.UPDATED,
+                  [instance.pk])
+
+
+def notify_deleted_task(sender, instance, **kwargs):
+    """
+    Notifies the event streams of the owner of a deleted task.
+    """
+    owner_id = deleted_task_owner_id(instance)
+
+    if owner_id is not None:
+        events.notify(owner_id, events.DELETED, [instance.pk])
+
+
+def count_task(owner_id, status, count):
+    TaskCounter.objects.adjust(owner_id,
+                               pending=count if status == Task.PENDING else 0,
+                               solved=count if status == Task.SOLVED else 0)
+
+
+def count_saved_task(sender, instance, created, **kwargs):
+    """
+    Counts a created task, or moves a task whose owner or status changed
+    between the counts.
+    """
+    counted_as = (instance.owner_id, instance.status)
+
+    if created:
+        count_task(instance.owner_id, instance.status, 1)
+    elif instance.counted_as is None:
+        TaskCounter.objects.rebuild(instance.owner_id)
+    elif instance.counted_as != counted_as:
+        count_task(instance.counted_as[0], instance.counted_as[1], -1)
+        count_task(instance.owner_id, instance.status, 1)
+
+    instance.counted_as = counted_as
+
+
+def uncount_deleted_task(sender, instance, **kwargs):
+    """
+    Removes a deleted task from the counts of its owner.
+    """
+    if instance.counted_as is not None:
+        count_task(instance.counted_as[0], instance.counted_as[1], -1)
+
+
+def connect_task_receivers(sender):
+    pre_delete.connect(load_deleted_task, sender=sender)
+
+    post_save.connect(invalidate_owner_task_list, sender=sender)
+    post_save.connect(notify_saved_task, sender=sender)
+    post_save.connect(count_saved_task, sender=sender)
+
+    post_delete.connect(invalidate_deleted_task_list, sender=sender)
+    post_delete.connect(log_deleted_task, sender=sender)
+    post_delete.connect(notify_deleted_task, sender=sender)
+    post_delete.connect(uncount_deleted_task, sender=sender)
+
+
+connect_task_receivers(Task)
+
+
+@receiver(class_prepared)
+def connect_task_subclass_receivers(sender, **kwargs):
+    """
+    Connects the task receivers to the Task subclasses, such as those of
+    the tasks loaded with only() or defer(), which are the senders of their
+    signals. Receivers taking any sender would keep every other model from
+    being deleted without loading it first.
+    """
+    if issubclass(sender, Task) and sender is not Task:
+        connect_task_receivers(sender)
@@ -0,0 +1,129 @@
+"""
+Incremental sync of a user's tasks.
+
+A sync token records how far a client has synced: the (change, id) key
+of the last changed task it received and the id of the last deletion it
+received. Changes are read from the (owner, change) index and deletions
+from the DeletedTask log, so a sync costs O(changes) rather than O(tasks).
+
+Deletions are kept for TASKS_DELETED_RETENTION seconds (see the
+prune_deleted_tasks command), so a token also records when it was issued,
+and tokens older than that are refused with ExpiredSyncToken: their client
+may have missed pruned deletions, and has to sync again from scratch.
+
+Tasks are ordered by their change number rather than by their updated
+date, which is taken before the write waits for the database lock, so that
+a change committed after a later dated one still reaches the clients which
+synced in between. Change numbers are assigned while holding the lock of
+the owner's counter, see TaskCounter.changes, and so are in commit order,
+as are the deletions of an owner, which are logged under the same lock.
+
+Tokens keyed on the updated date of the tasks, issued by earlier versions,
+are taken as expired.
+"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.six.moves.urllib import parse as urlparse
+
+from .models import DeletedTask, Task
+
+SyncToken = namedtuple('SyncToken', ['change', 'pk', 'deleted_pk', 'issued'])
+
+Changes = namedtuple('Changes', ['changed', 'deleted', 'token', 'more'])
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+class ExpiredSyncToken(InvalidSyncToken):
+    pass
+
+
+def encode_token(token):
+    tokens = {'d': str(token.deleted_pk), 's': token.issued.isoformat()}
+    if token.change is not None:
+        tokens['c'] = str(token.change)
+        tokens['i'] = str(token.pk)
+
+    querystring = urlparse.urlencode(sorted(tokens.items()))
+    return urlsafe_b64encode(querystring.encode('ascii')).decode('ascii')
+
+
+def decode_token(encoded):
+    try:
+        querystring = urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+        tokens = urlparse.parse_qs(querystring)
+
+        deleted_pk = int(tokens['d'][0])
+        issued = parse_datetime(tokens['s'][0]) if 's' in tokens else None
+        if 's' in tokens and issued is None:
+            raise ValueError('Invalid issue date')
+        if 'c' in tokens:
+            change, pk = int(tokens['c'][0]), int(tokens['i'][0])
+        else:
+            change, pk = None, None
+    except (TypeError, ValueError, KeyError, UnicodeError):
+        raise InvalidSyncToken()
+
+    # Tokens issued before they recorded their date, or keyed on the
+    # updated date of the tasks, are taken as expired.
+    if 'u' in tokens:
+        issued = None
+
+    return SyncToken(change=change, pk=pk, deleted_pk=deleted_pk, issued=issued)
+
+
+def changes_since(owner, token, limit):
+    """
+    Returns up to `limit` tasks changed and `limit` tasks deleted since the
+    given token, or every task when the token is None, along with the token
+    to sync from next and whether there are more changes to fetch.
+
+    Raises ExpiredSyncToken for tokens older than the deletion log.
+    """
+    now = timezone.now()
+    tasks = Task.objects.filter(owner=owner).order_by('change', 'pk')
+
+    if token is None:
+        # A full sync sends every task, so only later deletions matter.
+        deleted_pk = DeletedTask.objects.filter(owner=owner).aggregate(
+            last=Max('pk'))['last'] or 0
+        token = SyncToken(change=None, pk=None, deleted_pk=deleted_pk, issued=now)
+        deletions = []
+    else:
+        retention = timedelta(seconds=settings.TASKS_DELETED_RETENTION)
+        if token.issued is None or token.issued < now - retention:
+            raise ExpiredSyncToken()
+
+        deletions = list(DeletedTask.objects
+                         .filter(owner=owner, pk__gt=token.deleted_pk)
+                         .order_by('pk').values_list('pk', 'task_id')[:limit + 1])
+
+    if token.change is not None:
+        tasks = tasks.filter(Q(change__gt=token.change) | Q(pk__gt=token.pk),
+                             change__gte=token.change)
+
+    changed = list(tasks[:limit + 1])
+    more = len(changed) > limit or len(deletions) > limit
+    changed, deletions = changed[:limit], deletions[:limit]
+
+    if changed:
+        token = token._replace(change=changed[-1].change, pk=changed[-1].pk)
+    if deletions:
+        token = token._replace(deleted_pk=deletions[-1][0])
+    if not more:
+        # The client is now up to date. Until then, it may still miss
+        # deletions older than its previous token.
+        token = token._replace(issued=now)
+
+    return Changes(changed=changed,
+                   deleted=[task_id for pk, task_id in deletions],
+                   token=token,
+                   more=more)
@@ -1,16 +1,42 @@
+import json
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
 from django.core.urlresolvers import resolve
-from django.test import TestCase
+from django.db import router
+from django.http import HttpResponse
+from django.db import connection, transaction
+from django.db.models.deletion import Collector
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from django.utils.six.moves.urllib.parse import urlencode
 
 from rest_framework import fields
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.renderers import JSONRenderer
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.test import force_authenticate, APIRequestFactory
 
+from apps.users import throttling
+from apps.users.authentication import CachedTokenAuthentication
+from project.db.middleware import ReadYourWritesMiddleware
+from project.db.routers import PrimaryReplicaRouter, has_recent_writes, mark_written, \
+    replica_reads, replica_reads_for_request
+
+from . import cache as task_list_cache
+from . import events
 from .admin import TaskAdmin
-from .models import Task
-from .serializers import TaskCreateSerializer, TaskDetailSerializer, TaskListSerializer
-from .views import TaskList, TaskDetail, TaskSolve
+from .models import DeletedTask, Task, TaskCounter, TaskCounterQuerySet
+from .query_plans import check_plan, explain, task_queries
+from .serializers import TaskCreateSerializer, TaskDetailSerializer, TaskListSerializer, \
+    TaskRowSerializer
+from .sync import decode_token, encode_token
+from .views import TaskBulkCreate, TaskBulkSolve, TaskChanges, TaskEvents, TaskExport, \
+    TaskList, TaskDetail, TaskSearch, TaskSolve, TaskStats
 
 User = get_user_model()
 
@@ -37,6 +63,69 @@ class TasksURLsTestCase(TestCase):
         task_detail_func_name = str(task_detail.func).split()[1]
         self.assertEqual(task_detail_func_name, "TaskDetail")
 
+    def test_task_bulk_create_url_uses_task_bulk_create_view(self):
+        """
+        Test that the task bulk create url resolves to the correct
+        view function.
+        """
+        task_bulk_create = resolve('/api/v1/tasks/bulk/')
+        task_bulk_create_func_name = str(task_bulk_create.func).split()[1]
+        self.assertEqual(task_bulk_create_func_name, "TaskBulkCreate")
+
+    def test_task_bulk_solve_url_uses_task_bulk_solve_view(self):
+        """
+        Test that the task bulk solve url resolves to the correct
+        view function.
+        """
+        task_bulk_solve = resolve('/api/v1/tasks/solve/')
+        task_bulk_solve_func_name = str(task_bulk_solve.func).split()[1]
+        self.assertEqual(task_bulk_solve_func_name, "TaskBulkSolve")
+
+    def test_task_export_url_uses_task_export_view(self):
+        """
+        Test that the task export url resolves to the correct
+        view function.
+        """
+        task_export = resolve('/api/v1/tasks/export/')
+        task_export_func_name = str(task_export.func).split()[1]
+        self.assertEqual(task_export_func_name, "TaskExport")
+
+    def test_task_changes_url_uses_task_changes_view(self):
+        """
+        Test that the task changes url resolves to the correct
+        view function.
+        """
+        task_changes = resolve('/api/v1/tasks/changes/')
+        task_changes_func_name = str(task_changes.func).split()[1]
+        self.assertEqual(task_changes_func_name, "TaskChanges")
+
+    def test_task_events_url_uses_task_events_view(self):
+        """
+        Test that the task events url resolves to the correct
+        view function.
+        """
+        task_events = resolve('/api/v1/tasks/events/')
+        task_events_func_name = str(task_events.func).split()[1]
+        self.assertEqual(task_events_func_name, "TaskEvents")
+
+    def test_task_search_url_uses_task_search_view(self):
+        """
+        Test that the task search url resolves to the correct
+        view function.
+        """
+        task_search = resolve('/api/v1/tasks/search/')
+        task_search_func_name = str(task_search.func).split()[1]
+        self.assertEqual(task_search_func_name, "TaskSearch")
+
+    def test_task_stats_url_uses_task_stats_view(self):
+        """
+        Test that the task stats url resolves to the correct
+        view function.
+        """
+        task_stats = resolve('/api/v1/tasks/stats/')
+        task_stats_func_name = str(task_stats.func).split()[1]
+        self.assertEqual(task_stats_func_name, "TaskStats")
+
     def test_task_solve_url_uses_obtain_task_solve_view(self):
         """
         Test that the task solve url resolves to the correct
@@ -137,6 +226,28 @@ class TaskModelTestCase(TestCase):
         self.assertIsNotNone(clean_out_closet_task.created)
 
 
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite only')
+class TaskQueryPlanTestCase(TestCase):
+    """
+    Tests that the task endpoint queries are answered using indexes
+    """
+    def setUp(self):
+        self.user = User.objects.create(username="master")
+        self.task = Task.objects.create(name='One', owner=self.user)
+
+    def test_task_queries_use_indexes(self):
+        """
+        Tests that every task endpoint query searches an index without
+        scanning the table or sorting the results.
+        """
+        queries = task_queries(self.user.pk, self.task.pk)
+
+        for name, (query_sql, params, expected) in queries.items():
+            plan = explain(query_sql, params)
+            self.assertEqual(check_plan(plan, expected), [],
+                             '{} query plan: {}'.format(name, plan))
+
+
 class TaskAdminTestCase(TestCase):
     """
     Task admin tests
@@ -153,7 +264,7 @@ class TaskAdminTestCase(TestCase):
         Tests that the task admin search_fields contains the right fields
         """
         self.assertEqual(TaskAdmin.search_fields,
-                         ['name', 'description', 'owner'])
+                         ['name', 'description', 'owner__username'])
 
     def test_task_admin_list_display(self):
         """
@@ -231,6 +342,55 @@ class TaskDetailSerializerTestCase(TestCase):
         self.assertEqual(type(status_field), fields.CharField)
 
 
+class TaskRowSerializerTestCase(TestCase):
+    """
+    TaskRowSerializer tests
+    """
+    def setUp(self):
+        user = User.objects.create(username="master")
+        Task.objects.create(name='One', owner=user, description='first')
+        Task.objects.create(name='Dos \u2028 \u00f1', owner=user, status=Task.SOLVED)
+
+        self.tasks = list(Task.objects.order_by('pk'))
+
+    def assert_same_output(self, serializer_class, fields):
+        """
+        Asserts the row serializer renders the same bytes as the given
+        DRF serializer for the given fields.
+        """
+        row_serializer = TaskRowSerializer(fields)
+        rows = Task.objects.order_by('pk').values_list(*row_serializer.columns)
+
+        expected = JSONRenderer().render(serializer_class(self.tasks, many=True).data)
+        output = JSONRenderer().render(row_serializer.serialize(rows))
+
+        self.assertEqual(output, expected)
+
+    def test_list_output_matches_the_task_list_serializer(self):
+        """
+        Tests that the row serializer output is byte identical to the task
+        list serializer one.
+        """
+        self.assert_same_output(TaskListSerializer, TaskListSerializer.Meta.fields)
+
+    def test_detail_output_matches_the_task_detail_serializer(self):
+        """
+        Tests that the row serializer output is byte identical to the task
+        detail serializer one.
+        """
+        self.assert_same_output(TaskDetailSerializer, TaskDetailSerializer.Meta.fields)
+
+    def test_rows_may_have_extra_trailing_columns(self):
+        """
+        Tests that columns after the serializer ones are ignored.
+        """
+        row_serializer = TaskRowSerializer(('id', 'name'))
+        task = self.tasks[0]
+
+        self.assertEqual(row_serializer.to_representation((task.pk, task.name, task.created)),
+                         {'id': task.pk, 'name': task.name})
+
+
 class TaskListTestCase(TestCase):
     """
     TaskList view tests
@@ -248,7 +408,7 @@ class TaskListTestCase(TestCase):
         Tests that the authentication_classes attribute on the TaskList view contains
         the right classes
         """
-        self.assertEqual(TaskList.authentication_classes, (TokenAuthentication,))
+        self.assertEqual(TaskList.authentication_classes, (CachedTokenAuthentication,))
 
     def test_task_list_permission_classes(self):
         """
@@ -411,178 +571,2060 @@ class TaskListTestCase(TestCase):
         self.assertEqual(new_task.status, Task.PENDING)
 
 
-class TaskDetailTestCase(TestCase):
+class TaskListPaginationTestCase(TestCase):
     """
-    TaskDetail view tests
+    TaskList keyset pagination tests
     """
     def setUp(self):
         self.user = User.objects.create(username="master")
-        self.user_two = User.objects.create(username="puppet")
-
         self.tasks = [
-            Task.objects.create(name='One', owner=self.user),
-            Task.objects.create(name='Two', owner=self.user),
-            Task.objects.create(name='Three', owner=self.user),
+            Task.objects.create(name='Task {}'.format(i), owner=self.user)
+            for i in range(5)
         ]
 
-    def test_task_detail_queryset(self):
+    def get_page(self, url):
+        factory = APIRequestFactory()
+        request = factory.get(url, format='json')
+        force_authenticate(request, user=self.user)
+
+        return TaskList.as_view()(request)
+
+    @staticmethod
+    def get_link(response, rel):
+        for link in response.get('Link', '').split(', '):
+            if link.endswith('rel="{}"'.format(rel)):
+                return link[1:link.index('>')]
+
+        return None
+
+    def test_first_page_is_capped_to_the_page_size(self):
         """
-        Tests that the queryset attribute on the TaskDetail class
-        is a list containing all of the Task objects.
+        Tests that the first page contains at most page_size tasks,
+        has a next link and no previous link.
         """
-        self.assertListEqual(list(TaskDetail.queryset.all()),
-                             list(Task.objects.all()))
+        response = self.get_page('/api/v1/tasks/?page_size=2')
 
-    def test_task_detail_authentication_classes(self):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data],
+                         [task.pk for task in self.tasks[:2]])
+        self.assertIsNotNone(self.get_link(response, 'next'))
+        self.assertIsNone(self.get_link(response, 'prev'))
+
+    def test_following_next_links_walks_all_the_tasks(self):
         """
-        Tests that the authentication_classes attribute on the TaskDetail class
-        contains the valid class list values.
+        Tests that following the next links returns every task once,
+        in creation order.
         """
-        self.assertEqual(TaskDetail.authentication_classes,
-                         (TokenAuthentication,))
+        seen = []
+        url = '/api/v1/tasks/?page_size=2'
 
-    def test_task_detail_permission_classes(self):
+        while url is not None:
+            response = self.get_page(url)
+            seen.extend(item['id'] for item in response.data)
+            url = self.get_link(response, 'next')
+
+        self.assertEqual(seen, [task.pk for task in self.tasks])
+
+    def test_previous_link_returns_the_previous_page(self):
         """
-        Tests that the permission_classes attribute on the TaskDetail view contains
-        the right classes
+        Tests that the previous link of the second page returns the first page.
         """
-        self.assertEqual(TaskDetail.permission_classes, (IsAuthenticated,))
+        first_page = self.get_page('/api/v1/tasks/?page_size=2')
+        second_page = self.get_page(self.get_link(first_page, 'next'))
+        previous_page = self.get_page(self.get_link(second_page, 'prev'))
 
-    def test_get_task_list_without_authentication(self):
+        self.assertEqual(previous_page.data, first_page.data)
+        self.assertIsNotNone(self.get_link(previous_page, 'next'))
+
+    def test_page_size_is_capped(self):
         """
-        Tests that when a user is not authenticated he/she is
-        not able to get the task list.
+        Tests that clients cannot ask for pages bigger than TASKS_MAX_PAGE_SIZE.
         """
-        factory = APIRequestFactory()
-        request = factory.get('/api/v1/tasks/1/', format='json')
-        task_detail_view = TaskDetail.as_view()
-        response = task_detail_view(request, pk=1)
+        with self.settings(TASKS_MAX_PAGE_SIZE=3):
+            response = self.get_page('/api/v1/tasks/?page_size=1000')
 
-        self.assertEqual(response.status_code, 401)
+        self.assertEqual(len(response.data), 3)
 
-    def test_user_cannot_see_other_tasks_but_hims(self):
+    def test_invalid_cursor(self):
         """
-        Tests that when an authenticated user can only see the detail for its
-        tasks.
+        Tests that an invalid cursor returns a 404 status code.
         """
+        response = self.get_page('/api/v1/tasks/?cursor=invalid')
+
+        self.assertEqual(response.status_code, 404)
+
+
+class TaskBulkCreateTestCase(TestCase):
+    """
+    TaskBulkCreate view tests
+    """
+    def setUp(self):
+        self.user = User.objects.create(username="master")
+        Task.objects.create(name='Existing', owner=self.user)
+
+    def post_tasks(self, data):
         factory = APIRequestFactory()
-        task_id = self.tasks[0].pk
-        request = factory.get('/api/v1/tasks/{}/'.format(task_id), format='json')
-        task_detail_view = TaskDetail.as_view()
-        force_authenticate(request, user=self.user_two)
+        request = factory.post('/api/v1/tasks/bulk/', data, format='json')
+        force_authenticate(request, user=self.user)
 
-        response = task_detail_view(request, pk=task_id)
+        return TaskBulkCreate.as_view()(request)
+
+    def test_bulk_create_without_authentication(self):
+        """
+        Tests that bulk creating tasks without authentication returns a 401 error.
+        """
+        factory = APIRequestFactory()
+        request = factory.post('/api/v1/tasks/bulk/', [], format='json')
+        response = TaskBulkCreate.as_view()(request)
 
         self.assertEqual(response.status_code, 401)
 
-    def test_task_detail_fields(self):
+    def test_bulk_create_tasks(self):
         """
-        Tests that when an authenticated and tries to get his/her task detail
-        it only gets the correct fields.
+        Tests that bulk creating tasks returns a 201 status code and the
+        created tasks, in the same order as they were sent.
         """
-        factory = APIRequestFactory()
-        task_id = self.tasks[0].pk
-        request = factory.get('/api/v1/tasks/1/'.format(task_id))
-        task_detail_view = TaskDetail.as_view()
-        force_authenticate(request, user=self.user)
+        with self.settings(TASKS_BULK_CREATE_BATCH_SIZE=2):
+            response = self.post_tasks([
+                {'name': 'One', 'description': 'first'},
+                {'name': 'Two'},
+                {'name': 'Three'},
+            ])
 
-        response = task_detail_view(request, pk=task_id)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([item['name'] for item in response.data],
+                         ['One', 'Two', 'Three'])
 
-        self.assertEqual(response.status_code, 200)
+        for item in response.data:
+            task = Task.objects.get(pk=item['id'])
+            self.assertEqual(task.name, item['name'])
+            self.assertEqual(task.description, item['description'])
+            self.assertEqual(task.owner, self.user)
+            self.assertEqual(task.status, Task.PENDING)
 
-        task_fields = ['id', 'name', 'description',
-                       'status', 'created', 'updated']
+    def test_bulk_create_returns_its_own_tasks(self):
+        """
+        Tests that the created tasks are read back by their batch, rather
+        than as the owner's newest tasks.
+        """
+        serializer = TaskCreateSerializer(data=[{'name': 'One'}, {'name': 'Two'}], many=True)
+        serializer.is_valid(raise_exception=True)
+        insert = Task.objects.bulk_create
 
-        for task_field in task_fields:
-            self.assertEqual(task_field in response.data, True)
+        def bulk_create_then_insert(objs, **kwargs):
+            # A task of the same owner inserted concurrently.
+            created = insert(objs, **kwargs)
+            Task.objects.create(name='Concurrent', owner=self.user)
+            return created
 
+        with mock.patch.object(Task.objects, 'bulk_create', bulk_create_then_insert):
+            tasks = serializer.save(owner=self.user)
 
-class TaskSolveTestCase(TestCase):
+        self.assertEqual([task.name for task in tasks], ['One', 'Two'])
+
+    def test_bulk_create_with_invalid_items(self):
+        """
+        Tests that when any item is invalid the status code is 400,
+        the errors are reported per item and no task is created.
+        """
+        response = self.post_tasks([
+            {'name': 'One'},
+            {'name': ''},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, [
+            {},
+            {'name': ['This field may not be blank.']},
+        ])
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_bulk_create_with_a_non_list_body(self):
+        """
+        Tests that bulk creating tasks from something else than a list
+        returns a 400 status code.
+        """
+        response = self.post_tasks({'name': 'One'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['non_field_errors'],
+                         ['Expected a list of items but got type "dict".'])
+
+    def test_bulk_create_too_many_tasks(self):
+        """
+        Tests that bulk creating more than TASKS_BULK_CREATE_MAX_SIZE tasks
+        returns a 400 status code.
+        """
+        with self.settings(TASKS_BULK_CREATE_MAX_SIZE=1):
+            response = self.post_tasks([{'name': 'One'}, {'name': 'Two'}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Task.objects.count(), 1)
+
+
+class TaskExportTestCase(TestCase):
     """
-    TaskSolve view tests
+    TaskExport view tests
     """
     def setUp(self):
         self.user = User.objects.create(username="master")
         self.user_two = User.objects.create(username="puppet")
 
         self.tasks = [
-            Task.objects.create(name='One', owner=self.user),
+            Task.objects.create(name='One', owner=self.user, description='first'),
             Task.objects.create(name='Two', owner=self.user, status=Task.SOLVED),
             Task.objects.create(name='Three', owner=self.user),
         ]
+        Task.objects.create(name='Four', owner=self.user_two)
 
-    def test_task_detail_authentication_classes(self):
-        """
-        Tests that the authentication_classes attribute on the TaskSolve class
-        contains the valid class list values.
-        """
-        self.assertEqual(TaskSolve.authentication_classes,
-                         (TokenAuthentication,))
+    def export(self, url='/api/v1/tasks/export/', user=None):
+        factory = APIRequestFactory()
+        request = factory.get(url)
+        force_authenticate(request, user=user or self.user)
 
-    def test_task_solve_without_authentication(self):
+        return TaskExport.as_view()(request)
+
+    def test_export_without_authentication(self):
         """
-        Tests that when a user is not authenticated he/she is
-        not able to get the task list.
+        Tests that exporting tasks without authentication returns a 401 error.
         """
         factory = APIRequestFactory()
-        request = factory.put('/api/v1/tasks/1/solve/', format='json')
-        task_solve_view = TaskSolve.as_view()
-        response = task_solve_view(request, pk=1)
+        request = factory.get('/api/v1/tasks/export/')
+        response = TaskExport.as_view()(request)
 
         self.assertEqual(response.status_code, 401)
 
-    def test_task_detail_permission_classes(self):
+    def test_export_streams_ndjson_by_default(self):
         """
-        Tests that the permission_classes attribute on the TaskSolve view contains
-        the right classes
+        Tests that the export streams one JSON document per task and line,
+        matching the task detail serializer output.
         """
-        self.assertEqual(TaskSolve.permission_classes, (IsAuthenticated,))
+        response = self.export()
 
-    def test_task_solve_with_invalid_user(self):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        content = b''.join(response.streaming_content).decode('utf-8')
+        items = [json.loads(line) for line in content.splitlines()]
+        expected = TaskDetailSerializer(self.tasks, many=True).data
+
+        self.assertEqual(items, json.loads(json.dumps(expected)))
+
+    def test_export_as_json_array(self):
         """
-        Tests that when a user is not the owner of a given task
-        the status code returned is 404
+        Tests that the export can be streamed as a JSON array.
         """
-        factory = APIRequestFactory()
-        task_id = self.tasks[0].pk
-        request = factory.put('/api/v1/tasks/{}/solve/'.format(task_id), format='json')
-        force_authenticate(request, user=self.user_two)
+        response = self.export('/api/v1/tasks/export/?format=json')
 
-        task_solve_view = TaskSolve.as_view()
-        response = task_solve_view(request, pk=task_id)
+        self.assertEqual(response['Content-Type'], 'application/json')
 
-        self.assertEqual(response.status_code, 404)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual([item['id'] for item in json.loads(content)],
+                         [task.pk for task in self.tasks])
 
-    def test_task_solve_with_valid_user_solves_task(self):
+    def test_export_without_tasks_as_json_array(self):
         """
-        Tests to solve a task using the owner as the authenticated user.
-        The status code should be 200 and the task should be solved.
+        Tests that exporting a user without tasks as JSON streams an empty array.
+        """
+        user = User.objects.create(username="nobody")
+        response = self.export('/api/v1/tasks/export/?format=json', user=user)
+
+        self.assertEqual(b''.join(response.streaming_content), b'[]')
+
+    def test_export_reads_tasks_in_chunks(self):
         """
+        Tests that the export reads TASKS_EXPORT_CHUNK_SIZE tasks per query.
+        """
+        with self.settings(TASKS_EXPORT_CHUNK_SIZE=2):
+            response = self.export()
+
+            with self.assertNumQueries(3):
+                content = b''.join(response.streaming_content)
+
+        self.assertEqual(len(content.splitlines()), 3)
+
+
+class TaskListQueryTestCase(TestCase):
+    """
+    TaskList filtering, ordering and fields tests
+    """
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create(username="master")
+        self.tasks = [
+            Task.objects.create(name='One', owner=self.user, description='first'),
+            Task.objects.create(name='Two', owner=self.user, status=Task.SOLVED),
+            Task.objects.create(name='Three', owner=self.user),
+        ]
+
+    def get_task_list(self, params):
         factory = APIRequestFactory()
-        task_id = self.tasks[0].pk
-        request = factory.put('/api/v1/tasks/{}/solve/'.format(task_id), format='json')
+        request = factory.get('/api/v1/tasks/', params)
         force_authenticate(request, user=self.user)
 
-        task_solve_view = TaskSolve.as_view()
-        response = task_solve_view(request, pk=task_id)
+        return TaskList.as_view()(request)
 
-        self.assertEqual(response.status_code, 200)
+    def test_filter_by_status(self):
+        """
+        Tests that the task list can be filtered by status.
+        """
+        response = self.get_task_list({'status': 'pending'})
 
-        task = Task.objects.get(pk=task_id)
+        self.assertEqual([item['id'] for item in response.data],
+                         [self.tasks[0].pk, self.tasks[2].pk])
 
-        self.assertEqual(task.status, Task.SOLVED)
+    def test_filter_by_creation_date(self):
+        """
+        Tests that the task list can be filtered by a creation date range.
+        """
+        response = self.get_task_list({
+            'created_after': self.tasks[1].created.isoformat(),
+            'created_before': self.tasks[2].created.isoformat(),
+        })
 
-    def test_task_solved_solve(self):
+        self.assertEqual([item['id'] for item in response.data], [self.tasks[1].pk])
+
+    def test_filter_by_updated_date(self):
         """
-        Tests to solve an already solved task. The status code returned should
-        be 304.
+        Tests that the task list can be filtered by an updated date range.
+        """
+        response = self.get_task_list({'updated_after': self.tasks[2].updated.isoformat()})
+
+        self.assertEqual([item['id'] for item in response.data], [self.tasks[2].pk])
+
+    def test_ordering(self):
+        """
+        Tests that the task list can be ordered from the newest task.
         """
+        response = self.get_task_list({'ordering': '-created'})
+
+        self.assertEqual([item['id'] for item in response.data],
+                         [task.pk for task in reversed(self.tasks)])
+
+    def test_ordering_is_kept_across_pages(self):
+        """
+        Tests that following the next links keeps the requested ordering.
+        """
+        Task.objects.filter(pk=self.tasks[0].pk).solve()
+
+        seen = []
+        params = {'ordering': '-updated', 'page_size': 1}
         factory = APIRequestFactory()
-        task_id = self.tasks[1].pk
-        request = factory.put('/api/v1/tasks/{}/solve/'.format(task_id), format='json')
-        force_authenticate(request, user=self.user)
+        url = '/api/v1/tasks/'
+
+        while url is not None:
+            request = factory.get(url, params)
+            force_authenticate(request, user=self.user)
+            response = TaskList.as_view()(request)
+            seen.extend(item['id'] for item in response.data)
+
+            link = response.get('Link', '')
+            url = link[1:link.index('>')] if 'rel="next"' in link else None
+            params = None
+
+        self.assertEqual(seen, [self.tasks[0].pk, self.tasks[2].pk, self.tasks[1].pk])
+
+    def test_sparse_fields(self):
+        """
+        Tests that the fields parameter restricts the fields of every task.
+        """
+        response = self.get_task_list({'fields': 'id,description'})
+
+        self.assertEqual(response.data[0], {'id': self.tasks[0].pk, 'description': 'first'})
+
+    def test_default_fields(self):
+        """
+        Tests that without fields parameter the task list serializer fields
+        are returned.
+        """
+        response = self.get_task_list({})
+
+        self.assertEqual(list(response.data[0]), ['id', 'name', 'status'])
+
+    def test_invalid_parameters(self):
+        """
+        Tests that invalid filtering, ordering or fields parameters return
+        a 400 status code.
+        """
+        self.assertEqual(self.get_task_list({'status': 'done'}).status_code, 400)
+        self.assertEqual(self.get_task_list({'ordering': 'name'}).status_code, 400)
+        self.assertEqual(self.get_task_list({'fields': 'id,owner'}).status_code, 400)
+        self.assertEqual(self.get_task_list({'created_after': 'now'}).status_code, 400)
 
-        task_solve_view = TaskSolve.as_view()
-        response = task_solve_view(request, pk=task_id)
 
-        self.assertEqual(response.status_code, 304)
\ No newline at end of file
+class TaskListCacheTestCase(TestCase):
+    """
+    TaskList response cache tests
+    """
+    def setUp(self):
+        cache.clear()
+        task_list_cache.stats.reset()
+
+        self.user = User.objects.create(username="master")
+        self.task = Task.objects.create(name='One', owner=self.user)
+        self.factory = APIRequestFactory()
+
+    def get_task_list(self, url='/api/v1/tasks/'):
+        request = self.factory.get(url, format='json')
+        force_authenticate(request, user=self.user)
+
+        return TaskList.as_view()(request)
+
+    def test_task_list_is_cached(self):
+        """
+        Tests that the second time the task list is requested it is served
+        from the cache, only querying the database for its validators.
+        """
+        first_response = self.get_task_list()
+
+        with self.assertNumQueries(2):
+            second_response = self.get_task_list()
+
+        self.assertEqual(second_response.data, first_response.data)
+        self.assertEqual(task_list_cache.stats.misses, 1)
+        self.assertEqual(task_list_cache.stats.hits, 1)
+
+    def test_task_list_pages_are_cached_separately(self):
+        """
+        Tests that every page of the task list has its own cache entry,
+        including its Link header.
+        """
+        Task.objects.create(name='Two', owner=self.user)
+        first_page = self.get_task_list('/api/v1/tasks/?page_size=1')
+        self.get_task_list()
+
+        cached_first_page = self.get_task_list('/api/v1/tasks/?page_size=1')
+
+        self.assertEqual(cached_first_page.data, first_page.data)
+        self.assertEqual(cached_first_page['Link'], first_page['Link'])
+
+    def test_saving_a_task_invalidates_the_cache(self):
+        """
+        Tests that saving a task invalidates its owner's cached task list.
+        """
+        self.get_task_list()
+        Task.objects.create(name='Two', owner=self.user)
+
+        self.assertEqual(len(self.get_task_list().data), 2)
+
+    def test_deleting_a_task_invalidates_the_cache(self):
+        """
+        Tests that deleting a task invalidates its owner's cached task list.
+        """
+        self.get_task_list()
+        self.task.delete()
+
+        self.assertEqual(len(self.get_task_list().data), 0)
+
+    def test_solving_a_task_invalidates_the_cache(self):
+        """
+        Tests that solving a task invalidates its owner's cached task list.
+        """
+        self.get_task_list()
+
+        request = self.factory.put('/api/v1/tasks/{}/solve/'.format(self.task.pk),
+                                   format='json')
+        force_authenticate(request, user=self.user)
+        TaskSolve.as_view()(request, pk=self.task.pk)
+
+        self.assertEqual(self.get_task_list().data[0]['status'], 'Solved')
+
+    def test_bulk_solving_tasks_invalidates_the_cache(self):
+        """
+        Tests that bulk solving tasks invalidates their owner's cached task list.
+        """
+        self.get_task_list()
+
+        request = self.factory.put('/api/v1/tasks/solve/', {'ids': [self.task.pk]},
+                                   format='json')
+        force_authenticate(request, user=self.user)
+        TaskBulkSolve.as_view()(request)
+
+        self.assertEqual(self.get_task_list().data[0]['status'], 'Solved')
+
+    def test_bulk_creating_tasks_invalidates_the_cache(self):
+        """
+        Tests that bulk creating tasks invalidates their owner's cached task list.
+        """
+        self.get_task_list()
+
+        request = self.factory.post('/api/v1/tasks/bulk/', [{'name': 'Two'}],
+                                    format='json')
+        force_authenticate(request, user=self.user)
+        TaskBulkCreate.as_view()(request)
+
+        self.assertEqual(len(self.get_task_list().data), 2)
+
+    def test_missed_invalidation_serves_the_current_list(self):
+        """
+        Tests that a change whose invalidation this process missed, such as
+        one made by another process with a cache of its own, is never served
+        from an outdated cached page.
+        """
+        self.get_task_list()
+
+        with mock.patch('apps.tasks.signals.invalidate_task_list'):
+            Task.objects.filter(pk=self.task.pk).update(name='Renamed',
+                                                        updated=timezone.now())
+            Task.objects.create(name='Two', owner=self.user)
+
+        response = self.get_task_list()
+
+        self.assertEqual([task['name'] for task in response.data], ['Renamed', 'Two'])
+        self.assertEqual(task_list_cache.stats.hits, 0)
+
+    def test_cache_is_per_user(self):
+        """
+        Tests that users do not share their cached task lists.
+        """
+        self.get_task_list()
+
+        user_two = User.objects.create(username="puppet")
+        request = self.factory.get('/api/v1/tasks/', format='json')
+        force_authenticate(request, user=user_two)
+        response = TaskList.as_view()(request)
+
+        self.assertEqual(response.data, [])
+
+
+class TaskConditionalGetTestCase(TestCase):
+    """
+    ETag and Last-Modified tests on the task list and detail
+    """
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create(username="master")
+        self.task = Task.objects.create(name='One', owner=self.user)
+        self.factory = APIRequestFactory()
+
+    def get_task_list(self, **headers):
+        request = self.factory.get('/api/v1/tasks/', format='json', **headers)
+        force_authenticate(request, user=self.user)
+
+        return TaskList.as_view()(request)
+
+    def get_task_detail(self, **headers):
+        request = self.factory.get('/api/v1/tasks/{}/'.format(self.task.pk),
+                                   format='json', **headers)
+        force_authenticate(request, user=self.user)
+
+        return TaskDetail.as_view()(request, pk=self.task.pk)
+
+    def test_task_list_validators(self):
+        """
+        Tests that the task list is sent with its ETag and Last-Modified headers.
+        """
+        response = self.get_task_list()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_task_list_if_none_match(self):
+        """
+        Tests that the task list answers a matching If-None-Match with a 304
+        using an aggregate query and the counter query, and a stale one with
+        a 200.
+        """
+        etag = self.get_task_list()['ETag']
+
+        with self.assertNumQueries(2):
+            response = self.get_task_list(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        Task.objects.create(name='Two', owner=self.user)
+        response = self.get_task_list(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_task_list_etag_changes_on_delete(self):
+        """
+        Tests that deleting a task changes the task list ETag.
+        """
+        Task.objects.create(name='Two', owner=self.user)
+        etag = self.get_task_list()['ETag']
+        self.task.delete()
+
+        response = self.get_task_list(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_task_list_if_modified_since(self):
+        """
+        Tests that the task list answers an If-Modified-Since later than its
+        last change with a 304.
+        """
+        last_modified = self.get_task_list()['Last-Modified']
+        response = self.get_task_list(HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_task_list_if_modified_since_after_delete(self):
+        """
+        Tests that deleting a task moves the task list Last-Modified forward,
+        even when the remaining tasks are older.
+        """
+        Task.objects.create(name='Two', owner=self.user)
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        Task.objects.update(updated=an_hour_ago)
+        TaskCounter.objects.update(updated=an_hour_ago)
+
+        last_modified = self.get_task_list()['Last-Modified']
+        self.task.delete()
+
+        response = self.get_task_list(HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+    def test_task_detail_if_none_match(self):
+        """
+        Tests that the task detail answers a matching If-None-Match with a 304
+        using a single query, and a stale one with a 200.
+        """
+        etag = self.get_task_detail()['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.get_task_detail(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+        Task.objects.filter(pk=self.task.pk).solve()
+        response = self.get_task_detail(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'Solved')
+
+    def test_task_detail_if_modified_since(self):
+        """
+        Tests that the task detail answers an If-Modified-Since later than its
+        last change with a 304.
+        """
+        last_modified = self.get_task_detail()['Last-Modified']
+        response = self.get_task_detail(HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, 304)
+
+
+class TaskChangesTestCase(TestCase):
+    """
+    TaskChanges view tests
+    """
+    def setUp(self):
+        self.user = User.objects.create(username="master")
+        self.user_two = User.objects.create(username="puppet")
+
+        self.tasks = [
+            Task.objects.create(name='One', owner=self.user),
+            Task.objects.create(name='Two', owner=self.user),
+            Task.objects.create(name='Three', owner=self.user),
+        ]
+        Task.objects.create(name='Four', owner=self.user_two)
+
+    def get_changes(self, since=None, page_size=None):
+        params = {}
+        if since is not None:
+            params['since'] = since
+        if page_size is not None:
+            params['page_size'] = page_size
+
+        factory = APIRequestFactory()
+        request = factory.get('/api/v1/tasks/changes/', params)
+        force_authenticate(request, user=self.user)
+
+        return TaskChanges.as_view()(request)
+
+    def test_changes_without_authentication(self):
+        """
+        Tests that getting the changes without authentication returns a 401 error.
+        """
+        factory = APIRequestFactory()
+        request = factory.get('/api/v1/tasks/changes/')
+        response = TaskChanges.as_view()(request)
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_full_sync(self):
+        """
+        Tests that getting the changes without a sync token returns every
+        task of the user.
+        """
+        response = self.get_changes()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data['changed']],
+                         [task.pk for task in self.tasks])
+        self.assertEqual(response.data['deleted'], [])
+        self.assertFalse(response.data['more'])
+
+    def test_full_sync_ignores_earlier_deletions(self):
+        """
+        Tests that a full sync does not send the tasks deleted before it.
+        """
+        self.tasks[0].delete()
+
+        response = self.get_changes()
+
+        self.assertEqual(response.data['deleted'], [])
+
+    def test_sync_without_changes(self):
+        """
+        Tests that syncing right after a sync returns no changes, and the
+        same token issued anew.
+        """
+        token = self.get_changes().data['sync_token']
+        response = self.get_changes(since=token)
+
+        self.assertEqual(response.data['changed'], [])
+        self.assertEqual(response.data['deleted'], [])
+
+        old_token, new_token = decode_token(token), decode_token(response.data['sync_token'])
+        self.assertEqual(new_token._replace(issued=None), old_token._replace(issued=None))
+        self.assertGreater(new_token.issued, old_token.issued)
+
+    def test_sync_with_an_expired_token(self):
+        """
+        Tests that tokens issued longer than TASKS_DELETED_RETENTION ago, or
+        without an issue date, get a 410 error.
+        """
+        token = decode_token(self.get_changes().data['sync_token'])
+
+        expired = encode_token(token._replace(issued=timezone.now() - timedelta(days=2)))
+        with self.settings(TASKS_DELETED_RETENTION=24 * 3600):
+            self.assertEqual(self.get_changes(since=expired).status_code, 410)
+
+        undated = urlsafe_b64encode(urlencode([('d', token.deleted_pk)]).encode('ascii'))
+        self.assertEqual(self.get_changes(since=undated.decode('ascii')).status_code, 410)
+
+    def test_prune_deleted_tasks(self):
+        """
+        Tests that prune_deleted_tasks removes the deletions older than
+        TASKS_DELETED_RETENTION and those of users who no longer exist.
+        """
+        expired_pk, kept_pk = self.tasks[0].pk, self.tasks[1].pk
+        self.tasks[0].delete()
+        self.tasks[1].delete()
+        DeletedTask.objects.filter(task_id=expired_pk).update(
+            deleted=timezone.now() - timedelta(days=2))
+        DeletedTask.objects.create(task_id=100, owner_id=self.user_two.pk + 1)
+
+        with self.settings(TASKS_DELETED_RETENTION=24 * 3600):
+            call_command('prune_deleted_tasks', batch_size=1, stdout=StringIO())
+
+        self.assertEqual(list(DeletedTask.objects.values_list('task_id', flat=True)),
+                         [kept_pk])
+
+    def test_sync_returns_changed_created_and_deleted_tasks(self):
+        """
+        Tests that syncing returns the tasks updated and created since the
+        token, along with the ids of the deleted ones.
+        """
+        token = self.get_changes().data['sync_token']
+
+        Task.objects.filter(pk=self.tasks[1].pk).solve()
+        new_task = Task.objects.create(name='Five', owner=self.user)
+        deleted_task_id = self.tasks[0].pk
+        self.tasks[0].delete()
+
+        response = self.get_changes(since=token)
+
+        self.assertEqual([item['id'] for item in response.data['changed']],
+                         [self.tasks[1].pk, new_task.pk])
+        self.assertEqual(response.data['changed'][0]['status'], 'Solved')
+        self.assertEqual(response.data['deleted'], [deleted_task_id])
+
+    def test_sync_sends_changes_committed_out_of_order(self):
+        """
+        Tests that changes dated before another writer's change, but
+        committed after it, as when their writer waited for the database
+        lock, reach the clients which synced in between.
+        """
+        stamped = timezone.now() - timedelta(seconds=1)
+        token = self.get_changes().data['sync_token']
+
+        later = Task.objects.create(name='Five', owner=self.user)
+        token = self.get_changes(since=token).data['sync_token']
+
+        with mock.patch('django.utils.timezone.now', return_value=stamped):
+            self.tasks[0].name = 'Renamed'
+            self.tasks[0].save()
+            Task.objects.filter(pk=self.tasks[1].pk).solve()
+            Task.objects.create(name='Six', owner=self.user)
+
+        self.assertLess(Task.objects.get(pk=self.tasks[0].pk).updated,
+                        Task.objects.get(pk=later.pk).updated)
+
+        response = self.get_changes(since=token)
+
+        self.assertEqual([item['name'] for item in response.data['changed']],
+                         ['Renamed', 'Two', 'Six'])
+
+    def test_sync_with_an_updated_date_token(self):
+        """
+        Tests that tokens keyed on the updated date of the tasks get a 410
+        error.
+        """
+        token = decode_token(self.get_changes().data['sync_token'])
+        dated = urlencode([('d', token.deleted_pk), ('i', self.tasks[0].pk),
+                           ('s', token.issued.isoformat()),
+                           ('u', timezone.now().isoformat())])
+        dated = urlsafe_b64encode(dated.encode('ascii')).decode('ascii')
+
+        self.assertEqual(self.get_changes(since=dated).status_code, 410)
+
+    def test_sync_in_pages(self):
+        """
+        Tests that following the sync tokens while there are more changes
+        returns every task once, even when they share their updated date.
+        """
+        Task.objects.filter(owner=self.user).solve()
+
+        seen = []
+        response = self.get_changes(page_size=1)
+        seen.extend(item['id'] for item in response.data['changed'])
+
+        while response.data['more']:
+            response = self.get_changes(since=response.data['sync_token'], page_size=1)
+            seen.extend(item['id'] for item in response.data['changed'])
+
+        self.assertEqual(sorted(seen), [task.pk for task in self.tasks])
+
+    def test_invalid_sync_token(self):
+        """
+        Tests that an invalid sync token returns a 400 status code.
+        """
+        response = self.get_changes(since='invalid')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_deleting_a_task_logs_it(self):
+        """
+        Tests that deleting a task records its id and owner.
+        """
+        task_id = self.tasks[0].pk
+        self.tasks[0].delete()
+
+        deleted_task = DeletedTask.objects.get()
+
+        self.assertEqual(deleted_task.task_id, task_id)
+        self.assertEqual(deleted_task.owner, self.user)
+
+
+class TaskEventBrokerTestCase(TestCase):
+    """
+    LocalBroker tests
+    """
+    def setUp(self):
+        self.broker = events.LocalBroker()
+
+    def test_publish_reaches_the_owner_subscriptions(self):
+        """
+        Tests that an event reaches every subscription of its owner and
+        no other one.
+        """
+        first = self.broker.subscribe(1)
+        second = self.broker.subscribe(1)
+        other = self.broker.subscribe(2)
+        event = events.Event(type=events.CREATED, ids=[5])
+
+        self.broker.publish(1, event)
+
+        self.assertEqual(first.get(timeout=0), event)
+        self.assertEqual(second.get(timeout=0), event)
+        self.assertIsNone(other.get(timeout=0))
+
+    def test_closed_subscriptions_are_removed(self):
+        """
+        Tests that closing the last subscription of an owner forgets the owner.
+        """
+        subscription = self.broker.subscribe(1)
+        subscription.close()
+
+        self.broker.publish(1, events.Event(type=events.CREATED, ids=[5]))
+
+        self.assertEqual(self.broker.subscriptions, {})
+        self.assertIsNone(subscription.get(timeout=0))
+
+    def test_overflowed_subscription_gets_a_resync_event(self):
+        """
+        Tests that a subscription falling behind TASKS_EVENTS_QUEUE_SIZE
+        events gets a single resync event instead of the queued ones.
+        """
+        with self.settings(TASKS_EVENTS_QUEUE_SIZE=2):
+            subscription = self.broker.subscribe(1)
+
+        for pk in range(3):
+            self.broker.publish(1, events.Event(type=events.CREATED, ids=[pk]))
+
+        self.assertEqual(subscription.get(timeout=0),
+                         events.Event(type=events.RESYNC, ids=None))
+        self.assertIsNone(subscription.get(timeout=0))
+
+    def test_broker_is_chosen_by_setting(self):
+        """
+        Tests that the broker is an instance of TASKS_EVENTS_BROKER.
+        """
+        with self.settings(TASKS_EVENTS_BROKER='apps.tasks.events.LocalBroker'):
+            broker = events.get_broker()
+
+            self.assertIsInstance(broker, events.LocalBroker)
+            self.assertIs(events.get_broker(), broker)
+
+
+class TaskEventsTestCase(TransactionTestCase):
+    """
+    TaskEvents view and task change notification tests
+    """
+    def setUp(self):
+        self.user = User.objects.create(username="master")
+        self.task = Task.objects.create(name='One', owner=self.user)
+        self.subscription = events.get_broker().subscribe(self.user.pk)
+
+    def tearDown(self):
+        self.subscription.close()
+
+    def stream(self, user=None):
+        factory = APIRequestFactory()
+        request = factory.get('/api/v1/tasks/events/')
+        force_authenticate(request, user=user or self.user)
+
+        return TaskEvents.as_view()(request)
+
+    def test_events_without_authentication(self):
+        """
+        Tests that streaming events without authentication returns a 401 error.
+        """
+        factory = APIRequestFactory()
+        request = factory.get('/api/v1/tasks/events/')
+        response = TaskEvents.as_view()(request)
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_events_are_streamed(self):
+        """
+        Tests that published events are streamed as server-sent events.
+        """
+        response = self.stream()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+        content = iter(response.streaming_content)
+        self.assertEqual(next(content), b': subscribed\n\n')
+
+        events.get_broker().publish(self.user.pk, events.Event(type=events.SOLVED, ids=[3]))
+        self.assertEqual(next(content), b'event: solved\ndata: {"ids":[3]}\n\n')
+
+        response.close()
+
+    def test_idle_stream_sends_heartbeats_until_max_age(self):
+        """
+        Tests that an idle stream sends heartbeats and ends after
+        TASKS_EVENTS_MAX_AGE.
+        """
+        with self.settings(TASKS_EVENTS_HEARTBEAT=0.01, TASKS_EVENTS_MAX_AGE=0.05):
+            content = list(self.stream().streaming_content)
+
+        self.assertEqual(content[0], b': subscribed\n\n')
+        self.assertTrue(content[1:])
+        self.assertEqual(set(content[1:]), {b': heartbeat\n\n'})
+
+    def test_open_streams_are_limited_per_user(self):
+        """
+        Tests that a user with TASKS_EVENTS_MAX_STREAMS streams open gets a
+        429 error for another one, until one of them is closed, while other
+        users are unaffected.
+        """
+        with self.settings(TASKS_EVENTS_MAX_STREAMS=2):
+            first = self.stream()
+            refused = self.stream()
+            other = self.stream(user=User.objects.create(username="puppet"))
+            first.close()
+            reopened = self.stream()
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(refused.status_code, 429)
+        self.assertEqual(other.status_code, 200)
+        self.assertEqual(reopened.status_code, 200)
+
+        other.close()
+        reopened.close()
+
+    def test_saving_tasks_publishes_events(self):
+        """
+        Tests that creating, updating and deleting a task publish events.
+        """
+        task = Task.objects.create(name='Two', owner=self.user)
+        task.name = 'Second'
+        task.save()
+        task_id = task.pk
+        task.delete()
+
+        self.assertEqual(self.subscription.get(timeout=0),
+                         events.Event(type=events.CREATED, ids=[task_id]))
+        self.assertEqual(self.subscription.get(timeout=0),
+                         events.Event(type=events.UPDATED, ids=[task_id]))
+        self.assertEqual(self.subscription.get(timeout=0),
+                         events.Event(type=events.DELETED, ids=[task_id]))
+
+    def test_saving_deferred_tasks_publishes_events(self):
+        """
+        Tests that updating and deleting a task loaded without its owner
+        publish events.
+        """
+        task = Task.objects.only('name').get()
+        task.name = 'Renamed'
+        task.save()
+        Task.objects.only('name').get().delete()
+
+        self.assertEqual(self.subscription.get(timeout=0),
+                         events.Event(type=events.UPDATED, ids=[self.task.pk]))
+        self.assertEqual(self.subscription.get(timeout=0),
+                         events.Event(type=events.DELETED, ids=[self.task.pk]))
+
+    def test_solving_a_task_publishes_an_event(self):
+        """
+        Tests that solving a task publishes a solved event.
+        """
+        factory = APIRequestFactory()
+        request = factory.put('/api/v1/tasks/{}/solve/'.format(self.task.pk))
+        force_authenticate(request, user=self.user)
+        TaskSolve.as_view()(request, pk=str(self.task.pk))
+
+        self.assertEqual(self.subscription.get(timeout=0),
+                         events.Event(type=events.SOLVED, ids=[self.task.pk]))
+
+    def test_bulk_solving_tasks_publishes_an_event(self):
+        """
+        Tests that bulk solving tasks publishes a single solved event.
+        """
+        factory = APIRequestFactory()
+        request = factory.put('/api/v1/tasks/solve/', {'ids': [self.task.pk]}, format='json')
+        force_authenticate(request, user=self.user)
+        TaskBulkSolve.as_view()(request)
+
+        self.assertEqual(self.subscription.get(timeout=0),
+                         events.Event(type=events.SOLVED, ids=[self.task.pk]))
+        self.assertIsNone(self.subscription.get(timeout=0))
+
+    def test_bulk_creating_tasks_publishes_an_event(self):
+        """
+        Tests that bulk creating tasks publishes a single created event.
+        """
+        factory = APIRequestFactory()
+        request = factory.post('/api/v1/tasks/bulk/', [{'name': 'A'}, {'name': 'B'}],
+                               format='json')
+        force_authenticate(request, user=self.user)
+        response = TaskBulkCreate.as_view()(request)
+
+        self.assertEqual(self.subscription.get(timeout=0),
+                         events.Event(type=events.CREATED,
+                                      ids=[task['id'] for task in response.data]))
+        self.assertIsNone(self.subscription.get(timeout=0))
+
+    def test_events_are_published_on_commit(self):
+        """
+        Tests that no event is published for a rolled back change.
+        """
+        try:
+            with transaction.atomic():
+                Task.objects.create(name='Two', owner=self.user)
+                raise ValueError()
+        except ValueError:
+            pass
+
+        self.assertIsNone(self.subscription.get(timeout=0))
+
+
+class TaskSearchTestCase(TestCase):
+    """
+    TaskSearch view tests
+    """
+    def setUp(self):
+        self.user = User.objects.create(username="master")
+        self.user_two = User.objects.create(username="puppet")
+
+        self.guitar_task = Task.objects.create(
+            name='Guitar solo', owner=self.user,
+            description='Play the guitar solo, then tune the guitar again')
+        self.tune_task = Task.objects.create(
+            name='Tune the piano', owner=self.user,
+            description='Call someone about the guitar')
+        self.closet_task = Task.objects.create(name='Clean the closet', owner=self.user)
+        Task.objects.create(name='Guitar lessons', owner=self.user_two)
+
+    def search(self, params):
+        factory = APIRequestFactory()
+        request = factory.get('/api/v1/tasks/search/', params)
+        force_authenticate(request, user=self.user)
+
+        return TaskSearch.as_view()(request)
+
+    def search_ids(self, query):
+        return [item['id'] for item in self.search({'q': query}).data]
+
+    def test_search_without_authentication(self):
+        """
+        Tests that searching without authentication returns a 401 error.
+        """
+        factory = APIRequestFactory()
+        request = factory.get('/api/v1/tasks/search/', {'q': 'guitar'})
+        response = TaskSearch.as_view()(request)
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_search_ranks_the_user_tasks(self):
+        """
+        Tests that the search returns the user's matching tasks only, from
+        the most to the least relevant one, with the task list fields.
+        """
+        response = self.search({'q': 'guitar'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data],
+                         [self.guitar_task.pk, self.tune_task.pk])
+        self.assertEqual(list(response.data[0]), ['id', 'name', 'status'])
+
+    def test_search_ignores_the_owner_id(self):
+        """
+        Tests that searching for the user's id doesn't match every task of
+        the user.
+        """
+        self.assertEqual(self.search_ids(str(self.user.pk)), [])
+
+        numbered_task = Task.objects.create(name='Call {}'.format(self.user.pk),
+                                            owner=self.user)
+        self.assertEqual(self.search_ids(str(self.user.pk)), [numbered_task.pk])
+
+    def test_search_matches_every_term(self):
+        """
+        Tests that the search only returns tasks matching every term.
+        """
+        self.assertEqual(self.search_ids('tune piano'), [self.tune_task.pk])
+
+    def test_search_ignores_query_operators(self):
+        """
+        Tests that full-text query syntax in the query is searched as words.
+        """
+        self.assertEqual(self.search_ids('"closet OR NEAR(guitar'), [])
+        self.assertEqual(self.search_ids('closet*'), [self.closet_task.pk])
+
+    def test_search_follows_changes(self):
+        """
+        Tests that the search index follows renamed and deleted tasks.
+        """
+        self.closet_task.name = 'Clean the garage'
+        self.closet_task.save()
+        self.guitar_task.delete()
+
+        self.assertEqual(self.search_ids('closet'), [])
+        self.assertEqual(self.search_ids('garage'), [self.closet_task.pk])
+        self.assertEqual(self.search_ids('guitar'), [self.tune_task.pk])
+
+    def test_search_pages(self):
+        """
+        Tests that search results are paginated with next and prev links.
+        """
+        first_page = self.search({'q': 'guitar', 'page_size': 1})
+        second_page = self.search({'q': 'guitar', 'page_size': 1, 'offset': 1})
+
+        self.assertEqual([item['id'] for item in first_page.data], [self.guitar_task.pk])
+        self.assertIn('rel="next"', first_page['Link'])
+        self.assertEqual([item['id'] for item in second_page.data], [self.tune_task.pk])
+        self.assertEqual(second_page['Link'].count('rel='), 1)
+        self.assertIn('rel="prev"', second_page['Link'])
+
+    def test_search_without_query(self):
+        """
+        Tests that searching without a query returns a 400 status code.
+        """
+        self.assertEqual(self.search({}).status_code, 400)
+        self.assertEqual(self.search({'q': 'guitar', 'offset': -1}).status_code, 400)
+
+    def test_simple_search_backend(self):
+        """
+        Tests that the simple search backend returns the user's tasks
+        matching every term.
+        """
+        with self.settings(TASKS_SEARCH_BACKEND='apps.tasks.search.SimpleSearchBackend'):
+            self.assertEqual(self.search_ids('guitar'),
+                             [self.tune_task.pk, self.guitar_task.pk])
+            self.assertEqual(self.search_ids('tune piano'), [self.tune_task.pk])
+
+
+class TaskDetailTestCase(TestCase):
+    """
+    TaskDetail view tests
+    """
+    def setUp(self):
+        self.user = User.objects.create(username="master")
+        self.user_two = User.objects.create(username="puppet")
+
+        self.tasks = [
+            Task.objects.create(name='One', owner=self.user),
+            Task.objects.create(name='Two', owner=self.user),
+            Task.objects.create(name='Three', owner=self.user),
+        ]
+
+    def test_task_detail_queryset(self):
+        """
+        Tests that the queryset attribute on the TaskDetail class
+        is a list containing all of the Task objects.
+        """
+        self.assertListEqual(list(TaskDetail.queryset.all()),
+                             list(Task.objects.all()))
+
+    def test_task_detail_authentication_classes(self):
+        """
+        Tests that the authentication_classes attribute on the TaskDetail class
+        contains the valid class list values.
+        """
+        self.assertEqual(TaskDetail.authentication_classes,
+                         (CachedTokenAuthentication,))
+
+    def test_task_detail_permission_classes(self):
+        """
+        Tests that the permission_classes attribute on the TaskDetail view contains
+        the right classes
+        """
+        self.assertEqual(TaskDetail.permission_classes, (IsAuthenticated,))
+
+    def test_get_task_list_without_authentication(self):
+        """
+        Tests that when a user is not authenticated he/she is
+        not able to get the task list.
+        """
+        factory = APIRequestFactory()
+        request = factory.get('/api/v1/tasks/1/', format='json')
+        task_detail_view = TaskDetail.as_view()
+        response = task_detail_view(request, pk=1)
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_user_cannot_see_other_tasks_but_hims(self):
+        """
+        Tests that when an authenticated user can only see the detail for its
+        tasks.
+        """
+        factory = APIRequestFactory()
+        task_id = self.tasks[0].pk
+        request = factory.get('/api/v1/tasks/{}/'.format(task_id), format='json')
+        task_detail_view = TaskDetail.as_view()
+        force_authenticate(request, user=self.user_two)
+
+        response = task_detail_view(request, pk=task_id)
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_task_detail_fields(self):
+        """
+        Tests that when an authenticated and tries to get his/her task detail
+        it only gets the correct fields.
+        """
+        factory = APIRequestFactory()
+        task_id = self.tasks[0].pk
+        request = factory.get('/api/v1/tasks/1/'.format(task_id))
+        task_detail_view = TaskDetail.as_view()
+        force_authenticate(request, user=self.user)
+
+        response = task_detail_view(request, pk=task_id)
+
+        self.assertEqual(response.status_code, 200)
+
+        task_fields = ['id', 'name', 'description',
+                       'status', 'created', 'updated']
+
+        for task_field in task_fields:
+            self.assertEqual(task_field in response.data, True)
+
+
+class TaskSolveTestCase(TestCase):
+    """
+    TaskSolve view tests
+    """
+    def setUp(self):
+        self.user = User.objects.create(username="master")
+        self.user_two = User.objects.create(username="puppet")
+
+        self.tasks = [
+            Task.objects.create(name='One', owner=self.user),
+            Task.objects.create(name='Two', owner=self.user, status=Task.SOLVED),
+            Task.objects.create(name='Three', owner=self.user),
+        ]
+
+    def test_task_detail_authentication_classes(self):
+        """
+        Tests that the authentication_classes attribute on the TaskSolve class
+        contains the valid class list values.
+        """
+        self.assertEqual(TaskSolve.authentication_classes,
+                         (CachedTokenAuthentication,))
+
+    def test_task_solve_without_authentication(self):
+        """
+        Tests that when a user is not authenticated he/she is
+        not able to get the task list.
+        """
+        factory = APIRequestFactory()
+        request = factory.put('/api/v1/tasks/1/solve/', format='json')
+        task_solve_view = TaskSolve.as_view()
+        response = task_solve_view(request, pk=1)
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_task_detail_permission_classes(self):
+        """
+        Tests that the permission_classes attribute on the TaskSolve view contains
+        the right classes
+        """
+        self.assertEqual(TaskSolve.permission_classes, (IsAuthenticated,))
+
+    def test_task_solve_with_invalid_user(self):
+        """
+        Tests that when a user is not the owner of a given task
+        the status code returned is 404
+        """
+        factory = APIRequestFactory()
+        task_id = self.tasks[0].pk
+        request = factory.put('/api/v1/tasks/{}/solve/'.format(task_id), format='json')
+        force_authenticate(request, user=self.user_two)
+
+        task_solve_view = TaskSolve.as_view()
+        response = task_solve_view(request, pk=task_id)
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_task_solve_with_valid_user_solves_task(self):
+        """
+        Tests to solve a task using the owner as the authenticated user.
+        The status code should be 200 and the task should be solved.
+        """
+        factory = APIRequestFactory()
+        task_id = self.tasks[0].pk
+        request = factory.put('/api/v1/tasks/{}/solve/'.format(task_id), format='json')
+        force_authenticate(request, user=self.user)
+
+        task_solve_view = TaskSolve.as_view()
+        response = task_solve_view(request, pk=task_id)
+
+        self.assertEqual(response.status_code, 200)
+
+        task = Task.objects.get(pk=task_id)
+
+        self.assertEqual(task.status, Task.SOLVED)
+
+    def test_task_solved_solve(self):
+        """
+        Tests to solve an already solved task. The status code returned should
+        be 304.
+        """
+        factory = APIRequestFactory()
+        task_id = self.tasks[1].pk
+        request = factory.put('/api/v1/tasks/{}/solve/'.format(task_id), format='json')
+        force_authenticate(request, user=self.user)
+
+        task_solve_view = TaskSolve.as_view()
+        response = task_solve_view(request, pk=task_id)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_task_solve_updates_the_updated_date(self):
+        """
+        Tests that solving a task also bumps its updated date.
+        """
+        factory = APIRequestFactory()
+        task = self.tasks[0]
+        request = factory.put('/api/v1/tasks/{}/solve/'.format(task.pk), format='json')
+        force_authenticate(request, user=self.user)
+
+        task_solve_view = TaskSolve.as_view()
+        response = task_solve_view(request, pk=task.pk)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(Task.objects.get(pk=task.pk).updated, task.updated)
+
+    def test_task_solve_with_unknown_task(self):
+        """
+        Tests that solving a task which does not exist returns a 404 status code.
+        """
+        factory = APIRequestFactory()
+        request = factory.put('/api/v1/tasks/0/solve/', format='json')
+        force_authenticate(request, user=self.user)
+
+        task_solve_view = TaskSolve.as_view()
+        response = task_solve_view(request, pk=0)
+
+        self.assertEqual(response.status_code, 404)
+
+
+class TaskBulkSolveTestCase(TestCase):
+    """
+    TaskBulkSolve view tests
+    """
+    def setUp(self):
+        self.user = User.objects.create(username="master")
+        self.user_two = User.objects.create(username="puppet")
+
+        self.tasks = [
+            Task.objects.create(name='One', owner=self.user),
+            Task.objects.create(name='Two', owner=self.user, status=Task.SOLVED),
+            Task.objects.create(name='Three', owner=self.user),
+        ]
+        self.other_task = Task.objects.create(name='Four', owner=self.user_two)
+
+    def put_solve(self, data):
+        factory = APIRequestFactory()
+        request = factory.put('/api/v1/tasks/solve/', data, format='json')
+        force_authenticate(request, user=self.user)
+
+        return TaskBulkSolve.as_view()(request)
+
+    def test_bulk_solve_without_authentication(self):
+        """
+        Tests that bulk solving tasks without authentication returns a 401 error.
+        """
+        factory = APIRequestFactory()
+        request = factory.put('/api/v1/tasks/solve/', {'ids': []}, format='json')
+        response = TaskBulkSolve.as_view()(request)
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_bulk_solve_by_ids(self):
+        """
+        Tests that bulk solving a list of ids solves the user's pending tasks
+        and counts the solved, already solved and unknown ids.
+        """
+        ids = [task.pk for task in self.tasks] + [self.other_task.pk]
+
+        # The change number, task and counter UPDATEs, then the count.
+        with self.assertNumQueries(4):
+            response = self.put_solve({'ids': ids})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'solved': 2,
+            'already_solved': 1,
+            'not_found': 1,
+        })
+        self.assertFalse(Task.objects.filter(owner=self.user,
+                                             status=Task.PENDING).exists())
+        self.assertEqual(Task.objects.get(pk=self.other_task.pk).status, Task.PENDING)
+
+    def test_bulk_solve_by_creation_date(self):
+        """
+        Tests that bulk solving by creation date solves the user's pending
+        tasks created before that date.
+        """
+        response = self.put_solve({'created_before': self.tasks[2].created.isoformat()})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'solved': 1,
+            'already_solved': 1,
+            'not_found': 0,
+        })
+        self.assertEqual(Task.objects.get(pk=self.tasks[0].pk).status, Task.SOLVED)
+        self.assertEqual(Task.objects.get(pk=self.tasks[2].pk).status, Task.PENDING)
+
+    def test_bulk_solve_requires_ids_or_creation_date(self):
+        """
+        Tests that bulk solving without ids nor creation date, or with both,
+        returns a 400 status code.
+        """
+        self.assertEqual(self.put_solve({}).status_code, 400)
+        self.assertEqual(self.put_solve({
+            'ids': [self.tasks[0].pk],
+            'created_before': self.tasks[2].created.isoformat(),
+        }).status_code, 400)
+
+    def test_bulk_solve_too_many_ids(self):
+        """
+        Tests that bulk solving more than TASKS_BULK_SOLVE_MAX_SIZE ids
+        returns a 400 status code.
+        """
+        with self.settings(TASKS_BULK_SOLVE_MAX_SIZE=1):
+            response = self.put_solve({'ids': [1, 2]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['ids'],
+                         ['Ensure this list has no more than 1 items.'])
+
+
+class TaskQuerySetTestCase(TestCase):
+    """
+    TaskQuerySet tests
+    """
+    def setUp(self):
+        self.user = User.objects.create(username="master")
+        self.pending_task = Task.objects.create(name='One', owner=self.user)
+        self.solved_task = Task.objects.create(name='Two', owner=self.user,
+                                               status=Task.SOLVED)
+
+    def test_solve_only_solves_pending_tasks(self):
+        """
+        Tests that solve returns the number of pending tasks it solved
+        and leaves the solved ones untouched.
+        """
+        self.assertEqual(Task.objects.filter(owner=self.user).solve(), 1)
+        self.assertEqual(Task.objects.get(pk=self.pending_task.pk).status, Task.SOLVED)
+        self.assertEqual(Task.objects.get(pk=self.solved_task.pk).updated,
+                         self.solved_task.updated)
+
+
+class TaskQueryCountTestCase(TestCase):
+    """
+    Pins the task endpoints to their minimum number of queries
+    """
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create(username="master")
+        self.task = Task.objects.create(name='One', owner=self.user)
+        self.factory = APIRequestFactory()
+
+    def test_task_list_queries(self):
+        """
+        Tests that listing the tasks takes the two queries computing its
+        validators and the query fetching the page.
+        """
+        request = self.factory.get('/api/v1/tasks/', format='json')
+        force_authenticate(request, user=self.user)
+
+        with self.assertNumQueries(3):
+            response = TaskList.as_view()(request)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_task_detail_queries(self):
+        """
+        Tests that getting a task detail takes a single query.
+        """
+        request = self.factory.get('/api/v1/tasks/{}/'.format(self.task.pk), format='json')
+        force_authenticate(request, user=self.user)
+
+        with self.assertNumQueries(1):
+            response = TaskDetail.as_view()(request, pk=self.task.pk)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_task_detail_of_another_user_queries(self):
+        """
+        Tests that getting the task detail of another user takes a single query.
+        """
+        user_two = User.objects.create(username="puppet")
+        request = self.factory.get('/api/v1/tasks/{}/'.format(self.task.pk), format='json')
+        force_authenticate(request, user=user_two)
+
+        with self.assertNumQueries(1):
+            response = TaskDetail.as_view()(request, pk=self.task.pk)
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_task_solve_queries(self):
+        """
+        Tests that solving a task takes the change number, task and counter
+        UPDATEs, and the query fetching the solved task.
+        """
+        request = self.factory.put('/api/v1/tasks/{}/solve/'.format(self.task.pk),
+                                   format='json')
+        force_authenticate(request, user=self.user)
+
+        with self.assertNumQueries(4):
+            response = TaskSolve.as_view()(request, pk=self.task.pk)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_task_solved_solve_queries(self):
+        """
+        Tests that solving an already solved task skips the counter UPDATE,
+        taking the change number and task UPDATEs and the existence check.
+        """
+        self.task.status = Task.SOLVED
+        self.task.save()
+        request = self.factory.put('/api/v1/tasks/{}/solve/'.format(self.task.pk),
+                                   format='json')
+        force_authenticate(request, user=self.user)
+
+        with self.assertNumQueries(3):
+            response = TaskSolve.as_view()(request, pk=self.task.pk)
+
+        self.assertEqual(response.status_code, 304)
+
+
+class TaskDatabaseRoutingTestCase(SimpleTestCase):
+    """
+    PrimaryReplicaRouter tests
+    """
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_reads_go_to_the_primary_by_default(self):
+        """
+        Tests that reads outside replica_reads() are left to the primary.
+        """
+        with self.settings(DATABASE_REPLICAS=['replica1']):
+            self.assertIsNone(self.router.db_for_read(Task))
+
+    def test_replica_reads_go_to_a_replica(self):
+        """
+        Tests that reads inside replica_reads() go to one of the replicas.
+        """
+        with self.settings(DATABASE_REPLICAS=['replica1', 'replica2']):
+            with replica_reads():
+                with replica_reads():
+                    self.assertIn(self.router.db_for_read(Task), ['replica1', 'replica2'])
+
+                self.assertIn(self.router.db_for_read(Task), ['replica1', 'replica2'])
+
+            self.assertIsNone(self.router.db_for_read(Task))
+
+    def test_replica_reads_without_replicas(self):
+        """
+        Tests that replica reads are left to the primary when there is no replica.
+        """
+        with self.settings(DATABASE_REPLICAS=[]), replica_reads():
+            self.assertIsNone(self.router.db_for_read(Task))
+
+    def test_writes_go_to_the_primary(self):
+        """
+        Tests that writes go to the primary, even inside replica_reads().
+        """
+        with self.settings(DATABASE_REPLICAS=['replica1']), replica_reads():
+            self.assertEqual(self.router.db_for_write(Task), 'default')
+
+    def test_writes_are_sticky_for_a_while(self):
+        """
+        Tests that a user having written has recent writes for
+        DATABASE_REPLICA_STICKY_SECONDS, when there are replicas.
+        """
+        with self.settings(DATABASE_REPLICAS=[]):
+            mark_written(1)
+            self.assertFalse(has_recent_writes(1))
+
+        with self.settings(DATABASE_REPLICAS=['replica1'], DATABASE_REPLICA_STICKY_SECONDS=60):
+            mark_written(1)
+            self.assertTrue(has_recent_writes(1))
+            self.assertFalse(has_recent_writes(2))
+
+    def test_request_reads_go_to_a_replica_without_recent_writes(self):
+        """
+        Tests that the reads of a decorated view method go to a replica,
+        unless the requesting user has written recently.
+        """
+        @replica_reads_for_request
+        def get(view, request):
+            return router.db_for_read(Task)
+
+        request = RequestFactory().get('/api/v1/tasks/')
+        request.user = User(pk=1)
+
+        with self.settings(DATABASE_REPLICAS=['replica1']):
+            self.assertEqual(get(None, request), 'replica1')
+
+            mark_written(1)
+            self.assertEqual(get(None, request), 'default')
+
+    def test_middleware_marks_successful_writes(self):
+        """
+        Tests that ReadYourWritesMiddleware marks the user of a successful
+        unsafe request as having written.
+        """
+        factory = RequestFactory()
+        middleware = ReadYourWritesMiddleware()
+
+        with self.settings(DATABASE_REPLICAS=['replica1']):
+            for request, response in [
+                (factory.get('/api/v1/tasks/'), HttpResponse(status=200)),
+                (factory.post('/api/v1/tasks/'), HttpResponse(status=400)),
+            ]:
+                request.user = User(pk=1)
+                middleware.process_response(request, response)
+
+            self.assertFalse(has_recent_writes(1))
+
+            request = factory.post('/api/v1/tasks/')
+            request.user = User(pk=1)
+            middleware.process_response(request, HttpResponse(status=201))
+
+            self.assertTrue(has_recent_writes(1))
+
+    def test_only_the_primary_is_migrated(self):
+        """
+        Tests that migrations only run on the primary.
+        """
+        self.assertTrue(self.router.allow_migrate('default', 'tasks'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'tasks'))
+
+
+class SQLitePragmasTestCase(TestCase):
+    """
+    SQLite backend PRAGMA tests
+    """
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite only')
+    def test_pragmas_are_applied_on_connect(self):
+        """
+        Tests that new connections use the NORMAL synchronous level and
+        wait for locks.
+        """
+        cursor = connection.cursor()
+
+        cursor.execute('PRAGMA synchronous')
+        self.assertEqual(cursor.fetchone()[0], 1)
+        cursor.execute('PRAGMA busy_timeout')
+        self.assertEqual(cursor.fetchone()[0], 5000)
+
+
+class TaskThrottleTestCase(TestCase):
+    """
+    Task views throttling tests
+    """
+    def setUp(self):
+        self.user = User.objects.create(username="master")
+        self.task = Task.objects.create(name='One', owner=self.user)
+
+        throttling.get_bucket_store().clear()
+        throttling.stats.reset()
+
+    def tearDown(self):
+        throttling.get_bucket_store().clear()
+
+    def request(self, view, method, url, data=None, user=None, **kwargs):
+        factory = APIRequestFactory()
+        request = getattr(factory, method)(url, data, format='json')
+        force_authenticate(request, user=user or self.user)
+
+        return view.as_view()(request, **kwargs)
+
+    def test_task_endpoints_are_throttled_per_scope_and_user(self):
+        """
+        Tests that the list, create and solve endpoints have buckets of their
+        own, per user, and that throttled requests get a Retry-After header.
+        """
+        rates = {'tasks_list': '2/minute', 'tasks_create': '1/minute', 'tasks_solve': '1/minute'}
+
+        with self.settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': rates}):
+            statuses = [self.request(TaskList, 'get', '/api/v1/tasks/').status_code
+                        for _ in range(3)]
+            created = self.request(TaskList, 'post', '/api/v1/tasks/', {'name': 'Two'})
+            bulk_created = self.request(TaskBulkCreate, 'post', '/api/v1/tasks/bulk/',
+                                        [{'name': 'Three'}])
+            solved = self.request(TaskSolve, 'put', '/api/v1/tasks/1/solve/',
+                                  pk=str(self.task.pk))
+            bulk_solved = self.request(TaskBulkSolve, 'put', '/api/v1/tasks/solve/',
+                                       {'ids': [self.task.pk]})
+            other = self.request(TaskList, 'get', '/api/v1/tasks/',
+                                 user=User.objects.create(username="puppet"))
+            throttled = self.request(TaskList, 'get', '/api/v1/tasks/')
+
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(created.status_code, 201)
+        self.assertEqual(bulk_created.status_code, 429)
+        self.assertEqual(solved.status_code, 200)
+        self.assertEqual(bulk_solved.status_code, 429)
+        self.assertEqual(other.status_code, 200)
+        self.assertGreaterEqual(int(throttled['Retry-After']), 1)
+
+    def test_read_endpoints_are_throttled(self):
+        """
+        Tests that the detail, changes, search, export and events endpoints
+        are throttled too.
+        """
+        rates = {'tasks_list': '2/minute', 'tasks_search': '1/minute',
+                 'tasks_export': '1/minute', 'tasks_events': '1/minute'}
+
+        with self.settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': rates}):
+            detail = self.request(TaskDetail, 'get', '/api/v1/tasks/1/', pk=str(self.task.pk))
+            changes = [self.request(TaskChanges, 'get', '/api/v1/tasks/changes/').status_code
+                       for _ in range(2)]
+            search = [self.request(TaskSearch, 'get', '/api/v1/tasks/search/?q=one').status_code
+                      for _ in range(2)]
+            export = [self.request(TaskExport, 'get', '/api/v1/tasks/export/').status_code
+                      for _ in range(2)]
+            # The first stream is left out, as it would run until its max age.
+            request = APIRequestFactory().get('/api/v1/tasks/events/')
+            request.user = self.user
+            throttling.TokenBucketThrottle().allow_request(request, TaskEvents())
+            events = self.request(TaskEvents, 'get', '/api/v1/tasks/events/')
+
+        self.assertEqual(detail.status_code, 200)
+        self.assertEqual(changes, [200, 429])
+        self.assertEqual(search, [200, 429])
+        self.assertEqual(export, [200, 429])
+        self.assertEqual(events.status_code, 429)
+
+    def test_rejections_are_counted_per_scope(self):
+        """
+        Tests that the rejected requests are counted per scope in the metrics.
+        """
+        with self.settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'tasks_list': '1/minute'}}):
+            for _ in range(3):
+                self.request(TaskList, 'get', '/api/v1/tasks/')
+
+        self.assertEqual(throttling.collect_metrics(), [
+            ('throttle_rejections_total', 'counter', 'Number of throttled requests.', 2,
+             {'scope': 'tasks_list'}),
+        ])
+
+
+class TaskCounterTestCase(TestCase):
+    """
+    TaskCounter maintenance tests
+    """
+    def setUp(self):
+        self.user = User.objects.create(username="master")
+        self.other_user = User.objects.create(username="puppet")
+
+    def assertCounts(self, user, pending, solved):
+        counter = TaskCounter.objects.get(owner=user)
+        self.assertEqual((counter.pending, counter.solved, counter.total),
+                         (pending, solved, pending + solved))
+
+    def test_created_tasks_are_counted(self):
+        """
+        Tests that created tasks are counted by status.
+        """
+        Task.objects.create(name='One', owner=self.user)
+        Task.objects.create(name='Two', owner=self.user)
+        Task.objects.create(name='Three', owner=self.user, status=Task.SOLVED)
+
+        self.assertCounts(self.user, 2, 1)
+
+    def test_saved_tasks_move_between_counts(self):
+        """
+        Tests that saving a task with a new status or owner moves it between
+        the counts, while other changes leave them alone.
+        """
+        task = Task.objects.create(name='One', owner=self.user)
+        Task.objects.create(name='Two', owner=self.other_user)
+
+        task.name = 'Renamed'
+        task.save()
+        self.assertCounts(self.user, 1, 0)
+
+        task.status = Task.SOLVED
+        task.save()
+        self.assertCounts(self.user, 0, 1)
+
+        task = Task.objects.get(pk=task.pk)
+        task.owner = self.other_user
+        task.save()
+        self.assertCounts(self.user, 0, 0)
+        self.assertCounts(self.other_user, 1, 1)
+
+    def test_saved_deferred_tasks_are_recounted(self):
+        """
+        Tests that saving a task loaded without its status recounts the
+        owner's tasks.
+        """
+        Task.objects.create(name='One', owner=self.user)
+        task = Task.objects.only('name').get()
+        TaskCounter.objects.filter(owner=self.user).update(pending=5)
+
+        task.save()
+
+        self.assertCounts(self.user, 1, 0)
+
+    def test_deleted_deferred_tasks_are_uncounted(self):
+        """
+        Tests that deleting a task loaded without its owner and status
+        removes it from the counts.
+        """
+        Task.objects.create(name='One', owner=self.user)
+        Task.objects.create(name='Two', owner=self.user, status=Task.SOLVED)
+
+        Task.objects.only('name').get(name='Two').delete()
+
+        self.assertCounts(self.user, 1, 0)
+
+    def test_deleted_deferred_tasks_are_logged(self):
+        """
+        Tests that deleting a task loaded without its owner records it for
+        the syncing clients of its owner.
+        """
+        task = Task.objects.create(name='One', owner=self.user)
+
+        Task.objects.only('name').get().delete()
+
+        self.assertEqual(list(DeletedTask.objects.values_list('task_id', 'owner_id')),
+                         [(task.pk, self.user.pk)])
+
+    def test_only_tasks_have_receivers(self):
+        """
+        Tests that the task receivers leave the other models to be deleted
+        without loading them first.
+        """
+        collector = Collector(using='default')
+
+        self.assertTrue(collector.can_fast_delete(DeletedTask.objects.all()))
+        self.assertTrue(collector.can_fast_delete(TaskCounter.objects.all()))
+        self.assertFalse(collector.can_fast_delete(Task.objects.all()))
+
+    def test_first_counts_race(self):
+        """
+        Tests that a change counted while another one creates the owner's
+        counter is added to that counter.
+        """
+        Task.objects.bulk_create([Task(name='One', owner=self.user)])
+        count_tasks = TaskCounterQuerySet.count_tasks
+
+        def create_counter(owner_id):
+            values = count_tasks(owner_id)
+            TaskCounter.objects.create(owner_id=owner_id, pending=1)
+            return values
+
+        with mock.patch.object(TaskCounterQuerySet, 'count_tasks', side_effect=create_counter):
+            Task.objects.create(name='Two', owner=self.user)
+
+        self.assertCounts(self.user, 2, 0)
+
+    def test_deleted_tasks_are_uncounted(self):
+        """
+        Tests that deleting a task removes it from the counts.
+        """
+        task = Task.objects.create(name='One', owner=self.user, status=Task.SOLVED)
+        Task.objects.create(name='Two', owner=self.user)
+
+        task.delete()
+
+        self.assertCounts(self.user, 1, 0)
+
+    def test_solve_moves_tasks_to_solved(self):
+        """
+        Tests that solving tasks of several owners moves them to the solved
+        count of each owner.
+        """
+        Task.objects.create(name='One', owner=self.user)
+        Task.objects.create(name='Two', owner=self.user)
+        Task.objects.create(name='Three', owner=self.other_user)
+        Task.objects.create(name='Four', owner=self.other_user, status=Task.SOLVED)
+
+        self.assertEqual(Task.objects.solve(), 3)
+
+        self.assertCounts(self.user, 0, 2)
+        self.assertCounts(self.other_user, 0, 2)
+
+    def test_bulk_create_counts_tasks(self):
+        """
+        Tests that bulk created tasks are counted.
+        """
+        Task.objects.create(name='One', owner=self.user)
+        factory = APIRequestFactory()
+        request = factory.post('/api/v1/tasks/bulk/', [{'name': 'Two'}, {'name': 'Three'}],
+                               format='json')
+        force_authenticate(request, user=self.user)
+
+        response = TaskBulkCreate.as_view()(request)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertCounts(self.user, 3, 0)
+
+    def test_bulk_solve_counts_tasks(self):
+        """
+        Tests that bulk solved tasks move to the solved count.
+        """
+        tasks = [Task.objects.create(name=name, owner=self.user) for name in ('One', 'Two')]
+        factory = APIRequestFactory()
+        request = factory.put('/api/v1/tasks/solve/', {'ids': [tasks[0].pk]}, format='json')
+        force_authenticate(request, user=self.user)
+
+        response = TaskBulkSolve.as_view()(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertCounts(self.user, 1, 1)
+
+    def test_rebuild_command(self):
+        """
+        Tests that rebuild_task_counters fixes drifted counters and zeroes
+        those of users left without tasks.
+        """
+        Task.objects.create(name='One', owner=self.user)
+        task = Task.objects.create(name='Two', owner=self.other_user)
+        Task.objects.filter(pk=task.pk).delete()
+        Task.objects.bulk_create([Task(name='Three', owner=self.user, status=Task.SOLVED)])
+        TaskCounter.objects.filter(owner=self.other_user).update(pending=3)
+
+        call_command('rebuild_task_counters', stdout=StringIO())
+
+        self.assertCounts(self.user, 1, 1)
+        self.assertCounts(self.other_user, 0, 0)
+
+    def test_rebuild_command_owners(self):
+        """
+        Tests that rebuild_task_counters only recounts the given users, and
+        fails on unknown ones.
+        """
+        Task.objects.create(name='One', owner=self.user)
+        Task.objects.create(name='Two', owner=self.other_user)
+        TaskCounter.objects.update(pending=3)
+
+        call_command('rebuild_task_counters', str(self.user.pk), stdout=StringIO())
+
+        self.assertCounts(self.user, 1, 0)
+        self.assertCounts(self.other_user, 3, 0)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_task_counters', '999', stdout=StringIO())
+
+
+class TaskStatsTestCase(TestCase):
+    """
+    TaskStats view tests
+    """
+    def setUp(self):
+        self.user = User.objects.create(username="master")
+        self.factory = APIRequestFactory()
+
+    def get_stats(self, user=None):
+        request = self.factory.get('/api/v1/tasks/stats/')
+        if user is not None:
+            force_authenticate(request, user=user)
+
+        return TaskStats.as_view()(request)
+
+    def test_task_stats_not_authenticated(self):
+        """
+        Tests that the stats need an authenticated user.
+        """
+        self.assertEqual(self.get_stats().status_code, 401)
+
+    def test_task_stats(self):
+        """
+        Tests that the stats are read from the user's counter in one query.
+        """
+        Task.objects.create(name='One', owner=self.user)
+        Task.objects.create(name='Two', owner=self.user, status=Task.SOLVED)
+        Task.objects.create(name='Three', owner=self.user, status=Task.SOLVED)
+        Task.objects.create(name='Four', owner=User.objects.create(username="puppet"))
+
+        with self.assertNumQueries(1):
+            response = self.get_stats(self.user)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['pending'], 1)
+        self.assertEqual(response.data['solved'], 2)
+        self.assertEqual(response.data['total'], 3)
+        self.assertIsNotNone(response.data['updated'])
+
+    def test_task_stats_without_tasks(self):
+        """
+        Tests that users who never had a task get zero counts.
+        """
+        response = self.get_stats(self.user)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(dict(response.data), {
+            'pending': 0,
+            'solved': 0,
+            'total': 0,
+            'updated': None,
+        })
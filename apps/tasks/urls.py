@@ -6,6 +6,13 @@ from . import views
 api_patterns = [
     url(r'^tasks/(?P<pk>[0-9]+)/solve/$', views.TaskSolve.as_view()),
     url(r'^tasks/(?P<pk>[0-9]+)/$', views.TaskDetail.as_view()),
+    url(r'^tasks/bulk/$', views.TaskBulkCreate.as_view()),
+    url(r'^tasks/solve/$', views.TaskBulkSolve.as_view()),
+    url(r'^tasks/export/$', views.TaskExport.as_view()),
+    url(r'^tasks/changes/$', views.TaskChanges.as_view()),
+    url(r'^tasks/events/$', views.TaskEvents.as_view()),
+    url(r'^tasks/search/$', views.TaskSearch.as_view()),
+    url(r'^tasks/stats/$', views.TaskStats.as_view()),
     url(r'^tasks/$', views.TaskList.as_view()),
 ]
 
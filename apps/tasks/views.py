@@ -1,28 +1,101 @@
-from django.shortcuts import get_object_or_404
+import time
+from collections import OrderedDict
 
-from rest_framework import generics, mixins, status
-from rest_framework.authentication import TokenAuthentication
+from django.conf import settings
+from django.db import router, transaction
+from django.http import Http404, StreamingHttpResponse
+
+from rest_framework import exceptions, generics, mixins, status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from rest_framework.views import APIView
 
-from .models import Task
-from .serializers import TaskCreateSerializer, TaskListSerializer, \
-    TaskDetailSerializer
+from apps.users.authentication import CachedTokenAuthentication
+from project.db.routers import replica_reads_for_request
+
+from . import events
+from .cache import get_task_list, invalidate_task_list, set_task_list, task_list_key
+from .conditional import make_etag, not_modified_response, set_validators, \
+    task_list_validators
+from .models import Task, TaskCounter
+from .pagination import TaskPagination
+from .renderers import EventStreamRenderer, NDJSONRenderer
+from .serializers import TaskBulkSolveSerializer, TaskCreateSerializer, \
+    TaskListQuerySerializer, TaskListSerializer, TaskDetailSerializer, TaskRowSerializer, \
+    TaskStatsSerializer, iter_task_chunks
+from .search import get_search_backend
+from .sync import ExpiredSyncToken, InvalidSyncToken, changes_since, decode_token, \
+    encode_token
 
 
 class TaskList(APIView):
     """
     List all tasks, or create a new one.
     """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    throttle_scopes = {'GET': 'tasks_list', 'POST': 'tasks_create'}
+    pagination_class = TaskPagination
 
+    @replica_reads_for_request
     def get(self, request, format=None):
-        user_tasks = Task.objects.filter(owner=request.user)
-        serializer = TaskListSerializer(user_tasks, many=True)
+        query = TaskListQuerySerializer(data=request.query_params)
 
-        return Response(serializer.data)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        user_tasks = self.filter_queryset(Task.objects.filter(owner=request.user),
+                                          query.validated_data)
+        url = request.build_absolute_uri()
+
+        etag, last_modified = task_list_validators(user_tasks, request.user.pk, url)
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        cache_key = task_list_key(request.user.pk, etag)
+        cached = get_task_list(cache_key)
+
+        if cached is not None:
+            data, headers = cached
+            response = Response(data, headers=headers)
+        else:
+            ordering = query.validated_data['ordering']
+            serializer = TaskRowSerializer(
+                query.validated_data.get('fields', TaskListSerializer.Meta.fields))
+
+            # Only read the columns being sent, followed by the pagination key.
+            rows = user_tasks.values_list(*(serializer.columns +
+                                            (ordering.lstrip('-'), 'pk')))
+
+            paginator = self.pagination_class()
+            paginator.ordering = ordering
+            page = paginator.paginate_queryset(rows, request, view=self)
+            response = paginator.get_paginated_response(serializer.serialize(page))
+
+            headers = {'Link': response['Link']} if response.has_header('Link') else None
+            set_task_list(cache_key, response.data, headers)
+
+        set_validators(response, etag, last_modified)
+
+        return response
+
+    @staticmethod
+    def filter_queryset(queryset, params):
+        if 'status' in params:
+            queryset = queryset.filter(status=params['status'])
+        if 'created_after' in params:
+            queryset = queryset.filter(created__gte=params['created_after'])
+        if 'created_before' in params:
+            queryset = queryset.filter(created__lt=params['created_before'])
+        if 'updated_after' in params:
+            queryset = queryset.filter(updated__gte=params['updated_after'])
+        if 'updated_before' in params:
+            queryset = queryset.filter(updated__lt=params['updated_before'])
+
+        return queryset
 
     def post(self, request, format=None):
         serializer = TaskCreateSerializer(data=request.data)
@@ -34,48 +107,335 @@ class TaskList(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class TaskBulkCreate(APIView):
+    """
+    Creates a list of tasks at once.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    throttle_scope = 'tasks_create'
+
+    def post(self, request, format=None):
+        max_size = settings.TASKS_BULK_CREATE_MAX_SIZE
+
+        if isinstance(request.data, list) and len(request.data) > max_size:
+            return Response({
+                'non_field_errors': [
+                    'Ensure this list has no more than {} items.'.format(max_size)
+                ]
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = TaskCreateSerializer(data=request.data, many=True)
+
+        if serializer.is_valid():
+            tasks = serializer.save(owner=request.user)
+            invalidate_task_list(request.user.pk)
+            events.notify(request.user.pk, events.CREATED, [task.pk for task in tasks])
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class TaskStats(APIView):
+    """
+    Returns the number of pending, solved and total tasks of the user,
+    read from the user's counter rather than counted.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    throttle_scope = 'tasks_list'
+
+    @replica_reads_for_request
+    def get(self, request, format=None):
+        try:
+            counter = TaskCounter.objects.get(owner=request.user)
+        except TaskCounter.DoesNotExist:
+            # Users who never had a task have no counter.
+            counter = TaskCounter(owner=request.user)
+
+        return Response(TaskStatsSerializer(counter).data)
+
+
 class TaskDetail(generics.GenericAPIView, mixins.RetrieveModelMixin):
     """
     Retrieve, update or delete a task instance.
     """
     queryset = Task.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     serializer_class = TaskDetailSerializer
     permission_classes = (IsAuthenticated,)
+    throttle_scope = 'tasks_list'
 
-    def get(self, request, *args, **kwargs):
-        pk = kwargs.get('pk')
+    def get_queryset(self):
+        return self.queryset.filter(owner=self.request.user)
 
+    @replica_reads_for_request
+    def get(self, request, *args, **kwargs):
         try:
-            Task.objects.get(pk=pk, owner=request.user)
-        except:
+            task = self.get_object()
+        except Http404:
             return Response({}, status=status.HTTP_401_UNAUTHORIZED)
 
-        return self.retrieve(request, *args, **kwargs)
+        etag = make_etag(task.pk, task.updated.isoformat())
+        response = not_modified_response(request, etag, task.updated)
+
+        if response is None:
+            response = Response(self.get_serializer(task).data)
+            set_validators(response, etag, task.updated)
+
+        return response
 
 
 class TaskSolve(APIView):
     """
     Solves a task when called via PUT
     """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    throttle_scope = 'tasks_solve'
 
     def put(self, request, pk, format=None):
-        user = request.user
-        try:
-            task = get_object_or_404(Task, pk=pk, owner=user)
-        except Task.DoesNotExist:
-            return Response({}, status=status.HTTP_404_NOT_FOUND)
+        user_task = Task.objects.filter(pk=pk, owner=request.user)
 
-        if task.status == Task.SOLVED:
-            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        if not user_task.solve(owner_id=request.user.pk):
+            if user_task.exists():
+                return Response(status=status.HTTP_304_NOT_MODIFIED)
 
-        task.status = Task.SOLVED
-        task.save(update_fields=['status'])
+            return Response({}, status=status.HTTP_404_NOT_FOUND)
+
+        invalidate_task_list(request.user.pk)
+        events.notify(request.user.pk, events.SOLVED, [int(pk)])
 
-        serializer = TaskDetailSerializer(task, context={
+        serializer = TaskDetailSerializer(user_task.get(), context={
             'request': request,
         })
 
         return Response(serializer.data)
+
+
+class TaskBulkSolve(APIView):
+    """
+    Solves many tasks at once when called via PUT, either a list of ids
+    or all of the tasks created before a given date.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    throttle_scope = 'tasks_solve'
+
+    def put(self, request, format=None):
+        serializer = TaskBulkSolveSerializer(data=request.data)
+
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        user_tasks = Task.objects.filter(owner=request.user)
+        ids = serializer.validated_data.get('ids')
+
+        if ids is None:
+            user_tasks = user_tasks.filter(
+                created__lt=serializer.validated_data['created_before'])
+        else:
+            ids = set(ids)
+            user_tasks = user_tasks.filter(pk__in=ids)
+
+        # Counted after the UPDATE and in its transaction, so that the tasks
+        # just solved are among the ones found.
+        with transaction.atomic(savepoint=False):
+            solved = user_tasks.solve(owner_id=request.user.pk)
+            found = user_tasks.count()
+
+        if solved:
+            invalidate_task_list(request.user.pk)
+            # Which of the ids were pending is unknown, so all of them are sent.
+            events.notify(request.user.pk, events.SOLVED,
+                          sorted(ids) if ids is not None else None)
+
+        return Response({
+            'solved': solved,
+            'already_solved': found - solved,
+            'not_found': len(ids) - found if ids is not None else 0,
+        })
+
+
+class TaskExport(APIView):
+    """
+    Streams all of the user's tasks, as newline delimited JSON by default
+    or as a JSON array.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (NDJSONRenderer, JSONRenderer)
+    throttle_scope = 'tasks_export'
+
+    @replica_reads_for_request
+    def get(self, request, format=None):
+        renderer = request.accepted_renderer
+        # The tasks are read once the view has returned, so the database
+        # is picked now.
+        tasks = Task.objects.using(router.db_for_read(Task)).filter(owner=request.user)
+        chunks = iter_task_chunks(tasks)
+
+        if renderer.format == NDJSONRenderer.format:
+            content = (renderer.render(chunk) for chunk in chunks)
+        else:
+            content = self.iter_json_array(renderer, chunks)
+
+        return StreamingHttpResponse(content, content_type=renderer.media_type)
+
+    @staticmethod
+    def iter_json_array(renderer, chunks):
+        separator = b'['
+
+        for chunk in chunks:
+            for item in chunk:
+                yield separator + renderer.render(item)
+                separator = b','
+
+        yield b'[]' if separator == b'[' else b']'
+
+
+class TaskChanges(APIView):
+    """
+    Lists the tasks changed and deleted since a sync token, or every task
+    when no sync token is given. Sync tokens older than the deletion log
+    get a 410 error.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    pagination_class = TaskPagination
+    throttle_scope = 'tasks_list'
+
+    def get(self, request, format=None):
+        since = request.query_params.get('since')
+
+        try:
+            token = decode_token(since) if since is not None else None
+        except InvalidSyncToken:
+            return Response({'since': ['Invalid sync token.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        limit = self.pagination_class().get_page_size(request)
+
+        try:
+            changes = changes_since(request.user, token, limit)
+        except ExpiredSyncToken:
+            return Response({'since': ['Expired sync token, sync again without it.']},
+                            status=status.HTTP_410_GONE)
+
+        return Response(OrderedDict([
+            ('changed', TaskDetailSerializer(changes.changed, many=True).data),
+            ('deleted', changes.deleted),
+            ('sync_token', encode_token(changes.token)),
+            ('more', changes.more),
+        ]))
+
+
+class TaskEvents(APIView):
+    """
+    Streams server-sent events naming the user's tasks as they are
+    created, updated, solved or deleted.
+
+    Every stream holds a server thread until the client disconnects or
+    the stream reaches TASKS_EVENTS_MAX_AGE, after which clients
+    reconnect on their own. Users with TASKS_EVENTS_MAX_STREAMS streams
+    open get a 429 error.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (EventStreamRenderer,)
+    throttle_scope = 'tasks_events'
+
+    def get(self, request, format=None):
+        try:
+            subscription = events.get_broker().subscribe(request.user.pk)
+        except events.TooManySubscriptions:
+            raise exceptions.Throttled(detail='Too many open event streams.')
+
+        renderer = request.accepted_renderer
+        stream = self.iter_events(renderer, subscription)
+        # Started, so that closing the response closes the subscription
+        # even when the stream is never read.
+        next(stream)
+
+        response = StreamingHttpResponse(stream, content_type=renderer.media_type)
+        response['Cache-Control'] = 'no-cache'
+        # Keep proxies such as nginx from buffering the stream.
+        response['X-Accel-Buffering'] = 'no'
+
+        return response
+
+    @staticmethod
+    def iter_events(renderer, subscription):
+        heartbeat = settings.TASKS_EVENTS_HEARTBEAT
+        deadline = time.time() + settings.TASKS_EVENTS_MAX_AGE
+
+        try:
+            yield
+
+            # Send the headers right away, so that the client knows it
+            # is subscribed.
+            yield b': subscribed\n\n'
+
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return
+
+                event = subscription.get(timeout=min(heartbeat, remaining))
+                if event is None:
+                    # Comments keep idle connections from being dropped.
+                    yield b': heartbeat\n\n'
+                else:
+                    yield renderer.render({'ids': event.ids},
+                                          renderer_context={'event': event.type})
+        finally:
+            subscription.close()
+
+
+class TaskSearch(APIView):
+    """
+    Searches the user's tasks by name and description, from the most
+    to the least relevant one.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    pagination_class = TaskPagination
+    throttle_scope = 'tasks_search'
+
+    def get(self, request, format=None):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'q': ['This field is required.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            offset = -1
+        if offset < 0:
+            return Response({'offset': ['A valid positive integer is required.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        limit = self.pagination_class().get_page_size(request)
+        ids = get_search_backend().search(request.user.pk, query, offset, limit + 1)
+        has_next = len(ids) > limit
+        ids = ids[:limit]
+
+        serializer = TaskRowSerializer(TaskListSerializer.Meta.fields)
+        rows = dict((row[0], row) for row in Task.objects
+                    .filter(owner=request.user, pk__in=ids)
+                    .values_list(*serializer.columns))
+        data = serializer.serialize(rows[pk] for pk in ids if pk in rows)
+
+        url = request.build_absolute_uri()
+        links = []
+        if has_next:
+            links.append('<{}>; rel="next"'.format(
+                replace_query_param(url, 'offset', offset + limit)))
+        if offset > limit:
+            links.append('<{}>; rel="prev"'.format(
+                replace_query_param(url, 'offset', offset - limit)))
+        elif offset > 0:
+            links.append('<{}>; rel="prev"'.format(remove_query_param(url, 'offset')))
+
+        return Response(data, headers={'Link': ', '.join(links)} if links else None)
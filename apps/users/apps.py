@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 
 class UsersConfig(AppConfig):
-    name = 'users'
+    name = 'apps.users'
+    label = 'users'
+
+    def ready(self):
+        from . import signals  # noqa
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache(object):
+    """
+    A thread safe, size bounded, least recently used cache of token keys
+    to their (user, token) credentials, whose entries expire after
+    TOKEN_AUTH_CACHE_TTL seconds.
+
+    The cache lives in the process memory, so invalidations only reach the
+    process where they happen and the time to live bounds how long other
+    processes may keep using a deleted token or a deactivated user.
+    """
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            credentials, expires = entry
+            if expires <= now:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+
+        return credentials
+
+    def set(self, key, credentials):
+        max_size = settings.TOKEN_AUTH_CACHE_MAX_SIZE
+        expires = time.time() + settings.TOKEN_AUTH_CACHE_TTL
+
+        with self._lock:
+            self._entries[key] = (credentials, expires)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            keys = [key for key, ((user, token), expires) in self._entries.items()
+                    if user.pk == user_id]
+
+            for key in keys:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token based authentication which keeps the token -> user lookups
+    on a local cache, saving a database query per request.
+    """
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+
+        if credentials is None:
+            credentials = super(CachedTokenAuthentication, self).authenticate_credentials(key)
+            token_cache.set(key, credentials)
+
+        return credentials
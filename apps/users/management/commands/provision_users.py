@@ -0,0 +1,165 @@
+import csv
+import sys
+from multiprocessing import Pool
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+OPTIONAL_FIELDS = ('email', 'first_name', 'last_name')
+
+
+class Command(BaseCommand):
+    help = ("Creates users and their auth tokens from a CSV file with username, "
+            "password, email, first_name and last_name columns. Passwords are "
+            "validated, hashed across a pool of processes and users are inserted in "
+            "batches; users whose username already exists are skipped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file of the users, or - for the standard input.')
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Number of hashing processes, the number of CPUs by default.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of users inserted per INSERT statement.')
+        parser.add_argument('--tokens',
+                            help='CSV file the username and token of every created user '
+                                 'are written to.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        rows = self.read_rows(options['path'])
+        users = self.new_users(rows, batch_size)
+        self.validate(users)
+
+        # Hashing is CPU bound, so it is spread over processes rather than threads.
+        pool = Pool(options['processes'], initializer=django.setup)
+        try:
+            passwords = pool.map(make_password, [row['password'] for row in users],
+                                 chunksize=100)
+        finally:
+            pool.close()
+            pool.join()
+
+        tokens = []
+        failed = 0
+
+        for start in range(0, len(users), batch_size):
+            batch = users[start:start + batch_size]
+
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create([
+                        self.make_user(row, password)
+                        for row, password in zip(batch, passwords[start:start + batch_size])
+                    ])
+
+                    # bulk_create() does not set the ids of the users on SQLite.
+                    ids = dict(User.objects
+                               .filter(username__in=[row['username'] for row in batch])
+                               .values_list('username', 'pk'))
+                    batch_tokens = [Token(key=Token().generate_key(),
+                                          user_id=ids[row['username']])
+                                    for row in batch]
+                    Token.objects.bulk_create(batch_tokens)
+            except IntegrityError as e:
+                # A username was taken since it was checked, such as by a signup.
+                failed += len(batch)
+                self.stderr.write('Skipped the batch of lines {} to {}: {}'.format(
+                    batch[0]['line'], batch[-1]['line'], e))
+                continue
+
+            tokens.extend(zip([row['username'] for row in batch],
+                              [token.key for token in batch_tokens]))
+            self.stdout.write('Created {} of {} users'.format(len(tokens), len(users)))
+
+        if options['tokens']:
+            with open(options['tokens'], 'w') as tokens_file:
+                csv.writer(tokens_file).writerows([('username', 'token')] + tokens)
+
+        self.stdout.write('Created {} users, skipped {} existing ones.'.format(
+            len(tokens), len(rows) - len(users)))
+
+        if failed:
+            raise CommandError('{} users were not created, run the command again to '
+                               'retry them.'.format(failed))
+
+    @staticmethod
+    def make_user(row, password):
+        return User(username=row['username'], password=password,
+                    **dict((field, row.get(field) or '') for field in OPTIONAL_FIELDS))
+
+    def validate(self, rows):
+        """
+        Checks the rows against the User model fields and the password
+        validators, as signups are, and raises a CommandError listing the
+        invalid lines.
+        """
+        errors = []
+
+        for row in rows:
+            user = self.make_user(row, '')
+            messages = []
+
+            try:
+                # The usernames were checked, and are enforced on insert.
+                user.full_clean(exclude=['password'], validate_unique=False)
+            except ValidationError as e:
+                messages.extend('{}: {}'.format(field, ' '.join(field_errors))
+                                for field, field_errors in sorted(e.message_dict.items()))
+
+            try:
+                validate_password(row['password'], user=user)
+            except ValidationError as e:
+                messages.append('password: {}'.format(' '.join(e.messages)))
+
+            if messages:
+                errors.append('Line {}: {}'.format(row['line'], '; '.join(messages)))
+
+        if errors:
+            raise CommandError('Invalid users, none were created.\n' + '\n'.join(errors))
+
+    @staticmethod
+    def read_rows(path):
+        csv_file = sys.stdin if path == '-' else open(path)
+
+        try:
+            rows = list(csv.DictReader(csv_file))
+        finally:
+            if csv_file is not sys.stdin:
+                csv_file.close()
+
+        for line, row in enumerate(rows, start=2):
+            if not row.get('username') or not row.get('password'):
+                raise CommandError('Line {}: a username and a password are required.'.format(line))
+            row['line'] = line
+
+        return rows
+
+    @staticmethod
+    def new_users(rows, batch_size):
+        """
+        Returns the rows whose username is neither taken nor repeated by
+        an earlier row.
+        """
+        taken = set()
+
+        for start in range(0, len(rows), batch_size):
+            usernames = [row['username'] for row in rows[start:start + batch_size]]
+            taken.update(User.objects.filter(username__in=usernames)
+                         .values_list('username', flat=True))
+
+        users = []
+        for row in rows:
+            if row['username'] not in taken:
+                taken.add(row['username'])
+                users.append(row)
+
+        return users
@@ -0,0 +1,52 @@
+"""
+Signed refresh credentials for the auth tokens.
+
+A refresh credential is signed with the user id and an HMAC of the user's
+current token, so it stops working once the token is deleted, and after
+TOKEN_REFRESH_MAX_AGE seconds. Trading one for the token costs a signature
+check and a query instead of a password hash.
+"""
+from django.conf import settings
+from django.core import signing
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from rest_framework.authtoken.models import Token
+
+SALT = 'apps.users.refresh'
+
+
+class InvalidRefreshCredential(ValueError):
+    pass
+
+
+def _token_digest(token):
+    return salted_hmac(SALT, token.key).hexdigest()
+
+
+def make_refresh_credential(token):
+    value = '{}:{}'.format(token.user_id, _token_digest(token))
+    return signing.TimestampSigner(salt=SALT).sign(value)
+
+
+def get_refresh_token(credential):
+    """
+    Returns the token a refresh credential was made for, raising
+    InvalidRefreshCredential if it is forged, expired or outdated.
+    """
+    try:
+        value = signing.TimestampSigner(salt=SALT).unsign(
+            credential, max_age=settings.TOKEN_REFRESH_MAX_AGE)
+        user_id, digest = value.split(':')
+        user_id = int(user_id)
+    except (signing.BadSignature, ValueError):
+        raise InvalidRefreshCredential()
+
+    try:
+        token = Token.objects.select_related('user').get(user_id=user_id)
+    except Token.DoesNotExist:
+        raise InvalidRefreshCredential()
+
+    if not constant_time_compare(digest, _token_digest(token)) or not token.user.is_active:
+        raise InvalidRefreshCredential()
+
+    return token
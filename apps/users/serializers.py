@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 
 User = get_user_model()
 
@@ -16,3 +17,9 @@ class UserCreateSerializer(serializers.HyperlinkedModelSerializer):
                   'email',
                   'first_name',
                   'last_name')
+
+    def create(self, validated_data):
+        # Hash the password up front, so the user is saved with a single INSERT.
+        validated_data['password'] = make_password(validated_data['password'])
+
+        return super(UserCreateSerializer, self).create(validated_data)
@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    """
+    Drops the cached credentials of a token when it is changed or deleted.
+    """
+    token_cache.delete(instance.key)
+    token_cache.delete_user(instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_cached_user_tokens(sender, instance, **kwargs):
+    """
+    Drops the cached credentials of a user when it is changed, for instance
+    when it is deactivated.
+    """
+    token_cache.delete_user(instance.pk)
@@ -1,12 +1,25 @@
 import json
+import os
+import shutil
+import tempfile
+from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.core.urlresolvers import resolve
 from django.http import HttpRequest
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
 from django.test import Client, TestCase
+from django.utils.six import StringIO
 
-from rest_framework.authtoken.views import obtain_auth_token
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
 
+from .authentication import CachedTokenAuthentication, token_cache
+from .management.commands.provision_users import Command
+from .refresh import make_refresh_credential
+from .throttling import CacheBucketStore, LocalBucketStore, get_bucket_store, parse_rate, \
+    take_token
 from .serializers import UserCreateSerializer
 from .views import UserCreate
 
@@ -23,7 +36,8 @@ class UsersURLsTestCase(TestCase):
         view function.
         """
         get_token = resolve('/api/v1/users/get-token/')
-        self.assertEqual(get_token.func, obtain_auth_token)
+        get_token_func_name = str(get_token.func).split()[1]
+        self.assertEqual(get_token_func_name, "ObtainToken")
 
 
 class UserGetTokenTestCase(TestCase):
@@ -31,6 +45,8 @@ class UserGetTokenTestCase(TestCase):
     Get token for user testcases
     """
     def setUp(self):
+        get_bucket_store().clear()
+
         self.john_password = 'johnpassword'
 
         self.lennon = User.objects.create_user(
@@ -76,6 +92,228 @@ class UserGetTokenTestCase(TestCase):
         self.assertEqual(result_json.get('token'), None)
 
 
+class ObtainTokenTestCase(TestCase):
+    """
+    ObtainToken view tests
+    """
+    def setUp(self):
+        cache.clear()
+        get_bucket_store().clear()
+
+        self.lennon = User.objects.create_user('john', 'lennon@thebeatles.com', 'johnpassword')
+        self.client = Client()
+
+    def tearDown(self):
+        cache.clear()
+        get_bucket_store().clear()
+
+    def get_token(self, **data):
+        return self.client.post('/api/v1/users/get-token/', data=data)
+
+    def test_get_token_returns_a_refresh_credential(self):
+        """
+        Tests that getting a token with a password returns the user's token
+        and a refresh credential.
+        """
+        response = self.get_token(username='john', password='johnpassword')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['token'], Token.objects.get(user=self.lennon).key)
+        self.assertTrue(response.data['refresh'].startswith('{}:'.format(self.lennon.pk)))
+
+    def test_refresh_returns_the_token_without_hashing(self):
+        """
+        Tests that a refresh credential is traded for the user's token with
+        a single query and no password check.
+        """
+        token = Token.objects.create(user=self.lennon)
+        refresh = make_refresh_credential(token)
+
+        with self.assertNumQueries(1):
+            response = self.get_token(refresh=refresh)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['token'], token.key)
+        self.assertIn('refresh', response.data)
+
+    def test_refresh_with_invalid_credentials(self):
+        """
+        Tests that forged, expired and outdated refresh credentials are
+        refused with a 400 error.
+        """
+        token = Token.objects.create(user=self.lennon)
+        refresh = make_refresh_credential(token)
+
+        with self.settings(TOKEN_REFRESH_MAX_AGE=-1):
+            expired = self.get_token(refresh=refresh)
+        forged = self.get_token(refresh=refresh[:-1] + ('A' if refresh[-1] != 'A' else 'B'))
+        garbage = self.get_token(refresh='garbage')
+
+        token.delete()
+        Token.objects.create(user=self.lennon)
+        outdated = self.get_token(refresh=refresh)
+
+        for response in (expired, forged, garbage, outdated):
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data, {
+                'refresh': ['Invalid or expired refresh credential.'],
+            })
+
+    def test_refresh_for_inactive_user(self):
+        """
+        Tests that the refresh credential of an inactive user is refused.
+        """
+        refresh = make_refresh_credential(Token.objects.create(user=self.lennon))
+        self.lennon.is_active = False
+        self.lennon.save()
+
+        self.assertEqual(self.get_token(refresh=refresh).status_code, 400)
+
+    def test_get_token_is_throttled_per_user(self):
+        """
+        Tests that the tokens obtained for a user are throttled, whichever
+        way the user is identified, without throttling other users.
+        """
+        User.objects.create_user('paul', 'paul@thebeatles.com', 'paulpassword')
+        refresh = make_refresh_credential(Token.objects.create(user=self.lennon))
+        rates = {'get_token': '100/minute', 'get_token_user': '3/minute'}
+
+        with self.settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': rates}):
+            statuses = [self.get_token(username='john', password='johnpassword').status_code
+                        for _ in range(2)]
+            refresh_statuses = [self.get_token(refresh=refresh).status_code
+                                for _ in range(2)]
+            other = self.get_token(username='paul', password='paulpassword')
+
+        self.assertEqual(statuses, [200, 200])
+        self.assertEqual(refresh_statuses, [200, 429])
+        self.assertEqual(other.status_code, 200)
+
+    def test_failed_logins_leave_the_user_bucket(self):
+        """
+        Tests that requests with a wrong password don't spend the bucket of
+        the user they name.
+        """
+        rates = {'get_token': '100/minute', 'get_token_user': '1/minute'}
+
+        with self.settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': rates}):
+            failed = [self.get_token(username='john', password='wrong').status_code
+                      for _ in range(3)]
+            response = self.get_token(username='john', password='johnpassword')
+
+        self.assertEqual(failed, [400, 400, 400])
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_token_is_throttled_per_address(self):
+        """
+        Tests that the token requests of a client address are throttled,
+        whichever usernames they send.
+        """
+        rates = {'get_token': '2/minute', 'get_token_user': '100/minute'}
+
+        with self.settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': rates}):
+            statuses = [self.get_token(username=username, password='secret').status_code
+                        for username in ('ringo', 'george', 'yoko')]
+
+        self.assertEqual(statuses, [400, 400, 429])
+
+    def test_refresh_with_non_string_credentials(self):
+        """
+        Tests that refresh credentials which are not strings are refused.
+        """
+        for refresh in (123, ['x'], {'a': 1}):
+            response = self.client.post('/api/v1/users/get-token/',
+                                        data=json.dumps({'refresh': refresh}),
+                                        content_type='application/json')
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data, {
+                'refresh': ['Invalid or expired refresh credential.'],
+            })
+
+    def test_get_token_without_credentials_is_throttled(self):
+        """
+        Tests that token requests sending neither a username nor a refresh
+        credential are throttled per client address.
+        """
+        with self.settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'get_token': '2/minute'}}):
+            statuses = [self.get_token().status_code for _ in range(3)]
+
+        self.assertEqual(statuses, [400, 400, 429])
+
+
+class TokenBucketTestCase(TestCase):
+    """
+    Token bucket throttling tests
+    """
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_parse_rate(self):
+        """
+        Tests that a rate is parsed to a capacity and a refill rate per second.
+        """
+        self.assertEqual(parse_rate('120/minute'), (120, 2.0))
+        self.assertEqual(parse_rate('10/s'), (10, 10.0))
+        self.assertEqual(parse_rate('36/hour'), (36, 0.01))
+
+    def test_take_token(self):
+        """
+        Tests that a bucket holds up to its capacity and is refilled over time.
+        """
+        bucket, wait = take_token(None, 2, 1.0, 100)
+        self.assertEqual((bucket, wait), ((1, 100, 101), 0))
+
+        bucket, wait = take_token(bucket, 2, 1.0, 100)
+        self.assertEqual((bucket, wait), ((0, 100, 102), 0))
+
+        bucket, wait = take_token(bucket, 2, 1.0, 100.5)
+        self.assertEqual((bucket, wait), ((0.5, 100.5, 102), 0.5))
+
+        bucket, wait = take_token(bucket, 2, 1.0, 110)
+        self.assertEqual((bucket, wait), ((1, 110, 111), 0))
+
+    def test_stores(self):
+        """
+        Tests that both stores let a burst of capacity requests through per key.
+        """
+        for store in (LocalBucketStore(), CacheBucketStore()):
+            waits = [store.consume('key', 2, 0.001) for _ in range(3)]
+
+            self.assertEqual(waits[:2], [0, 0])
+            self.assertGreater(waits[2], 0)
+            self.assertEqual(store.consume('other', 2, 0.001), 0)
+
+    def test_local_store_drops_least_recently_used_buckets(self):
+        """
+        Tests that the local store drops the least recently used buckets
+        when a stripe holds too many buckets.
+        """
+        store = LocalBucketStore()
+        store.stripes = 1
+        store.buckets, store.locks = store.buckets[:1], store.locks[:1]
+
+        with self.settings(THROTTLE_LOCAL_STRIPE_SIZE=2):
+            store.consume('first', 1, 0.001)
+            store.consume('second', 1, 0.001)
+            store.consume('first', 1, 0.001)
+            store.consume('third', 1, 0.001)
+
+        self.assertEqual(list(store.buckets[0]), ['first', 'third'])
+
+    def test_bucket_store_is_chosen_by_setting(self):
+        """
+        Tests that the bucket store is an instance of THROTTLE_BUCKET_STORE.
+        """
+        with self.settings(THROTTLE_BUCKET_STORE='apps.users.throttling.CacheBucketStore'):
+            self.assertIsInstance(get_bucket_store(), CacheBucketStore)
+
+        self.assertIsInstance(get_bucket_store(), LocalBucketStore)
+
+
 class UserCreateSerializerTestCase(TestCase):
     """
     UserSerializer class tests
@@ -225,3 +463,212 @@ class UserCreateTestCase(TestCase):
         check_password_result = user.check_password(password)
 
         self.assertEqual(check_password_result, True)
+
+    def test_create_user_with_a_single_insert(self):
+        """
+        Tests that a user is created with a single INSERT, after checking
+        that its username is free, with its password hashed.
+        """
+        with self.assertNumQueries(2):
+            response = self.create_post_request({
+                'username': 'clark',
+                'password': 'kent',
+            })
+
+        self.assertEqual(response.status_code, 201)
+
+        user = User.objects.get(username='clark')
+        self.assertNotEqual(user.password, 'kent')
+        self.assertTrue(user.check_password('kent'))
+
+
+class ProvisionUsersCommandTestCase(TestCase):
+    """
+    provision_users command tests
+    """
+    def setUp(self):
+        User.objects.create_user('john', 'lennon@thebeatles.com', 'johnpassword')
+
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'users.csv')
+        self.tokens_path = os.path.join(self.directory, 'tokens.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def provision(self, content, **options):
+        with open(self.path, 'w') as users_file:
+            users_file.write(content)
+
+        out = StringIO()
+        call_command('provision_users', self.path, processes=1, stdout=out, **options)
+
+        return out.getvalue()
+
+    def test_provision_users_with_tokens(self):
+        """
+        Tests that users are created with hashed passwords and auth tokens,
+        skipping existing and repeated usernames.
+        """
+        output = self.provision(
+            'username,password,email,first_name,last_name\n'
+            'clark,kryptonite42,clark@kent.com,Clark,Kent\n'
+            'john,other,,,\n'
+            'bruce,gothamknight,,,\n'
+            'bruce,again,,,\n',
+            batch_size=1, tokens=self.tokens_path)
+
+        self.assertIn('Created 2 users, skipped 2 existing ones.', output)
+
+        clark = User.objects.get(username='clark')
+        self.assertTrue(clark.check_password('kryptonite42'))
+        self.assertEqual((clark.email, clark.first_name, clark.last_name),
+                         ('clark@kent.com', 'Clark', 'Kent'))
+        self.assertTrue(User.objects.get(username='bruce').check_password('gothamknight'))
+        self.assertTrue(User.objects.get(username='john').check_password('johnpassword'))
+
+        with open(self.tokens_path) as tokens_file:
+            tokens = tokens_file.read().splitlines()
+
+        self.assertEqual(tokens, [
+            'username,token',
+            'clark,{}'.format(Token.objects.get(user=clark).key),
+            'bruce,{}'.format(Token.objects.get(user__username='bruce').key),
+        ])
+
+    def test_provision_users_without_password(self):
+        """
+        Tests that a row without a password stops the command before any
+        user is created.
+        """
+        with self.assertRaisesRegex(CommandError, 'Line 3'):
+            self.provision('username,password\nclark,kryptonite42\nbruce,\n')
+
+        self.assertFalse(User.objects.filter(username='clark').exists())
+
+    def test_provision_invalid_users(self):
+        """
+        Tests that rows failing the user fields or the password validators
+        stop the command before any user is created.
+        """
+        with self.assertRaises(CommandError) as context:
+            self.provision('username,password,email\n'
+                           'clark,kryptonite42,clark@kent.com\n'
+                           'bruce,wayne,\n'
+                           'diana,themyscira1,diana\n'
+                           '{},kryptonite42,\n'.format('x' * 31))
+
+        message = str(context.exception)
+        self.assertNotIn('Line 2', message)
+        self.assertIn('Line 3: password:', message)
+        self.assertIn('Line 4: email:', message)
+        self.assertIn('Line 5: username:', message)
+        self.assertFalse(User.objects.filter(username='clark').exists())
+
+    def test_provision_users_taken_meanwhile(self):
+        """
+        Tests that a batch with a username taken after it was checked is
+        reported and skipped, while the other batches are created.
+        """
+        validate = Command.validate
+
+        def sign_up(command, rows):
+            validate(command, rows)
+            User.objects.create_user('bruce', password='johnpassword')
+
+        err = StringIO()
+
+        with mock.patch.object(Command, 'validate', sign_up), \
+                self.assertRaisesRegex(CommandError, '1 users were not created'):
+            self.provision('username,password\nclark,kryptonite42\nbruce,gothamknight\n',
+                           batch_size=1, stderr=err)
+
+        self.assertIn('Skipped the batch of lines 3 to 3', err.getvalue())
+        self.assertTrue(User.objects.get(username='clark').check_password('kryptonite42'))
+        self.assertTrue(User.objects.get(username='bruce').check_password('johnpassword'))
+
+
+class CachedTokenAuthenticationTestCase(TestCase):
+    """
+    CachedTokenAuthentication tests
+    """
+    def setUp(self):
+        token_cache.clear()
+
+        self.lennon = User.objects.create_user(
+            'john',
+            'lennon@thebeatles.com',
+            'johnpassword')
+        self.token = Token.objects.create(user=self.lennon)
+        self.authentication = CachedTokenAuthentication()
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_authenticate_caches_the_token_lookup(self):
+        """
+        Tests that once a token was authenticated, authenticating it again
+        does not query the database.
+        """
+        with self.assertNumQueries(1):
+            user, token = self.authentication.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            cached_user, cached_token = self.authentication.authenticate_credentials(
+                self.token.key)
+
+        self.assertEqual(user, self.lennon)
+        self.assertEqual(cached_user, self.lennon)
+        self.assertEqual(cached_token, self.token)
+
+    def test_invalid_token(self):
+        """
+        Tests that authenticating an unknown token fails and is not cached.
+        """
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials('invalid')
+
+        self.assertIsNone(token_cache.get('invalid'))
+
+    def test_deleted_token_is_invalidated(self):
+        """
+        Tests that once a token is deleted it can no longer be used.
+        """
+        self.authentication.authenticate_credentials(self.token.key)
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_deactivated_user_is_invalidated(self):
+        """
+        Tests that once a user is deactivated its tokens can no longer be used.
+        """
+        self.authentication.authenticate_credentials(self.token.key)
+        self.lennon.is_active = False
+        self.lennon.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_cache_expires(self):
+        """
+        Tests that cached tokens are looked up again after TOKEN_AUTH_CACHE_TTL.
+        """
+        with self.settings(TOKEN_AUTH_CACHE_TTL=0):
+            self.authentication.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(1):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_cache_size_is_bounded(self):
+        """
+        Tests that the least recently used tokens are evicted once the
+        cache holds TOKEN_AUTH_CACHE_MAX_SIZE tokens.
+        """
+        with self.settings(TOKEN_AUTH_CACHE_MAX_SIZE=1):
+            token_cache.set('first', (self.lennon, self.token))
+            token_cache.set('second', (self.lennon, self.token))
+
+        self.assertIsNone(token_cache.get('first'))
+        self.assertIsNotNone(token_cache.get('second'))
@@ -0,0 +1,257 @@
+"""
+Token bucket throttling.
+
+Every client gets a bucket per throttle scope, holding up to N tokens and
+refilled at N tokens per period for a "N/period" rate of the scope in
+REST_FRAMEWORK's DEFAULT_THROTTLE_RATES. A request takes a token, and is
+rejected when the bucket is empty. A bucket is a token count and the time
+it was last refilled, so checking a request costs the same whatever the
+rate, unlike DRF's throttles which keep the time of every recent request.
+
+Buckets are kept by the store of the THROTTLE_BUCKET_STORE setting.
+LocalBucketStore keeps them in the memory of each process, so every
+process enforces the rates on its own, whereas CacheBucketStore shares
+them between processes through the default cache.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from rest_framework import settings as api_settings_module
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class RejectionStats(object):
+    """
+    Thread safe counters of the rejected requests per scope.
+    """
+    def __init__(self):
+        self.rejections = Counter()
+        self._lock = threading.Lock()
+
+    def reject(self, scope):
+        with self._lock:
+            self.rejections[scope] += 1
+
+    def reset(self):
+        with self._lock:
+            self.rejections = Counter()
+
+
+stats = RejectionStats()
+
+
+def collect_metrics():
+    """
+    Returns the rejection counters as metric samples.
+    """
+    with stats._lock:
+        rejections = sorted(stats.rejections.items())
+
+    return [
+        ('throttle_rejections_total', 'counter', 'Number of throttled requests.',
+         count, {'scope': scope})
+        for scope, count in rejections
+    ]
+
+
+def parse_rate(rate):
+    """
+    Returns the (capacity, tokens per second) of a "N/period" rate, where
+    the period starts with s, m, h or d.
+    """
+    num, period = rate.split('/')
+    capacity = int(num)
+
+    return capacity, capacity / float(DURATIONS[period[0]])
+
+
+def get_bucket_store():
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            _store = import_string(settings.THROTTLE_BUCKET_STORE)()
+
+        return _store
+
+
+@receiver(setting_changed)
+def reset_bucket_store(setting, **kwargs):
+    global _store
+
+    if setting == 'THROTTLE_BUCKET_STORE':
+        with _store_lock:
+            _store = None
+
+
+def take_token(bucket, capacity, refill_rate, now):
+    """
+    Refills a (tokens, updated, full) bucket, or a new one when it is None,
+    and takes a token from it. Returns the new bucket and the seconds to
+    wait for a token, which are 0 when the token was taken.
+    """
+    if bucket is None:
+        tokens = capacity
+    else:
+        tokens = min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)
+
+    wait = 0
+    if tokens >= 1:
+        tokens -= 1
+    else:
+        wait = (1 - tokens) / refill_rate
+
+    return (tokens, now, now + (capacity - tokens) / refill_rate), wait
+
+
+class BaseBucketStore(object):
+    def consume(self, key, capacity, refill_rate):
+        """
+        Takes a token from the bucket of the key, returning the seconds to
+        wait for a token, which are 0 when the token was taken.
+        """
+        raise NotImplementedError('Bucket stores must implement .consume()')
+
+
+class LocalBucketStore(BaseBucketStore):
+    """
+    Keeps the buckets in memory, spread over stripes with a lock each, so
+    that concurrent requests of different clients seldom wait on each other.
+
+    Stripes holding more than THROTTLE_LOCAL_STRIPE_SIZE buckets drop the
+    least recently used ones, which are the likeliest to be full again and
+    so the same as no bucket.
+    """
+    stripes = 64
+
+    def __init__(self):
+        self.buckets = [OrderedDict() for _ in range(self.stripes)]
+        self.locks = [threading.Lock() for _ in range(self.stripes)]
+
+    def consume(self, key, capacity, refill_rate):
+        index = hash(key) % self.stripes
+        buckets = self.buckets[index]
+
+        with self.locks[index]:
+            buckets[key], wait = take_token(buckets.get(key), capacity, refill_rate,
+                                            time.time())
+            buckets.move_to_end(key)
+
+            while len(buckets) > settings.THROTTLE_LOCAL_STRIPE_SIZE:
+                buckets.popitem(last=False)
+
+        return wait
+
+    def clear(self):
+        for lock, buckets in zip(self.locks, self.buckets):
+            with lock:
+                buckets.clear()
+
+
+class CacheBucketStore(BaseBucketStore):
+    """
+    Keeps the buckets in the default cache, shared by every process.
+
+    A bucket is read and written back without a lock, so concurrent
+    requests of a client may both take the last token. A store backed by a
+    server with atomic scripts, such as Redis, avoids that overshoot.
+    """
+    key_prefix = 'throttle:bucket:'
+
+    def consume(self, key, capacity, refill_rate):
+        cache_key = self.key_prefix + key
+        now = time.time()
+        bucket, wait = take_token(cache.get(cache_key), capacity, refill_rate, now)
+
+        # A bucket left alone until it is full again is the same as no bucket.
+        cache.set(cache_key, bucket, int(bucket[2] - now) + 1)
+
+        return wait
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttles the requests to a view with a bucket per client and scope.
+
+    The scope is taken from the ``throttle_scopes`` dict of the view, keyed
+    by request method, or from its ``throttle_scope``. Authenticated clients
+    are identified by their user and anonymous ones by their address.
+    """
+    scope = None
+
+    def get_scope(self, request, view):
+        scopes = getattr(view, 'throttle_scopes', {})
+
+        return scopes.get(request.method, getattr(view, 'throttle_scope', self.scope))
+
+    def get_client_ident(self, request):
+        if request.user and request.user.is_authenticated():
+            return 'user:{}'.format(request.user.pk)
+
+        return 'address:{}'.format(self.get_ident(request))
+
+    def allow_request(self, request, view):
+        self.wait_time = None
+
+        scope = self.get_scope(request, view)
+        if scope is None:
+            return True
+
+        return self.consume(scope, self.get_client_ident(request))
+
+    def consume(self, scope, ident):
+        """
+        Takes a token from the bucket of the client for the scope, returning
+        False, and setting the time to wait, when the bucket is empty.
+        """
+        # DRF replaces its api_settings when the settings change, so they are
+        # looked up on the module.
+        rate = api_settings_module.api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None or ident is None:
+            return True
+
+        capacity, refill_rate = parse_rate(rate)
+        key = '{}:{}'.format(scope, hashlib.md5(ident.encode('utf-8')).hexdigest())
+        self.wait_time = get_bucket_store().consume(key, capacity, refill_rate)
+
+        if self.wait_time:
+            stats.reject(scope)
+            return False
+
+        return True
+
+    def wait(self):
+        return self.wait_time
+
+
+class TokenObtainThrottle(TokenBucketThrottle):
+    """
+    Limits the token requests made from a client address, and the tokens
+    obtained for a user, which are only counted once the credentials sent
+    were verified, see allow_user().
+
+    Requests are not keyed on the username sent, which would give a client
+    trying many usernames a bucket for each of them, and let anyone spend
+    the bucket of another user.
+    """
+    scope = 'get_token'
+    user_scope = 'get_token_user'
+
+    def get_client_ident(self, request):
+        return 'address:{}'.format(self.get_ident(request))
+
+    def allow_user(self, user_id):
+        return self.consume(self.user_scope, 'user:{}'.format(user_id))
@@ -1,8 +1,12 @@
-from rest_framework import status
+from rest_framework import exceptions, status
+from rest_framework.authtoken.models import Token
+from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .refresh import InvalidRefreshCredential, get_refresh_token, make_refresh_credential
 from .serializers import UserCreateSerializer
+from .throttling import TokenObtainThrottle
 
 
 class UserCreate(APIView):
@@ -21,11 +25,52 @@ class UserCreate(APIView):
         if serializer.is_valid():
             serializer.save()
 
-            user = serializer.instance
-            user.set_password(request.data['password'])
-            user.save(update_fields=['password'])
-
             return Response({},
                             status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ObtainToken(ObtainAuthToken):
+    """
+    Returns the auth token of a user and a refresh credential, given either
+    the user's username and password or a refresh credential.
+
+    Refreshing skips the password hash, which is most of the cost of a
+    token request.
+
+    The requests are throttled per client address, and the tokens obtained
+    per user once the credentials are verified.
+    """
+    throttle_classes = (TokenObtainThrottle,)
+
+    def post(self, request, *args, **kwargs):
+        if 'refresh' in request.data:
+            try:
+                if not isinstance(request.data['refresh'], str):
+                    raise InvalidRefreshCredential()
+                token = get_refresh_token(request.data['refresh'])
+            except InvalidRefreshCredential:
+                return Response({'refresh': ['Invalid or expired refresh credential.']},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            self.check_user_throttle(token.user_id)
+        else:
+            serializer = self.serializer_class(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            user = serializer.validated_data['user']
+
+            self.check_user_throttle(user.pk)
+            token, created = Token.objects.get_or_create(user=user)
+
+        return Response({
+            'token': token.key,
+            'refresh': make_refresh_credential(token),
+        })
+
+    @staticmethod
+    def check_user_throttle(user_id):
+        throttle = TokenObtainThrottle()
+
+        if not throttle.allow_user(user_id):
+            raise exceptions.Throttled(wait=throttle.wait())
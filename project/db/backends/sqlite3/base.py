@@ -0,0 +1,36 @@
+"""
+SQLite backend applying PRAGMAs to every new connection.
+
+The PRAGMAs default to write-ahead logging, which lets readers run while
+a write is in progress, with the NORMAL synchronous level, which is safe
+with a write-ahead log, and a busy timeout so that concurrent writers wait
+for the database lock instead of failing. They can be changed with the
+``pragmas`` dict of the database OPTIONS.
+"""
+from collections import OrderedDict
+
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = OrderedDict([
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', 5000),
+])
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super(DatabaseWrapper, self).get_connection_params()
+
+        self.pragmas = DEFAULT_PRAGMAS.copy()
+        self.pragmas.update(kwargs.pop('pragmas', {}))
+
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super(DatabaseWrapper, self).get_new_connection(conn_params)
+
+        for name, value in self.pragmas.items():
+            conn.execute('PRAGMA {} = {}'.format(name, value))
+
+        return conn
@@ -0,0 +1,19 @@
+from rest_framework.permissions import SAFE_METHODS
+
+from .routers import mark_written
+
+
+class ReadYourWritesMiddleware(object):
+    """
+    Sends the reads of an authenticated user to the primary database for
+    a while after any of their successful unsafe requests.
+    """
+    def process_response(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return response
+
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated():
+            mark_written(user.pk)
+
+        return response
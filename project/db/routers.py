@@ -0,0 +1,98 @@
+"""
+Database routing between the primary database and its read replicas.
+
+Reads go to the primary database unless they run inside replica_reads(),
+which views serving read-only requests wrap themselves in. Replicas lag
+behind the primary, so only reads tolerating slightly stale data belong
+there, and a user who has just written reads from the primary for
+DATABASE_REPLICA_STICKY_SECONDS, so that they see their own writes.
+
+The recent writers are kept in the default cache, which must be shared by
+every server process for the stickiness to reach all of them.
+"""
+import random
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.decorators import ContextDecorator
+
+_state = threading.local()
+
+
+def written_key(user_id):
+    return 'db:written:{}'.format(user_id)
+
+
+def mark_written(user_id):
+    """
+    Sends the reads of the user to the primary for the sticky window.
+    """
+    if settings.DATABASE_REPLICAS:
+        cache.set(written_key(user_id), True, settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+
+def has_recent_writes(user_id):
+    return cache.get(written_key(user_id), False)
+
+
+class replica_reads(ContextDecorator):
+    """
+    Sends the reads of the current thread to the read replicas, either as
+    a context manager or as a decorator.
+    """
+    # A decorator is a single instance shared by every thread, so the
+    # nesting depth is kept in the thread's state rather than on it.
+    def __enter__(self):
+        _state.replica_reads = getattr(_state, 'replica_reads', 0) + 1
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _state.replica_reads -= 1
+
+
+def replica_reads_for_request(view_method):
+    """
+    Decorates a view method so that its reads go to the replicas, unless
+    the requesting user has written recently.
+    """
+    @wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        if has_recent_writes(request.user.pk):
+            return view_method(view, request, *args, **kwargs)
+
+        with replica_reads():
+            return view_method(view, request, *args, **kwargs)
+
+    return wrapper
+
+
+class PrimaryReplicaRouter(object):
+    """
+    Routes the reads made inside replica_reads() to a random replica of
+    DATABASE_REPLICAS, and every other query to the primary database.
+    """
+    def db_for_read(self, model, **hints):
+        if not getattr(_state, 'replica_reads', 0) or not settings.DATABASE_REPLICAS:
+            return None
+
+        # Reads made inside a transaction must see its writes.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = [DEFAULT_DB_ALIAS] + list(settings.DATABASE_REPLICAS)
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary.
+        return db == DEFAULT_DB_ALIAS
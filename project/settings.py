@@ -45,9 +45,12 @@ INSTALLED_APPS = [
     # Internal apps
     'apps.users',
     'apps.tasks',
+    'apps.monitoring',
+    'apps.jobs',
 ]
 
 MIDDLEWARE_CLASSES = [
+    'apps.monitoring.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,6 +59,7 @@ MIDDLEWARE_CLASSES = [
     'django.contrib.auth.middleware.SessionAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'project.db.middleware.ReadYourWritesMiddleware',
 ]
 
 ROOT_URLCONF = 'project.urls'
@@ -82,13 +86,45 @@ WSGI_APPLICATION = 'project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/1.9/ref/settings/#databases
 
+#
+# The database is configured through the environment. CONN_MAX_AGE keeps
+# connections open across requests; connection pooling is left to a pooler
+# such as pgbouncer, which DATABASE_HOST and DATABASE_PORT can point at.
+# The default SQLite backend applies the PRAGMAs of project.db.backends.sqlite3.
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': os.environ.get('DATABASE_ENGINE', 'project.db.backends.sqlite3'),
+        'NAME': os.environ.get('DATABASE_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'USER': os.environ.get('DATABASE_USER', ''),
+        'PASSWORD': os.environ.get('DATABASE_PASSWORD', ''),
+        'HOST': os.environ.get('DATABASE_HOST', ''),
+        'PORT': os.environ.get('DATABASE_PORT', ''),
+        'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),
     }
 }
 
+# Read replicas, as a comma separated list of hosts, or of database files
+# when the database is SQLite. Replicas share the rest of the settings of
+# the default database, and mirror it while testing.
+DATABASE_REPLICAS = []
+
+for replica in os.environ.get('DATABASE_REPLICAS', '').split(','):
+    if not replica.strip():
+        continue
+
+    alias = 'replica{}'.format(len(DATABASE_REPLICAS) + 1)
+    location = 'NAME' if 'sqlite' in DATABASES['default']['ENGINE'] else 'HOST'
+    DATABASES[alias] = dict(DATABASES['default'], TEST={'MIRROR': 'default'},
+                            **{location: replica.strip()})
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['project.db.routers.PrimaryReplicaRouter']
+
+# Seconds a user reads from the primary after writing, which must exceed
+# the replication lag for users to always see their own writes.
+DATABASE_REPLICA_STICKY_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/1.9/ref/settings/#auth-password-validators
@@ -127,3 +163,156 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/1.9/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# Token authentication
+
+# Number of token -> user lookups kept in memory by each process, and the
+# number of seconds each of them is trusted before hitting the database.
+TOKEN_AUTH_CACHE_MAX_SIZE = 10000
+TOKEN_AUTH_CACHE_TTL = 60
+
+# Seconds a refresh credential returned by the get token endpoint can be
+# traded for the user's token without sending the password again.
+TOKEN_REFRESH_MAX_AGE = 60 * 60 * 24
+
+# Token bucket throttle rates per scope. A "N/period" rate allows bursts
+# of N requests, refilled at N requests per period.
+REST_FRAMEWORK = {
+    'DEFAULT_THROTTLE_CLASSES': (
+        'apps.users.throttling.TokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'get_token': '20/minute',
+        'get_token_user': '20/minute',
+        'tasks_list': '120/minute',
+        'tasks_create': '60/minute',
+        'tasks_solve': '120/minute',
+        'tasks_search': '60/minute',
+        'tasks_export': '10/minute',
+        'tasks_events': '30/minute',
+        'jobs_submit': '30/minute',
+        'jobs_status': '120/minute',
+    },
+}
+
+# Store of the throttle buckets. LocalBucketStore enforces the rates per
+# process; CacheBucketStore shares the buckets through the default cache,
+# which must then be shared by every server process.
+THROTTLE_BUCKET_STORE = 'apps.users.throttling.LocalBucketStore'
+
+# Number of buckets a stripe of the LocalBucketStore holds before dropping
+# the least recently used ones.
+THROTTLE_LOCAL_STRIPE_SIZE = 1000
+
+
+# Tasks API
+
+# Number of tasks returned per page on the task list, and the largest
+# page size a client may ask for through the ``page_size`` parameter.
+TASKS_PAGE_SIZE = 100
+TASKS_MAX_PAGE_SIZE = 1000
+
+# Number of seconds a task list page is cached. The cache lives on the
+# default cache backend, which must be shared by every server process
+# (e.g. memcached) for the invalidations to reach all of them.
+TASKS_LIST_CACHE_TIMEOUT = 300
+
+# Largest number of tasks accepted by a single bulk create request, and
+# the number of tasks inserted per INSERT statement.
+TASKS_BULK_CREATE_MAX_SIZE = 10000
+TASKS_BULK_CREATE_BATCH_SIZE = 500
+
+# Largest number of tasks accepted by a single import_tasks job.
+TASKS_IMPORT_MAX_SIZE = 10000
+
+# Largest number of task ids accepted by a single bulk solve request, kept
+# under SQLite's default limit of 999 parameters per statement.
+TASKS_BULK_SOLVE_MAX_SIZE = 500
+
+# Number of tasks read per query while streaming a task export.
+TASKS_EXPORT_CHUNK_SIZE = 1000
+
+# Seconds deleted tasks are logged for syncing clients, after which the
+# prune_deleted_tasks command removes them. Sync tokens older than that
+# are refused, and their clients sync again from scratch.
+TASKS_DELETED_RETENTION = 30 * 24 * 3600
+
+# Full-text search backend of the task search endpoint. SQLiteFTSBackend
+# needs SQLite with FTS5, other databases may use SimpleSearchBackend.
+TASKS_SEARCH_BACKEND = 'apps.tasks.search.SQLiteFTSBackend'
+
+# Broker handing task change events to the event streams. LocalBroker only
+# reaches the streams served by its own process, so deployments running
+# several server processes need a broker shared by all of them.
+TASKS_EVENTS_BROKER = 'apps.tasks.events.LocalBroker'
+
+# Number of events queued per event stream. A stream falling further
+# behind gets a single resync event instead.
+TASKS_EVENTS_QUEUE_SIZE = 100
+
+# Seconds between the heartbeats of an idle event stream, and seconds
+# after which a stream is closed. Every open stream holds a server thread,
+# so event streams need threaded or evented workers (e.g. gunicorn's
+# gthread or gevent workers).
+TASKS_EVENTS_HEARTBEAT = 15
+TASKS_EVENTS_MAX_AGE = 300
+
+# Number of event streams a user may have open at once in a server process,
+# beyond which streams are refused with a 429 error, so that a user can't
+# hold all of the server threads.
+TASKS_EVENTS_MAX_STREAMS = 5
+
+
+# Background jobs
+
+# Handlers of the job kinds which can be submitted to the job queue.
+JOBS_HANDLERS = {
+    'import_tasks': 'apps.tasks.jobs.import_tasks',
+    'export_tasks': 'apps.tasks.jobs.export_tasks',
+    'rebuild_task_counters': 'apps.tasks.jobs.rebuild_task_counters',
+}
+
+# Number of jobs a run_jobs worker runs at once, and seconds it waits
+# before looking for new jobs when none is due.
+JOBS_CONCURRENCY = 4
+JOBS_POLL_INTERVAL = 1
+
+# Largest length of the JSON encoded arguments of a submitted job, which
+# are stored with the job.
+JOBS_ARGUMENTS_MAX_LENGTH = 2 * 1024 * 1024
+
+# Number of times a failing job is started before giving up on it, and
+# seconds before its first retry, doubled at every following one.
+JOBS_MAX_ATTEMPTS = 3
+JOBS_RETRY_DELAY = 10
+
+# Seconds a running job may go without reporting progress before it is
+# considered abandoned by a dead worker and queued again.
+JOBS_LOCK_TIMEOUT = 600
+
+# Directory of the files written by jobs, such as task exports. It must be
+# shared by the workers and the server processes.
+JOBS_FILES_DIR = os.environ.get('JOBS_FILES_DIR', os.path.join(BASE_DIR, 'job_files'))
+
+
+# Monitoring
+
+# Records the request metrics served at /metrics and sent on Server-Timing
+# headers. Timing the database queries has a cost, so it is off unless
+# turned on through the environment.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '') == '1'
+
+# The metrics page is only served to requests from these addresses, or
+# carrying the METRICS_TOKEN as a bearer token. Behind a reverse proxy every
+# request comes from the proxy's address, so scrapers should then use the
+# token, or the proxy should not forward /metrics.
+METRICS_ALLOWED_ADDRESSES = ['127.0.0.1', '::1']
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Callables returning extra (name, type, description, value) samples for
+# the metrics page.
+METRICS_COLLECTORS = [
+    'apps.tasks.cache.collect_metrics',
+    'apps.users.throttling.collect_metrics',
+]
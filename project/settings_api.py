@@ -0,0 +1,44 @@
+"""
+Django settings for serving the API alone.
+
+The API is token authenticated and only speaks JSON, so this profile
+drops the apps and middleware backing the admin site and the browsable
+API: sessions, CSRF, messages, clickjacking protection and static files.
+The admin site is still served by the default project.settings profile.
+
+Use it with DJANGO_SETTINGS_MODULE=project.settings_api.
+"""
+from .settings import *  # noqa
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in [  # noqa: F405
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+]]
+
+MIDDLEWARE_CLASSES = [
+    'apps.monitoring.middleware.MetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'project.db.middleware.ReadYourWritesMiddleware',
+]
+
+ROOT_URLCONF = 'project.urls_api'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+    },
+]
+
+REST_FRAMEWORK = dict(REST_FRAMEWORK, **{  # noqa: F405
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'apps.users.authentication.CachedTokenAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'rest_framework.renderers.JSONRenderer',
+    ),
+})
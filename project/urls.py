@@ -1,6 +1,8 @@
 from django.conf.urls import include, url
 from django.contrib import admin
 
+from apps.jobs.urls import api_patterns as job_api_patterns
+from apps.monitoring.urls import urlpatterns as monitoring_patterns
 from apps.tasks.urls import api_patterns as task_api_patterns
 from apps.users.urls import api_patterns as user_api_patterns
 
@@ -10,4 +12,6 @@ urlpatterns = [
     url(r'^admin/', include(admin.site.urls)),
     url(r'^api/v1/', include(task_api_patterns)),
     url(r'^api/v1/', include(user_api_patterns)),
+    url(r'^api/v1/', include(job_api_patterns)),
+    url(r'^', include(monitoring_patterns)),
 ]
@@ -0,0 +1,13 @@
+from django.conf.urls import include, url
+
+from apps.jobs.urls import api_patterns as job_api_patterns
+from apps.monitoring.urls import urlpatterns as monitoring_patterns
+from apps.tasks.urls import api_patterns as task_api_patterns
+from apps.users.urls import api_patterns as user_api_patterns
+
+urlpatterns = [
+    url(r'^api/v1/', include(task_api_patterns)),
+    url(r'^api/v1/', include(user_api_patterns)),
+    url(r'^api/v1/', include(job_api_patterns)),
+    url(r'^', include(monitoring_patterns)),
+]